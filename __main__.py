@@ -1,18 +1,39 @@
+import argparse
 import sys
 from node import Node
-import logging
-
-logging.basicConfig(level=logging.DEBUG)
+import log_config
 
 
 def main(args):
-    node = Node()
+    parser = argparse.ArgumentParser(description="Run a node in the block chain network.")
+    roles = parser.add_mutually_exclusive_group()
+    roles.add_argument("--light", action="store_true",
+                       help="Only sync block headers without mining, fetching block bodies from peers on demand.")
+    roles.add_argument("--replica", action="store_true",
+                       help="Follow the chain with full block bodies without mining to serve output and query requests.")
+    parser.add_argument("--trace", metavar="PATH",
+                        help="Record blobs, received and mined blocks and chain switches to a trace file for replay.")
+    parser.add_argument("--log-level", default="INFO", type=str.upper,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"],
+                        help="The log level of every module that isn't configured with --log-module.")
+    parser.add_argument("--log-module", action="append", default=[], metavar="MODULE=LEVEL",
+                        help="The log level of a single module such as miner=DEBUG. May be repeated.")
+    options = parser.parse_args(args[1:])
+
+    try:
+        module_levels = log_config.parse_module_levels(options.log_module)
+    except ValueError as err:
+        parser.error(str(err))
+    listener = log_config.configure(options.log_level, module_levels)
+
+    node = Node(light=options.light, replica=options.replica, trace_path=options.trace)
     try:
         node.run()
     except KeyboardInterrupt:
         pass
     finally:
         node.shutdown()
+        listener.stop()
 
 if __name__ == '__main__':
     main(sys.argv)
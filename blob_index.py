@@ -0,0 +1,156 @@
+import bisect
+import heapq
+from collections import defaultdict
+
+from protos import request_pb2
+
+
+class BlobIndex:
+    """
+    The index of the blobs that have been mined into the blocks of a chain. Blobs can be looked up by their digest
+    to find which block they are in, and by the timestamp they were received at to find all blobs received within
+    a time range.
+
+    The index is shared with the snapshots of the chain which read it without holding any locks, so its entries are
+    never changed or removed once they are added. Each entry refers to the block it was added for and is only found
+    while that block is still at the entry's index in the blocks being searched, which skips both the blocks added
+    after a snapshot was taken and the blocks removed from the chain. Once most of the entries refer to removed
+    blocks the chain replaces the index with a compacted copy and the snapshots keep the index they were taken with.
+    """
+
+    """
+    The smallest number of entries for removed blocks that the index is compacted at.
+    """
+    MIN_COMPACT_SIZE = 1024
+
+    def __init__(self):
+
+        # The dictionary of lists of (block index, position, block) entries for each blob keyed by the blob's digest
+        # The lists are only ever appended to
+        self.locations = defaultdict(list)
+
+        # The sorted runs of (timestamp, sequence number, block index, position, block) entries for each blob
+        # Entries are appended to the last run while they are in order and start a new run otherwise. Each run is only
+        # ever appended to, and runs are merged into new runs so that each run is at least twice the size of the run
+        # after it, which keeps the number of runs logarithmic in the number of entries
+        self.runs = []
+
+        # The number of entries that have been added and the number of them whose blocks have been removed
+        self.entries = 0
+        self.removed = 0
+
+    def __contains__(self, digest):
+        return digest in self.locations
+
+    def __len__(self):
+        return len(self.locations)
+
+    def add(self, block_idx, block):
+        """
+        Add all blobs stored in a block's body to the index.
+        :param block_idx: The index of the block in the chain.
+        :param block: The block that should have it's block body data added to the index.
+        :return: None
+        """
+        entries = []
+        for pos, (digest, blob) in enumerate(zip(block.get_blob_digests(), block.get_body().blobs)):
+            self.locations[digest].append((block_idx, pos, block))
+
+            msg = request_pb2.BlobMessage()
+            msg.ParseFromString(blob)
+            entries.append((msg.timestamp, self.entries, block_idx, pos, block))
+            self.entries += 1
+
+        entries.sort(key=BlobIndex.__timestamp_key)
+        if len(entries) == 0:
+            return
+
+        # Blobs are almost always mined in the order they were received so appending to the last run is the common case
+        runs = self.runs
+        if len(runs) > 0 and self.__timestamp_key(runs[-1][-1]) <= self.__timestamp_key(entries[0]):
+            runs[-1].extend(entries)
+        else:
+            runs = runs + [entries]
+
+        # Replace the runs that would be merged with a new merged run so the runs that snapshots read never change
+        while len(runs) > 1 and len(runs[-2]) <= 2 * len(runs[-1]):
+            merged = list(heapq.merge(runs[-2], runs[-1], key=BlobIndex.__timestamp_key))
+            runs = runs[:-2] + [merged]
+        self.runs = runs
+
+    def remove(self, block_idx, block):
+        """
+        Record that a block was removed from the chain. Its entries are left in the index for the snapshots that
+        still contain the block and are skipped once another block is at its index.
+        :param block_idx: The index of the block in the chain.
+        :param block: The block that was removed from the chain.
+        :return: None
+        """
+        self.removed += len(block.get_blob_digests())
+
+    def is_sparse(self):
+        """
+        Determine if most of the index's entries refer to blocks that have been removed from the chain.
+        :return: True if the index should be compacted; otherwise, False.
+        """
+        return self.removed >= max(self.entries - self.removed, BlobIndex.MIN_COMPACT_SIZE)
+
+    def compact(self, blocks):
+        """
+        Create a copy of the index without the entries of blocks that have been removed from the chain.
+        :param blocks: The blocks of the chain.
+        :return: The compacted BlobIndex.
+        """
+        index = BlobIndex()
+        for digest, entries in self.locations.items():
+            live = [entry for entry in entries if BlobIndex.__is_live(entry[0], entry[2], blocks, len(blocks))]
+            if len(live) > 0:
+                index.locations[digest] = live
+        run = [entry for entry in heapq.merge(*self.runs, key=BlobIndex.__timestamp_key)
+               if BlobIndex.__is_live(entry[2], entry[4], blocks, len(blocks))]
+        index.runs = [run] if len(run) > 0 else []
+        index.entries = len(run)
+        return index
+
+    def find(self, digest, blocks, length):
+        """
+        Find the blocks that contain a blob.
+        :param digest: The digest of the blob to find.
+        :param blocks: The blocks of the chain or snapshot being searched.
+        :param length: The number of blocks being searched.
+        :return: A sorted list of the (block index, position) locations of the blob.
+        """
+        return sorted({(block_idx, pos) for block_idx, pos, block in self.locations.get(digest, ())
+                       if BlobIndex.__is_live(block_idx, block, blocks, length)})
+
+    def find_between(self, start, end, blocks, length):
+        """
+        Find all blobs received within a time range.
+        :param start: The timestamp at the start of the time range.
+        :param end: The timestamp at the end of the time range which is excluded.
+        :param blocks: The blocks of the chain or snapshot being searched.
+        :param length: The number of blocks being searched.
+        :return: A list of the (block index, position) locations of each blob received in the range in order by
+        timestamp.
+        """
+        ranges = []
+        for run in self.runs:
+            lo = bisect.bisect_left(run, (start,))
+            hi = bisect.bisect_left(run, (end,))
+            ranges.append(run[lo:hi])
+
+        locations = []
+        found = set()
+        for _, _, block_idx, pos, block in heapq.merge(*ranges, key=BlobIndex.__timestamp_key):
+            if (block_idx, pos) not in found and BlobIndex.__is_live(block_idx, block, blocks, length):
+                found.add((block_idx, pos))
+                locations.append((block_idx, pos))
+        return locations
+
+    @staticmethod
+    def __timestamp_key(entry):
+        return entry[0], entry[1]
+
+    @staticmethod
+    def __is_live(block_idx, block, blocks, length):
+        return block_idx < length and blocks[block_idx] is block
@@ -1,48 +1,202 @@
-import copy
+import json
 import logging
+import lzma
 import time
+import zlib
 from hashlib import sha256
 from secrets import randbits
 
 from google.protobuf import message
 
+import util
+from merkle import MerkleTree
 from protos import block_pb2, request_pb2
 
+logger = logging.getLogger(__name__)
+
+"""
+The largest size in bytes of a block's encoded body once decompressed. This leaves room above the miner's block size
+limit for the encoding of each blob so that any block a node mines can be decoded, while a small compressed body
+can't expand into an unbounded amount of memory.
+"""
+MAX_BODY_SIZE = 2 << 20
+
+"""
+The compression function and the decompressor type for each codec that a block's body can be encoded with. Bodies
+that aren't compressed have no decompressor.
+"""
+CODECS = {
+    block_pb2.NONE: (bytes, None),
+    block_pb2.ZLIB: (zlib.compress, zlib.decompressobj),
+    block_pb2.LZMA: (lzma.compress, lzma.LZMADecompressor),
+}
+
+
+def compress(data, codec):
+    """
+    Compress a block's encoded body using the provided codec.
+    :param data: The encoded BlockBody protocol buffer.
+    :param codec: The Codec to compress the data with.
+    :return: The compressed body data.
+    """
+    return CODECS[codec][0](data)
+
+
+def decompress(data, codec, max_size=MAX_BODY_SIZE):
+    """
+    Decompress a block's body that was compressed using the provided codec. The body is decompressed incrementally
+    and decompression stops as soon as it exceeds the size limit.
+    :param data: The compressed body data.
+    :param codec: The Codec the data was compressed with.
+    :param max_size: The largest size in bytes of the decompressed body.
+    :return: The encoded BlockBody protocol buffer.
+    :except: If the codec is unknown, the data cannot be decompressed or the body is larger than the size limit then
+    a DecodeError is thrown.
+    """
+    if codec not in CODECS:
+        raise message.DecodeError("Unknown body codec: %d" % codec)
+
+    decompressor_type = CODECS[codec][1]
+    if decompressor_type is None:
+        body = bytes(data)
+    else:
+        decompressor = decompressor_type()
+        try:
+            body = decompressor.decompress(data, max_size + 1)
+        except (zlib.error, lzma.LZMAError) as err:
+            raise message.DecodeError(str(err))
+        if len(body) <= max_size and not decompressor.eof:
+            raise message.DecodeError("Incomplete or truncated body")
+
+    if len(body) > max_size:
+        raise message.DecodeError("Body is larger than the limit of %d bytes" % max_size)
+    return body
+
+
+"""
+The number of bits in a block's SHA256 hash.
+"""
+HASH_BITS = 256
+
+"""
+The size in bytes of every hash and target in a block's header.
+"""
+HASH_SIZE = HASH_BITS // 8
+
+
+def difficulty_target(difficulty):
+    """
+    Get the target that a block's hash must be below to have the provided number of leading 0 bits.
+    :param difficulty: The number of leading 0 bits required for the block's hash.
+    :return: The 256 bit integer target.
+    """
+    if difficulty > HASH_BITS:
+        return 0
+    return 1 << (HASH_BITS - difficulty)
+
+
+def target_difficulty(target):
+    """
+    Get the number of leading 0 bits required for a block's hash that most closely corresponds to a target.
+    :param target: The 256 bit integer target.
+    :return: The difficulty in number of leading 0 bits.
+    """
+    return HASH_BITS + 1 - target.bit_length()
+
+
+def encode_varint(value):
+    """
+    Encode an unsigned integer using the protocol buffer variable length integer encoding.
+    :param value: The unsigned integer to encode.
+    :return: The encoded integer.
+    """
+    data = bytearray()
+    while value > 0x7f:
+        data.append((value & 0x7f) | 0x80)
+        value >>= 7
+    data.append(value)
+    return bytes(data)
+
 
 class BlockBuilder:
     """
     The block builder for creating a new block. The allows binary data to be added to
-    the block body while the block is being built. Once the block is built, the block body
-    can no longer have binary objects added to it.
+    the block body while the block is being built. The body is encoded, hashed and compressed
+    incrementally as each blob is added so that building a block only costs time proportional to
+    the blobs added since the last build. Blobs can continue to be added after a block is built
+    to build a later block containing the same blobs and the new ones.
+    """
+
+    """
+    The tag of the repeated blobs field of the BlockBody protocol buffer that precedes each encoded blob.
     """
+    BLOBS_FIELD_TAG = b'\x0a'
 
-    def __init__(self, prev_hash, difficulty):
+    def __init__(self, prev_hash, difficulty, codec=block_pb2.NONE, target=None):
         """
          Initialize a new block builder for building the next block in the chain.
          :param prev_hash: The hash of the previous block in the chain.
          :param difficulty: The difficulty target in number of 0's in the hash required to mine the block.
+         :param codec: The Codec used to compress the block's body.
+         :param target: The 256 bit integer that the block's hash must be below or None to use the difficulty.
          :return: None
          """
         self.prev_hash = prev_hash
         self.difficulty = difficulty
-        self.body = block_pb2.BlockBody()
+        self.codec = codec
+        self.target = target
 
-    def add(self, blob):
+        # The digests of the blobs in the body and their total size in bytes
+        self.digests = set()
+        self.size = 0
+
+        # The running hash of the encoded body and the Merkle tree over its blob digests
+        self.body_hash = sha256()
+        self.merkle_tree = MerkleTree()
+
+        # The encoded body which is compressed as it is built if the codec supports it
+        self.body = []
+        self.compressor = zlib.compressobj() if codec == block_pb2.ZLIB else None
+
+    def __len__(self):
+        return len(self.digests)
+
+    def add(self, blob, digest=None):
         """
-         Add a blob message to the block's body.                                                            
+         Add a blob message to the block's body.
         :param: blob: The binary data containing the blob's data and the timestamp it was received
             encoded using the BlobMessage protocol buffer.
+        :param digest: The blob's digest if it has already been computed.
         :return: None
         """
-        self.body.blobs.append(blob)
+        if digest is None:
+            digest = util.blob_digest(blob)
+        self.digests.add(digest)
+        self.merkle_tree.append(digest)
+        self.size += len(blob)
+
+        # Encode the blob the same way it is encoded in the BlockBody protocol buffer
+        data = BlockBuilder.BLOBS_FIELD_TAG + encode_varint(len(blob)) + blob
+        self.body_hash.update(data)
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        self.body.append(data)
 
     def build(self):
         """
         Build a new block with the previous block's hash, the difficulty, and
-            a copy of the blob messages in the block body.
+            the blob messages that have been added to the block body.
         :return: A new block that can be mined to add it to the chain.
         """
-        return Block.block(self.prev_hash, self.difficulty, copy.deepcopy(self.body))
+        data = b''.join(self.body)
+        if self.compressor is not None:
+            data += self.compressor.copy().flush()
+        else:
+            data = compress(data, self.codec)
+
+        return Block(self.prev_hash, self.difficulty, data, time.time(), body_hash=self.body_hash.copy().digest(),
+                     codec=self.codec, merkle_root=self.merkle_tree.root(), blob_count=len(self.merkle_tree),
+                     target=self.target)
 
 
 class Block:
@@ -88,41 +242,182 @@ class Block:
     def get_body(self):
         """
         Get the block's body as a BlockBody protocol buffer which contains a collection of serialized
-        binary BlobMessage protocol buffers.
+        binary BlobMessage protocol buffers. The body is decompressed each time it is requested so that
+        only the compressed body is kept in memory.
         :return: A BlockBody protocol buffer object for the block's body containing the list of encoded.
-        BlobMessage objects.
+        BlobMessage objects or None if the block doesn't have its body data.
+        """
+        if not self.has_body():
+            return None
+
+        body = block_pb2.BlockBody()
+        body.ParseFromString(decompress(self.body, self.header.codec))
+        return body
+
+    def get_body_data(self):
+        """
+        Get the block's encoded body compressed using the codec recorded in the block's header. The body data of a
+        decoded block is returned without being verified against the block's header.
+        :return: The compressed body data or None if the block doesn't have its body data.
         """
         return self.body
 
+    def get_codec(self):
+        """
+        Get the codec that the block's body is compressed with.
+        :return: The Codec recorded in the block's header.
+        """
+        return self.header.codec
+
+    def get_blob_digests(self):
+        """
+        Get the content digests identifying each of the blobs in the block's body.
+        :return: A list of the SHA256 digests of the encoded BlobMessage protocol buffers in the order they
+        appear in the block's body or an empty list if the block doesn't have its body data.
+        """
+        if not self.has_body():
+            return []
+        if self.blob_digests is None:
+            self.blob_digests = [util.blob_digest(blob) for blob in self.get_body().blobs]
+        return self.blob_digests
+
+    def clear_body(self):
+        """
+        Discard the block's body data so that only its header is kept.
+        :return: None
+        """
+        self.body = None
+        self.blob_digests = None
+        self.encoded.pop(True, None)
+
     def has_body(self):
         """
-        Determine if the block has its body data or only a head.
+        Determine if the block has its body data or only a head. The body data of a decoded block is verified against
+        the block's header the first time this is called and discarded if it doesn't match.
         :return: Returns True if the block has its body data; otherwise, False is returned.
         """
+        if self.body is not None and not self.body_verified:
+            digests = self.__verify_body(self.body, "Decoded block has body")
+            if digests is None:
+                self.clear_body()
+            self.blob_digests = digests
+            self.body_verified = True
         return self.body is not None
 
     def set_body(self, body):
         """
-        Set the block's body data using a BlockBody protocol buffer. This can only be used if the
+        Set the block's body data using its compressed BlockBody protocol buffer. This can only be used if the
         hash of the new body is the same as the body hash in the block header. This allows the body
         to be added to a block that was transferred without its body during chain resolution.
-        :param body: The BlockBody protocol buffer to be set as the block's body that must have the
-        same hash as the header's body hash.
+        :param body: The encoded BlockBody protocol buffer compressed using the header's codec that must have the
+        same hash as the header's body hash once decompressed.
         :return: None
         """
-        if self.header.body_hash != sha256(body.SerializeToString()).digest():
-            logging.error("Error: Set body called with data that doesn't match the body hash.")
+        digests = self.__verify_body(body, "Set body called with")
+        if digests is None:
             return
         self.body = body
+        self.body_verified = True
+        self.blob_digests = digests
+        self.encoded.pop(True, None)
+
+    def copy_body(self, block):
+        """
+        Copy the body data of a block with the same header. The body is verified against the other block's header
+        if it hasn't been already, which is the same as this block's header, so it doesn't need to be verified again.
+        :param block: The block with the same header to copy the body data from.
+        :return: True if the body was copied; otherwise, False if the blocks differ or the other block has no body.
+        """
+        if self != block or not block.has_body():
+            return False
+        self.body = block.body
+        self.body_verified = True
+        self.blob_digests = block.blob_digests
+        self.encoded.pop(True, None)
+        return True
+
+    def __verify_body(self, body, action):
+        """
+        Verify that compressed body data matches the commitments in the block's header.
+        :param body: The encoded BlockBody protocol buffer compressed using the header's codec.
+        :param action: The description of what is being verified that is used when logging errors.
+        :return: The list of digests of the blobs in the body or None if the body doesn't match the header.
+        """
+        try:
+            body_hash, digests = Block.__digest_body(decompress(body, self.header.codec))
+        except message.DecodeError:
+            logger.error("Error: %s data that can't be decoded.", action)
+            return None
+        if self.header.body_hash != body_hash:
+            logger.error("Error: %s data that doesn't match the body hash.", action)
+            return None
+        if self.header.blob_count != len(digests) or self.header.merkle_root != MerkleTree(digests).root():
+            logger.error("Error: %s data that doesn't match the Merkle root.", action)
+            return None
+        return digests
+
+    def get_merkle_root(self):
+        """
+        Get the root of the Merkle tree over the digests of the blobs in the block's body.
+        :return: The Merkle root recorded in the block's header.
+        """
+        return self.header.merkle_root
+
+    def get_blob_count(self):
+        """
+        Get the number of blobs in the block's body.
+        :return: The number of blobs recorded in the block's header.
+        """
+        return self.header.blob_count
+
+    def merkle_proof(self, pos):
+        """
+        Compute the proof that a blob is included in the block that can be verified using only the block's header.
+        :param pos: The position of the blob within the block's body.
+        :return: The list of sibling hashes from the blob's leaf to the Merkle root.
+        """
+        return MerkleTree(self.get_blob_digests()).proof(pos)
+
+    @staticmethod
+    def commit(data):
+        """
+        Compute the commitments to a block's body that are recorded in the block's header.
+        :param data: The uncompressed encoded BlockBody protocol buffer.
+        :return: A tuple of the body's SHA256 hash, the root of the Merkle tree over its blob digests and
+        the number of blobs.
+        :except: If the body cannot be decoded then a DecodeError is thrown.
+        """
+        body_hash, digests = Block.__digest_body(data)
+        tree = MerkleTree(digests)
+        return body_hash, tree.root(), len(tree)
+
+    @staticmethod
+    def __digest_body(data):
+        """
+        Compute the digests of a block's body and of each of the blobs in it.
+        :param data: The uncompressed encoded BlockBody protocol buffer.
+        :return: A tuple of the body's SHA256 hash and the list of its blob digests.
+        :except: If the body cannot be decoded then a DecodeError is thrown.
+        """
+        body = block_pb2.BlockBody()
+        body.ParseFromString(data)
+        return sha256(data).digest(), [util.blob_digest(blob) for blob in body.blobs]
 
     def get_cost(self):
         """
         Get the amount of work that was required to mine the block. This differs from difficulty because costs can
         be compared linearly where as difficulty cannot.
         :return: The amount of work that had to be put in to mine the block. Each increase in difficulty doubles the
-        amount of work that needs to be done.
+        amount of work that needs to be done, and in general the work is inversely proportional to the target.
+        """
+        return (1 << HASH_BITS) // max(self.target, 1)
+
+    def get_target(self):
+        """
+        Get the target that the block's hash must be below for the block to be mined.
+        :return: The 256 bit integer target which is derived from the difficulty if the header doesn't have a target.
         """
-        return 1 << self.header.difficulty
+        return self.target
 
     def get_nonce(self):
         """
@@ -142,68 +437,120 @@ class Block:
         Creates the genesis block which is the first block in the block chain shared by all nodes.
         :return: The genesis block.
         """
-        return cls(b'', cls.GENESIS_DIFFICULTY, block_pb2.BlockBody(), cls.GENESIS_TIMESTAMP, 0, cls.GENESIS_NONCE)
+        return cls(b'', cls.GENESIS_DIFFICULTY, b'', cls.GENESIS_TIMESTAMP, 0, cls.GENESIS_NONCE)
 
     @classmethod
     def decode(cls, data, has_body=True):
         """
-        Decode a block from an encoded Block protocol buffer.
+        Decode a block from an encoded Block protocol buffer. Only the header is decoded eagerly so that header only
+        operations are cheap. The body is decompressed, parsed and verified against the header the first time it is
+        used, and the block keeps the encoded data to avoid encoding it again.
         :param data: The encoded block.
         :param has_body: True if the block has its body data; otherwise, false
         :return: The decoded block.
-        :except: If decoding fails then a DecodeError is thrown.
+        :except: If decoding fails or a header field doesn't fit its size then a DecodeError is thrown.
         """
         block_data = block_pb2.Block()
         block_data.ParseFromString(data)
-
+        cls.__check_header(block_data)
+
+        block = cls(block_data.prev_hash,
+                    block_data.header.difficulty,
+                    block_data.body if has_body else None,
+                    block_data.header.timestamp,
+                    block_data.header.entropy,
+                    block_data.nonce,
+                    block_data.header.body_hash,
+                    block_data.header.codec,
+                    block_data.header.merkle_root,
+                    block_data.header.blob_count,
+                    int.from_bytes(block_data.header.target, "big") if block_data.header.target else None)
+        block.body_verified = not has_body
         if has_body:
-            body_hash = None
-        else:
-            body_hash = block_data.header.body_hash
+            block.encoded[True] = (block.nonce, block.prev_hash, data)
+        return block
 
-        return cls(block_data.prev_hash,
-                   block_data.header.difficulty,
-                   block_data.body,
-                   block_data.header.timestamp,
-                   block_data.header.entropy,
-                   block_data.nonce,
-                   body_hash)
+    @staticmethod
+    def __check_header(block_data):
+        """
+        Check that the header fields of a decoded block fit the fixed width record that the header is packed into.
+        Hashes and targets must be empty or a full hash of non-zero bytes since empty fields are packed as zeros, the
+        body hash must always be a full hash and the codec must be a known codec.
+        :param block_data: The decoded Block protocol buffer.
+        :return: None
+        :except: If a header field doesn't fit its size then a DecodeError is thrown.
+        """
+        header = block_data.header
+        if header.codec not in CODECS:
+            raise message.DecodeError("Unknown block codec: %d" % header.codec)
+        if len(header.body_hash) != HASH_SIZE:
+            raise message.DecodeError("Block body hash is %d bytes" % len(header.body_hash))
+        for name, value in (("previous hash", block_data.prev_hash), ("Merkle root", header.merkle_root),
+                            ("target", header.target)):
+            if value and (len(value) != HASH_SIZE or not any(value)):
+                raise message.DecodeError("Block %s isn't empty or a %d byte non-zero value" % (name, HASH_SIZE))
 
     @classmethod
-    def block(cls, prev_hash, difficulty, body):
+    def block(cls, prev_hash, difficulty, body, codec=block_pb2.NONE):
         """
         Creates a new block that can be mined and added to the end of the block chain.
         :param prev_hash: The hash of the previous block in the block chain.
         :param difficulty: The difficulty target in number of 0's in the hash required to mine the block.
         :param body: A BlockBody protocol buffer object for the block's body containing the list of encoded.
+        :param codec: The Codec used to compress the block's body.
         :return: The newly created block.
         """
-        return cls(prev_hash, difficulty, body, time.time())
+        return cls(prev_hash, difficulty, compress(body.SerializeToString(), codec), time.time(), codec=codec)
 
-    def __init__(self, prev_hash, difficulty, body, timestamp, entropy=randbits(32), nonce=0, body_hash=None):
+    def __init__(self, prev_hash, difficulty, body, timestamp, entropy=randbits(32), nonce=0, body_hash=None,
+                 codec=block_pb2.NONE, merkle_root=b'', blob_count=0, target=None):
         """
         Initialize a new block
         :param prev_hash: The hash of the previous block in the block chain.
         :param difficulty: The difficulty target in number of 0's in the hash required to mine the block.
-        :param body: A BlockBody protocol buffer object for the block's body containing the list of encoded.
+        :param body: The encoded BlockBody protocol buffer for the block's body compressed using the codec or None if
+            the block doesn't have its body data.
         :param timestamp: The timestamp the block was created at.
         :param entropy: A secure random number to avoid collisions even if two nodes are mining blocks with
             identical timestamps and block bodies.
         :param nonce: The integer nonce value to start at when mining the block.
-        :param body_hash: The body hash to be set in the header that is only used if the provided body is None.
+        :param body_hash: The hash of the uncompressed body to be set in the header. It is computed from the provided
+            body along with the Merkle root and blob count if it is None.
+        :param codec: The Codec the block's body is compressed with.
+        :param merkle_root: The root of the Merkle tree over the blob digests that is only used if the body hash
+            is provided.
+        :param blob_count: The number of blobs in the body that is only used if the body hash is provided.
+        :param target: The 256 bit integer that the block's hash must be below or None to use the difficulty.
         """
         self.nonce = nonce
         self.prev_hash = prev_hash
         self.body = body
 
+        # If the body is known to match the header which is deferred for decoded blocks until the body is used
+        self.body_verified = True
+
+        # The digests of the blobs in the body which are computed the first time they are used
+        self.blob_digests = None
+
+        # The cached (nonce, previous hash, encoded block) tuples keyed by whether the encoding includes the body
+        # The nonce and previous hash are checked on use so that mining and linking the block never pay to invalidate
+        self.encoded = {}
+
         self.header = block_pb2.BlockHeader()
         self.header.entropy = entropy
         self.header.timestamp = timestamp
         self.header.difficulty = difficulty
-        if body_hash is not None:
-            self.header.body_hash = body_hash
+        self.header.codec = codec
+        if body_hash is None:
+            body_hash, merkle_root, blob_count = Block.commit(decompress(self.body, codec))
+        self.header.body_hash = body_hash
+        self.header.merkle_root = merkle_root
+        self.header.blob_count = blob_count
+        if target is not None:
+            self.header.target = target.to_bytes(HASH_SIZE, "big")
         else:
-            self.header.body_hash = sha256(self.body.SerializeToString()).digest()
+            target = difficulty_target(difficulty)
+        self.target = target
         self.cur_hash = sha256(self.header.SerializeToString()).digest()
 
     def __eq__(self, other):
@@ -237,45 +584,105 @@ class Block:
         :param include_body: Indicate whether to encode the data in the block's body.
         :return: The binary encoded block.
         """
+        include_body = include_body and self.has_body()
+        cached = self.encoded.get(include_body)
+        if cached is not None and cached[0] == self.nonce and cached[1] == self.prev_hash:
+            return cached[2]
+
         block = block_pb2.Block()
         block.nonce = self.nonce
         block.prev_hash = self.prev_hash
         block.header.CopyFrom(self.header)
         if include_body:
-            block.body.CopyFrom(self.body)
-        return block.SerializeToString()
+            block.body = self.body
+        data = block.SerializeToString()
+
+        self.encoded[include_body] = (self.nonce, self.prev_hash, data)
+        return data
 
     def is_valid(self, prev_hash=None):
         """
-        Tests whether the block has been mined by computing the SHA256 hash and determining if the number of leading 
-        0 bits is greater than or equal to the difficulty.
+        Tests whether the block has been mined by computing the SHA256 hash and determining if it is below the
+        target, which is the same as the number of leading 0 bits being greater than or equal to the difficulty
+        if the header doesn't have a target.
         :param prev_hash: The hash of the previous block in the chain
-        :return: True if a nonce has been found that satisfies the difficulty; otherwise, False.
-        """
-        hashcode = self.hash(prev_hash)
-        for i in range(0, self.header.difficulty):
-            byte = hashcode[i // 8]
-            # 0x80 = 1000 0000 to test each bit in an individual byte by bit shifting
-            if byte & (0x80 >> (i % 8)) != 0:
-                return False
-        return True
+        :return: True if a nonce has been found that satisfies the target; otherwise, False.
+        """
+        return int.from_bytes(self.hash(prev_hash), "big") < self.target
 
-    def to_ascii(self):
+    def iter_blobs(self, resolve=None):
         """
-        Creates an ASCII representation of the data stored within the block's body. If any of the BlobMessage's
-        within the body cannot be decoded they are omitted.
-        :return: The ASCII encoded representation of the block's body
+        Iterate over the blobs stored within the block's body. If any of the BlobMessage's within the body
+        cannot be decoded or their data is unavailable they are omitted. The body is decompressed transparently.
+        Nothing is yielded if the block doesn't have its body data.
+        :param resolve: An optional function that takes a BlobMessage protocol buffer and returns the blob's data
+            or None if it is unavailable. This is used to fetch the data of blobs that are stored out of line.
+        :return: A generator of (timestamp, data) tuples for each blob in the block's body.
         """
+        if not self.has_body():
+            return
 
-        if len(self.body.blobs) == 0:
-            return "{}\n"
-        lines = "{\n"
-        for blob in self.body.blobs:
+        for blob in self.get_body().blobs:
             msg = request_pb2.BlobMessage()
             try:
                 msg.ParseFromString(blob)
             except message.DecodeError:
-                logging.error("Error: Failed to convert blob to ASCII.")
+                logger.error("Error: Failed to decode blob.")
                 continue
-            lines += "\t" + "timestamp: " + str(msg.timestamp) + " blob: " + msg.blob.decode()
-        return lines + "}\n"
+
+            data = msg.blob if resolve is None else resolve(msg)
+            if data is None:
+                logger.error("Error: Blob data is unavailable.")
+                continue
+            yield msg.timestamp, data
+
+    def iter_ascii(self, resolve=None):
+        """
+        Incrementally creates an ASCII representation of the data stored within the block's body.
+        :param resolve: An optional function used to fetch the data of blobs that are stored out of line.
+        :return: A generator of the lines of the ASCII encoded representation of the block's body.
+        """
+        yield "{\n"
+        for timestamp, data in self.iter_blobs(resolve):
+            yield "\ttimestamp: " + str(timestamp) + " blob: " + data.decode(errors='replace')
+        yield "}\n"
+
+    def to_ascii(self, resolve=None):
+        """
+        Creates an ASCII representation of the data stored within the block's body. If any of the BlobMessage's
+        within the body cannot be decoded they are omitted. The body is decompressed transparently.
+        :param resolve: An optional function that takes a BlobMessage protocol buffer and returns the blob's data
+            or None if it is unavailable. This is used to fetch the data of blobs that are stored out of line.
+        :return: The ASCII encoded representation of the block's body
+        """
+        # The header's blob count is verified against the body so the body is only decompressed to iterate its blobs
+        if not self.has_body() or self.get_blob_count() == 0:
+            return "{}\n"
+        return "".join(self.iter_ascii(resolve))
+
+    def to_dict(self, idx, resolve=None):
+        """
+        Creates a dictionary representation of the block and the data stored within its body that can be
+        encoded as JSON. The blobs are None if the block doesn't have its body data.
+        :param idx: The index of the block in the chain.
+        :param resolve: An optional function used to fetch the data of blobs that are stored out of line.
+        :return: The dictionary representation of the block.
+        """
+        blobs = None
+        if self.has_body():
+            blobs = [{"timestamp": timestamp, "blob": data.decode(errors='replace')}
+                     for timestamp, data in self.iter_blobs(resolve)]
+        return {"index": idx,
+                "hash": self.hash().hex(),
+                "timestamp": self.get_timestamp(),
+                "difficulty": self.get_difficulty(),
+                "blobs": blobs}
+
+    def to_json(self, idx, resolve=None):
+        """
+        Creates a JSON representation of the block and the data stored within its body.
+        :param idx: The index of the block in the chain.
+        :param resolve: An optional function used to fetch the data of blobs that are stored out of line.
+        :return: The JSON encoded representation of the block on a single line.
+        """
+        return json.dumps(self.to_dict(idx, resolve)) + "\n"
@@ -1,9 +1,13 @@
 import logging
-from collections import defaultdict
 
 import util
-from block import BlockBuilder, Block
-from protos import request_pb2, chain_pb2
+from blob_index import BlobIndex
+import header_chain
+from block import Block
+from protos import chain_pb2
+from segment_list import SegmentList
+
+logger = logging.getLogger(__name__)
 
 
 class Chain:
@@ -19,62 +23,89 @@ class Chain:
         """
         return self.__cost
 
-    @classmethod
-    def decode(cls, data, has_bodies):
-        """
-        Decode a chain from an encoded Chain protocol buffer.
-        :param data: The encoded chain.
-        :param has_bodies: True if the encoded chain's blocks have their body data; otherwise, False.
-        :return: The decoded chain.
-        :except: If decoding fails then a DecodeError is thrown.
-        """
-
-        chain_data = chain_pb2.Chain()
-        chain_data.ParseFromString(data)
-
-        chain = cls()
-        for block_data in chain_data.blocks[1:]:
-            block = Block.decode(block_data, has_bodies)
-            chain.add(block)
-
-        return chain
-
     def __init__(self):
 
-        # the dictionary of mined blobs to allow a blob to be looked up using its hash to find which block it is in
-        self.mined_blobs = defaultdict(set)
+        # the index of mined blobs to allow a blob to be looked up using its digest to find which block it is in
+        self.mined_blobs = BlobIndex()
 
-        self.blocks = []
+        # The chain's block headers packed into fixed width records that are added as blocks are added
+        self.packed_headers = SegmentList()
+
+        # The blocks are stored in segments so that snapshots can share them while blocks are removed from the end
+        self.blocks = SegmentList()
         genesis = Block.genesis()
         self.blocks.append(genesis)
+        self.packed_headers.append(header_chain.pack(genesis))
 
         self.__cost = genesis.get_cost()
 
+        # The number of blocks in the chain that are missing their body data
+        self.__bodiless = 0
+
     def add(self, block):
         """
         Add a block to the chain.
         :param block: The block to be added.
         :return: None
         """
-        debug_msg = "Add block to chain with nonce: %d blobs:" % block.get_nonce()
-        util.log_collection(logging.DEBUG, debug_msg, block.get_body().blobs)
+        # Checking for the body verifies it so only do so when the blobs will be logged
+        if logger.isEnabledFor(logging.DEBUG) and block.has_body():
+            debug_msg = "Add block to chain with nonce: %d blobs:" % block.get_nonce()
+            util.log_collection(logger, logging.DEBUG, debug_msg, block.get_body().blobs)
+
+        # The header is packed first so that a header that can't be packed leaves the chain unchanged
+        packed = header_chain.pack(block)
 
         block_idx = len(self.blocks)
         self.__add_mined_blobs(block_idx, block)
         self.__cost += block.get_cost()
+        self.__bodiless += not block.has_body()
         self.blocks.append(block)
+        self.packed_headers.append(packed)
 
     def insert(self, idx, block):
         """
-        Insert a block into the chain at the specified index.
+        Insert a block into the chain at the specified index. Inserting before the end of the chain shifts the
+        blocks after it so their blobs are moved to their new indices in the mined blobs index.
         :param idx: The index to insert the block at.
         :param block: The block to be inserted
         :return: None
         """
+        packed = header_chain.pack(block)
+
+        shifted = self.blocks[idx:]
+        for block_idx, shifted_block in enumerate(shifted, idx):
+            if shifted_block.has_body():
+                self.mined_blobs.remove(block_idx, shifted_block)
 
         self.__add_mined_blobs(idx, block)
+        for block_idx, shifted_block in enumerate(shifted, idx + 1):
+            self.__add_mined_blobs(block_idx, shifted_block)
+
         self.__cost += block.get_cost()
+        self.__bodiless += not block.has_body()
         self.blocks.insert(idx, block)
+        self.packed_headers.insert(idx, packed)
+        self.__compact_mined_blobs()
+
+    def truncate(self, idx):
+        """
+        Remove every block from the specified index to the end of the chain. Only the segment of blocks and packed
+        block headers containing the index is copied so that snapshots of the chain stay consistent.
+        :param idx: The index of the first block to be removed which must be greater than 0.
+        :return: The list of removed blocks.
+        """
+        removed = self.blocks.truncate(idx)
+        self.packed_headers.truncate(idx)
+
+        for block_idx, block in enumerate(removed, idx):
+            self.__cost -= block.get_cost()
+            if block.has_body():
+                self.mined_blobs.remove(block_idx, block)
+            else:
+                self.__bodiless -= 1
+        self.__compact_mined_blobs()
+        return removed
 
     def replace(self, idx, block):
         """
@@ -84,17 +115,22 @@ class Chain:
         that are missing it.
         :param idx: The index of the block to have its body replaced.
         :param block: The block who's body should be used to replace it.
-        :return: True if the block's body was replaced with the provided block; otherwise, False.
+        :return: True if the block's body was replaced with the provided block or it already had the same body;
+        otherwise, False.
         """
 
         if idx <= 0 or idx >= len(self.blocks):
             return False
 
+        # A block with the same header already has the same body and its blobs are already indexed
         cur = self.blocks[idx]
-        if cur != block:
+        if cur.has_body():
+            return cur == block
+
+        if not cur.copy_body(block):
             return False
 
-        cur.set_body(block.get_body())
+        self.__bodiless -= 1
         self.__add_mined_blobs(idx, cur)
         return True
 
@@ -109,36 +145,40 @@ class Chain:
         if not block.has_body():
             return
 
-        for idx, blob in enumerate(block.get_body().blobs):
-            msg = request_pb2.BlobMessage()
-            msg.ParseFromString(blob)
-            self.mined_blobs[hash(msg.blob)].add((block_idx, idx))
+        self.mined_blobs.add(block_idx, block)
 
-    def next(self, difficulty, blobs):
+    def __compact_mined_blobs(self):
         """
-        Build the next block to try to add to the chain.
-        :param difficulty: The difficulty required for the next block to be mined.
-        :param blobs: The blobs to be added to the body of the next block.
+        Replace the mined blobs index with a compacted copy once most of its entries are for blocks that were removed
+        from the chain. Snapshots keep the index they were taken with.
         :return: None
         """
-        prev = self.blocks[-1]
-        builder = BlockBuilder(prev.hash(), difficulty)
-
-        debug_msg = "Building block: %d blobs:" % len(blobs)
-        util.log_collection(logging.DEBUG, debug_msg, blobs)
+        if self.mined_blobs.is_sparse():
+            self.mined_blobs = self.mined_blobs.compact(self.blocks)
 
-        for blob in blobs:
-            builder.add(blob)
-
-        return builder.build()
+    def get_packed_headers(self):
+        """
+        Get the chain's block headers packed into fixed width records.
+        :return: The packed block headers that can be parsed as a HeaderChain.
+        """
+        return b''.join(self.packed_headers)
 
-    def is_valid(self):
+    def is_valid(self, executor=None):
         """
-        Tests whether the chain is valid by computing and verifying the chain of hashes.
+        Tests whether the chain is valid by computing and verifying the chain of hashes. Long chains are verified
+        from their packed block headers in parallel segments when a pool of worker processes is provided.
+        :param executor: The pool of worker processes created by header_chain.create_executor or None to verify the
+            chain in the calling thread.
         :return: True if the chain is valid; otherwise, False
         """
+        if executor is not None and len(self.blocks) > header_chain.MIN_SEGMENT_SIZE:
+            invalid_idx = header_chain.HeaderChain(self.get_packed_headers()).verify(executor)
+            if invalid_idx == 0:
+                logger.error("Invalid genesis block: The genesis nonce requires updating.")
+            return invalid_idx is None
+
         if not self.blocks[0].is_valid():
-            logging.error("Invalid genesis block: The genesis nonce requires updating.")
+            logger.error("Invalid genesis block: The genesis nonce requires updating.")
             return False
         for i in range(1, len(self.blocks)):
             cur = self.blocks[i]
@@ -158,6 +198,15 @@ class Chain:
             chain.blocks.append(block.encode(include_body))
         return chain.SerializeToString()
 
+    def snapshot(self):
+        """
+        Take an immutable snapshot of the chain as it currently is. The snapshot stays consistent as more blocks are
+        added to the end of the chain so it can be read without holding any locks.
+        :return: The ChainSnapshot of the chain.
+        """
+        return ChainSnapshot(self.blocks.view(), len(self.blocks), self.__cost, self.mined_blobs,
+                             self.packed_headers.view())
+
     def get_bodiless_indices(self):
         """
         Gets the list of all blocks in the chain that only have a header. The blocks at
@@ -173,11 +222,113 @@ class Chain:
     def is_complete(self):
         """
         Determine if all blocks in the chain have their binary body data meaning that there are no bodiless blocks.
+        The chain's hashes aren't verified so this takes constant time.
         :return: True if all blocks have their binary body data; otherwise, False.
         """
-        if not self.is_valid():
-            return False
-        for block in self.blocks:
-            if not block.has_body():
-                return False
-        return True
+        return self.__bodiless == 0
+
+
+class ChainSnapshot:
+    """
+    An immutable view of a chain at a point in time. The snapshot shares the segments of the chain's blocks and
+    packed block headers, which are copied rather than changed when blocks are removed from the chain, so it only
+    needs to read the blocks before its length. The chain's blob index is shared in the same way since its entries
+    are never changed or removed once they are added.
+    """
+
+    def __init__(self, blocks, length, cost, blob_index, packed_headers):
+        """
+        Create a new snapshot.
+        :param blocks: The view of the chain's blocks.
+        :param length: The number of blocks in the chain when the snapshot was taken.
+        :param cost: The total cost of the chain when the snapshot was taken.
+        :param blob_index: The index of the blobs mined into the chain which may include blobs from later blocks and
+        from blocks that have since been removed from the chain.
+        :param packed_headers: The view of the chain's packed block headers.
+        :return: None
+        """
+        self.blocks = blocks
+        self.length = length
+        self.cost = cost
+        self.blob_index = blob_index
+        self.packed_headers = packed_headers
+
+        # The packed block headers joined into bytes the first time they are requested
+        self.__packed = None
+
+    def __len__(self):
+        return self.length
+
+    def get_cost(self):
+        """
+        Get the total cost of all the blocks in the snapshot.
+        :return: The cost of all blocks in the snapshot combined.
+        """
+        return self.cost
+
+    def get_block(self, idx):
+        """
+        Get the Block at the specified index.
+        :param idx: The index of the block to get.
+        :return: The block at the specified index or None if the index is out of the snapshot's bounds.
+        """
+        if idx < 0 or idx >= self.length:
+            return None
+        return self.blocks[idx]
+
+    def get_blocks(self, start, end):
+        """
+        Get the Blocks in a range of indices.
+        :param start: The index of the first block to get.
+        :param end: The index after the last block to get or None to get all blocks up to the end of the snapshot.
+        :return: A list of the blocks in the range which is truncated to the snapshot's bounds.
+        """
+        if end is None or end > self.length:
+            end = self.length
+        return self.blocks[max(start, 0):end]
+
+    def contains_blob(self, digest):
+        """
+        Determine if a blob has been mined into a block of the snapshot.
+        :param digest: The digest of the blob.
+        :return: True if the blob has been mined; otherwise, False.
+        """
+        return len(self.find_blob(digest)) > 0
+
+    def find_blob(self, digest):
+        """
+        Find the blocks in the snapshot that contain a blob.
+        :param digest: The digest of the blob to find.
+        :return: A sorted list of the (block index, position) locations of the blob.
+        """
+        return self.blob_index.find(digest, self.blocks, self.length)
+
+    def find_blobs_between(self, start, end):
+        """
+        Find all blobs in the snapshot that were received within a time range.
+        :param start: The timestamp at the start of the time range.
+        :param end: The timestamp at the end of the time range which is excluded.
+        :return: A list of the (block index, position) locations of each blob in order by the time it was received.
+        """
+        return self.blob_index.find_between(start, end, self.blocks, self.length)
+
+    def pack_headers(self):
+        """
+        Get the snapshot's block headers packed into fixed width records. The headers are joined into immutable
+        bytes once and the same bytes are returned for every later request since the snapshot never changes.
+        :return: The packed block headers that can be parsed as a HeaderChain.
+        """
+        if self.__packed is None:
+            self.__packed = b''.join(self.packed_headers)
+        return self.__packed
+
+    def encode(self, include_body=True):
+        """
+        Encode the snapshot into a binary representation that can be sent across the network.
+        :param include_body: Indicate whether to encode the data in the blocks' bodies.
+        :return: The binary encoded chain.
+        """
+        chain = chain_pb2.Chain()
+        for block in self.blocks[:self.length]:
+            chain.blocks.append(block.encode(include_body))
+        return chain.SerializeToString()
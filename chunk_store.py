@@ -0,0 +1,157 @@
+import threading
+from collections import OrderedDict
+from hashlib import sha256
+
+from protos import request_pb2
+
+
+class ChunkStore:
+    """
+    The content addressed store for the chunks of large blobs. Large blobs are split into fixed size chunks that are
+    stored outside of the block chain so that blocks only contain a small reference to each chunk by its digest.
+    The chunks of blobs submitted to this node may not be stored by any other node, so they are pinned and never
+    evicted, and new blobs are rejected once the pinned chunks fill the store. Chunks fetched from peers are cached
+    in the rest of the store and the least recently used of them are evicted since they can be fetched again.
+    """
+
+    """
+    The size in bytes of each chunk that a large blob's data is split into. Blobs with less data than this are
+    stored in blocks directly.
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    """
+    The maximum total size in bytes of the chunks that can be stored at once, including the pinned chunks.
+    """
+    MAX_SIZE = 1 << 30
+
+    def __init__(self, chunk_size=CHUNK_SIZE, max_size=MAX_SIZE):
+        """
+        Create a new empty chunk store.
+        :param chunk_size: The size in bytes of each chunk that large blobs are split into.
+        :param max_size: The maximum total size in bytes of the chunks that can be stored at once.
+        :return: None
+        """
+        self.chunk_size = chunk_size
+        self.max_size = max_size
+
+        # The total size of all stored chunks and of the pinned chunks
+        self.size = 0
+        self.pinned_size = 0
+
+        # The data of the chunks of blobs submitted to this node keyed by the SHA256 digest of the chunk
+        self.pinned = {}
+
+        # The data of the chunks fetched from peers keyed by the SHA256 digest of the chunk in order from least to
+        # most recently used
+        self.chunks = OrderedDict()
+        self.chunks_lock = threading.Lock()
+
+    def __contains__(self, digest):
+        return digest in self.pinned or digest in self.chunks
+
+    def get(self, digest):
+        """
+        Get the data for a chunk.
+        :param digest: The digest of the chunk.
+        :return: The chunk's data or None if the chunk isn't stored.
+        """
+        with self.chunks_lock:
+            data = self.pinned.get(digest)
+            if data is None:
+                data = self.chunks.get(digest)
+                if data is not None:
+                    self.chunks.move_to_end(digest)
+        return data
+
+    def put(self, data, digest=None):
+        """
+        Cache the data of a chunk fetched from a peer.
+        :param data: The chunk's data.
+        :param digest: The expected digest of the chunk if it was requested by its digest.
+        :return: True if the chunk was stored; otherwise, False if its data doesn't match the expected digest.
+        """
+        actual = sha256(data).digest()
+        if digest is not None and digest != actual:
+            return False
+
+        with self.chunks_lock:
+            if actual in self.pinned:
+                return True
+            if actual in self.chunks:
+                self.chunks.move_to_end(actual)
+                return True
+
+            self.chunks[actual] = data
+            self.size += len(data)
+            self.__evict()
+        return True
+
+    def __evict(self):
+        """
+        Evict the least recently used cached chunks until the store is within its maximum size. Pinned chunks are
+        never evicted. Must be called while holding the chunks lock.
+        :return: None
+        """
+        while self.size > self.max_size and len(self.chunks) > 0:
+            _, evicted = self.chunks.popitem(last=False)
+            self.size -= len(evicted)
+
+    def split(self, msg):
+        """
+        Move a blob's data out of line into chunks if it is large. The blob's data is replaced by the digests of
+        its chunks so that the blob can be included in blocks without copying its data.
+        :param msg: The BlobMessage protocol buffer to be split.
+        :return: The BlobMessage protocol buffer referencing the blob's chunks, the provided message if the blob
+        is small enough to be stored in blocks directly or None if the pinned chunks would no longer fit in the store.
+        """
+        if len(msg.blob) <= self.chunk_size:
+            return msg
+
+        ref = request_pb2.BlobMessage()
+        ref.timestamp = msg.timestamp
+        ref.size = len(msg.blob)
+        chunks = {}
+        for offset in range(0, len(msg.blob), self.chunk_size):
+            chunk = msg.blob[offset:offset + self.chunk_size]
+            digest = sha256(chunk).digest()
+            chunks[digest] = chunk
+            ref.chunks.append(digest)
+
+        # The blob's chunks are pinned since this may be the only node that has them
+        with self.chunks_lock:
+            added = [(digest, chunk) for digest, chunk in chunks.items() if digest not in self.pinned]
+            added_size = sum(len(chunk) for _, chunk in added)
+            if self.pinned_size + added_size > self.max_size:
+                return None
+
+            for digest, chunk in added:
+                cached = self.chunks.pop(digest, None)
+                if cached is None:
+                    self.size += len(chunk)
+                self.pinned[digest] = chunk
+            self.pinned_size += added_size
+            self.__evict()
+        return ref
+
+    def missing(self, msg):
+        """
+        Get the chunks of a blob that are not stored.
+        :param msg: The BlobMessage protocol buffer referencing the blob's chunks.
+        :return: A list of the digests of the blob's chunks that are missing.
+        """
+        return [digest for digest in msg.chunks if digest not in self]
+
+    def join(self, msg):
+        """
+        Get a blob's data by joining its chunks back together.
+        :param msg: The BlobMessage protocol buffer that may reference the blob's chunks.
+        :return: The blob's data or None if any of its chunks are missing.
+        """
+        if len(msg.chunks) == 0:
+            return msg.blob
+
+        chunks = [self.get(digest) for digest in msg.chunks]
+        if None in chunks:
+            return None
+        return b''.join(chunks)
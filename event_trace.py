@@ -0,0 +1,167 @@
+import logging
+import struct
+import threading
+import time
+
+import framing
+
+logger = logging.getLogger(__name__)
+
+"""
+The bytes that every trace file starts with to identify it and the version of its format.
+"""
+TRACE_MAGIC = b'BCTRACE\x02'
+
+"""
+The header of each record in a trace holding the type of the event, the time it occurred at and the length of the
+record's payload.
+"""
+RECORD_HEADER = struct.Struct("<BdI")
+
+"""
+The types of events recorded in a trace. A blob event's payload is the encoded BlobMessage protocol buffer of a blob
+added to the pending blobs. A mined event's payload is the cost of the chain after the block was added and the
+encoded block. A switch event's payload is the index of the first block that differs from the replaced chain, the
+length of the new chain and the length framed encoded blocks of the new chain from the fork. A received event's
+payload is the cost of the peer's chain and the encoded block that the peer mined.
+"""
+BLOB_EVENT = 1
+MINED_EVENT = 2
+SWITCH_EVENT = 3
+RECEIVED_EVENT = 4
+
+"""
+The fixed width fields at the start of the payloads of mined, received and switch events.
+"""
+MINED_FORMAT = struct.Struct("<Q")
+SWITCH_FORMAT = struct.Struct("<II")
+
+
+class TraceWriter:
+    """
+    The recorder that appends every blob added to the pending blobs, block received from a peer, mined block and
+    chain switch of a node to a binary trace file so that the node's behavior can be replayed offline. Records are
+    written through a buffered file from the miner's event handlers, which are called while the miner holds the lock
+    that the event changes its state under, so the records are in the order the miner applied them.
+    """
+
+    def __init__(self, path):
+        """
+        Open a trace file for appending, writing the trace header if the file is new.
+        :param path: The path of the trace file.
+        :return: None
+        """
+        self.lock = threading.Lock()
+        self.file = open(path, "ab")
+        if self.file.tell() == 0:
+            self.file.write(TRACE_MAGIC)
+
+    def write(self, event_type, payload):
+        """
+        Append a record to the trace.
+        :param event_type: The type of the event.
+        :param payload: The event's payload.
+        :return: None
+        """
+        with self.lock:
+            if self.file.closed:
+                return
+            self.file.write(RECORD_HEADER.pack(event_type, time.time(), len(payload)))
+            self.file.write(payload)
+
+    def blob_added(self, msg):
+        """
+        Record a blob that was added to the pending blobs. Used as a miner blob event handler.
+        :param msg: The encoded BlobMessage protocol buffer.
+        :return: None
+        """
+        self.write(BLOB_EVENT, msg)
+
+    def block_received(self, block, chain_cost):
+        """
+        Record a block that was mined by a peer. Used as a miner receive event handler.
+        :param block: The block that was received.
+        :param chain_cost: The total cost of the chain that the peer is working on.
+        :return: None
+        """
+        self.write(RECEIVED_EVENT, MINED_FORMAT.pack(chain_cost) + block.encode())
+
+    def block_mined(self, block, chain_cost):
+        """
+        Record a block that was mined by the node. Used as a miner mine event handler.
+        :param block: The block that was mined.
+        :param chain_cost: The cost of the chain after the block was added.
+        :return: None
+        """
+        self.write(MINED_EVENT, MINED_FORMAT.pack(chain_cost) + block.encode())
+
+    def chain_replaced(self, fork_idx, chain):
+        """
+        Record the node switching to a higher cost chain. Used as a miner reorg event handler.
+        :param fork_idx: The index of the first block that differs from the replaced chain.
+        :param chain: The new chain.
+        :return: None
+        """
+        blocks = b''.join(framing.frame_segment(block.encode()) for block in chain.blocks[fork_idx:])
+        self.write(SWITCH_EVENT, SWITCH_FORMAT.pack(fork_idx, len(chain.blocks)) + blocks)
+
+    def close(self):
+        """
+        Flush and close the trace file.
+        :return: None
+        """
+        with self.lock:
+            self.file.close()
+
+
+def read_trace(path):
+    """
+    Read the records of a trace file in the order they were written. A partial record at the end of the file, which
+    is left if the node stopped while writing it, is ignored.
+    :param path: The path of the trace file.
+    :return: A generator of (event type, timestamp, fields) tuples. The fields of a blob event are the encoded
+    BlobMessage protocol buffer, of mined and received events the chain cost and the encoded block, and of a switch
+    event the fork index, the length of the new chain and the list of encoded blocks from the fork.
+    :except: If the file isn't a trace then a ValueError is thrown.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+            raise ValueError("Not a trace file: %s" % path)
+
+        while True:
+            header = f.read(RECORD_HEADER.size)
+            if len(header) < RECORD_HEADER.size:
+                return
+            event_type, timestamp, length = RECORD_HEADER.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                logger.warning("Ignoring partial record at the end of the trace")
+                return
+
+            if event_type == BLOB_EVENT:
+                fields = (payload,)
+            elif event_type == MINED_EVENT or event_type == RECEIVED_EVENT:
+                chain_cost, = MINED_FORMAT.unpack_from(payload)
+                fields = (chain_cost, payload[MINED_FORMAT.size:])
+            elif event_type == SWITCH_EVENT:
+                fork_idx, length = SWITCH_FORMAT.unpack_from(payload)
+                fields = (fork_idx, length, list(iter_framed(payload[SWITCH_FORMAT.size:])))
+            else:
+                logger.warning("Skipping unknown trace event type: %d", event_type)
+                continue
+
+            yield event_type, timestamp, fields
+
+
+def iter_framed(data):
+    """
+    Split data into the length framed segments it consists of.
+    :param data: The concatenated length framed segments.
+    :return: A generator of the segments.
+    """
+    pos = 0
+    while pos + framing.LENGTH_HEADER_SIZE <= len(data):
+        length = framing.convert_int_from_4_bytes(data[pos:pos + framing.LENGTH_HEADER_SIZE])
+        pos += framing.LENGTH_HEADER_SIZE
+        yield data[pos:pos + length]
+        pos += length
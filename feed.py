@@ -0,0 +1,124 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """
+    A subscription to the feed of chain events. Events are buffered in a bounded queue until the subscriber
+    consumes them so that a slow subscriber can never block the node.
+    """
+
+    def __init__(self, buffer_size):
+        """
+        Create a new subscription.
+        :param buffer_size: The maximum number of events that can be buffered before the subscriber is dropped.
+        :return: None
+        """
+        self.events = queue.Queue(buffer_size)
+
+        # If the subscription was dropped due to the subscriber not consuming events fast enough
+        self.overflowed = False
+
+    def get(self, timeout):
+        """
+        Get the next event for the subscriber.
+        :param timeout: The maximum number of seconds to wait for an event.
+        :return: The next event or None if no event was published before the timeout.
+        """
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class SubscriptionFeed:
+    """
+    The feed of chain events that are pushed to all subscribers as blocks are added to the chain and as the
+    chain is replaced by a higher cost chain. Subscribers that fall too far behind are dropped rather than
+    buffering events without bound.
+    """
+
+    """
+    The type of event published when a block is added to the end of the chain. The event is a tuple of the
+    event type, the block's index in the chain and the block.
+    """
+    BLOCK_EVENT = "block"
+
+    """
+    The type of event published when the chain is replaced. The event is a tuple of the event type, the index of
+    the first block that differs from the replaced chain and the length of the new chain.
+    """
+    REORG_EVENT = "reorg"
+
+    """
+    The maximum number of events buffered for each subscriber.
+    """
+    BUFFER_SIZE = 1024
+
+    def __init__(self, buffer_size=BUFFER_SIZE):
+        """
+        Create a new feed with no subscribers.
+        :param buffer_size: The maximum number of events buffered for each subscriber.
+        :return: None
+        """
+        self.buffer_size = buffer_size
+        self.subscriptions = set()
+        self.subscriptions_lock = threading.Lock()
+
+    def subscribe(self):
+        """
+        Add a new subscriber to the feed.
+        :return: The Subscription to consume events from.
+        """
+        subscription = Subscription(self.buffer_size)
+        with self.subscriptions_lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscriber from the feed.
+        :param subscription: The subscription to remove.
+        :return: None
+        """
+        with self.subscriptions_lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, event):
+        """
+        Push an event to all subscribers without blocking. Any subscriber whose buffer is full is dropped.
+        :param event: The event to be published.
+        :return: None
+        """
+        with self.subscriptions_lock:
+            for subscription in list(self.subscriptions):
+                try:
+                    subscription.events.put_nowait(event)
+                except queue.Full:
+                    logger.debug("Drop slow subscriber")
+                    subscription.overflowed = True
+                    self.subscriptions.remove(subscription)
+
+    def block_added(self, block, idx):
+        """
+        The block added callback that publishes an event when a block is added to the end of the current chain.
+        :param block: The block that was added.
+        :param idx: The index of the block in the chain.
+        :return: None
+        """
+        self.publish((SubscriptionFeed.BLOCK_EVENT, idx, block))
+
+    def chain_replaced(self, fork_idx, chain):
+        """
+        The chain replaced callback that publishes an event when the current chain is replaced by a higher cost chain
+        followed by an event for each block in the new chain after the fork.
+        :param fork_idx: The index of the first block in the new chain that differs from the replaced chain.
+        :param chain: The new chain.
+        :return: None
+        """
+        self.publish((SubscriptionFeed.REORG_EVENT, fork_idx, len(chain.blocks)))
+        for idx in range(fork_idx, len(chain.blocks)):
+            self.block_added(chain.blocks[idx], idx)
@@ -0,0 +1,98 @@
+import time
+
+
+class ForkCache:
+    """
+    The bounded cache of floating chains, the higher or equal cost chains that are undergoing chain resolution.
+    Chains are looked up by the hash of the block at their tip so that a new block can be attached to the chain it
+    extends without checking every chain. Chains that haven't been extended recently expire, and the lowest cost
+    chain is evicted when the cache is full, so that peers that never finish resolution can't grow the cache.
+    """
+
+    """
+    The maximum number of floating chains that are tracked at once.
+    """
+    MAX_FORKS = 16
+
+    """
+    The number of seconds after a floating chain was last extended that it expires.
+    """
+    FORK_TTL = 300.0
+
+    def __init__(self, max_forks=MAX_FORKS, ttl=FORK_TTL):
+        """
+        Create a new empty fork cache.
+        :param max_forks: The maximum number of floating chains that are tracked at once.
+        :param ttl: The number of seconds after a floating chain was last extended that it expires.
+        :return: None
+        """
+        self.max_forks = max_forks
+        self.ttl = ttl
+
+        # The floating chains keyed by the hash of the block at their tip
+        self.tips = {}
+
+        # The (tip hash, time last extended) tuples of each floating chain keyed by the chain
+        self.forks = {}
+
+    def __len__(self):
+        return len(self.forks)
+
+    def __contains__(self, chain):
+        return chain in self.forks
+
+    def __iter__(self):
+        return iter(list(self.forks))
+
+    def add(self, chain):
+        """
+        Start tracking a floating chain, evicting expired chains and the lowest cost chain if the cache is full.
+        :param chain: The floating chain to be added.
+        :return: None
+        """
+        self.expire()
+        while len(self.forks) >= self.max_forks:
+            self.remove(min(self.forks, key=lambda fork: fork.get_cost()))
+        self.update(chain)
+
+    def update(self, chain):
+        """
+        Update the tip of a floating chain after a block was added to the end of it.
+        :param chain: The floating chain that was extended.
+        :return: None
+        """
+        fork = self.forks.get(chain)
+        if fork is not None:
+            self.tips.pop(fork[0], None)
+
+        tip_hash = chain.blocks[-1].hash()
+        self.tips[tip_hash] = chain
+        self.forks[chain] = (tip_hash, time.time())
+
+    def remove(self, chain):
+        """
+        Stop tracking a floating chain if it is being tracked.
+        :param chain: The floating chain to be removed.
+        :return: None
+        """
+        fork = self.forks.pop(chain, None)
+        if fork is not None:
+            self.tips.pop(fork[0], None)
+
+    def find(self, prev_hash):
+        """
+        Find the floating chain whose tip a block extends.
+        :param prev_hash: The hash of the previous block that the block claims to extend.
+        :return: The floating chain or None if no chain has a tip with the hash.
+        """
+        return self.tips.get(prev_hash)
+
+    def expire(self):
+        """
+        Remove all floating chains that haven't been extended within the time to live.
+        :return: None
+        """
+        now = time.time()
+        for chain, (_, updated) in list(self.forks.items()):
+            if now - updated > self.ttl:
+                self.remove(chain)
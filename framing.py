@@ -3,6 +3,11 @@ The length of the integer header used to frame TCP messages in a TCP stream.
 """
 LENGTH_HEADER_SIZE = 4
 
+"""
+The largest message that can be sent in a single UDP datagram.
+"""
+MAX_DATAGRAM_SIZE = 65507
+
 
 def convert_int_to_4_bytes(num):
     """
@@ -0,0 +1,310 @@
+import multiprocessing
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import sha256
+
+from block import Block, HASH_BITS, difficulty_target, encode_varint
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+"""
+The fixed width record that each block header is packed into. The record holds the previous hash, body hash, Merkle
+root, target, timestamp, difficulty, entropy, nonce, blob count and codec of the block. Empty hashes and targets are
+packed as zeros.
+"""
+HEADER_FORMAT = struct.Struct("<32s32s32s32sdIIIIB7x")
+
+"""
+The size in bytes of each packed block header.
+"""
+HEADER_SIZE = HEADER_FORMAT.size
+
+"""
+The NumPy structured type matching the packed block header record when NumPy is available.
+"""
+HEADER_DTYPE = None
+if numpy is not None:
+    HEADER_DTYPE = numpy.dtype({
+        "names": ["prev_hash", "body_hash", "merkle_root", "target", "timestamp", "difficulty", "entropy", "nonce",
+                  "blob_count", "codec"],
+        "formats": [("u1", 32), ("u1", 32), ("u1", 32), ("u1", 32), "<f8", "<u4", "<u4", "<u4", "<u4", "u1"],
+        "offsets": [0, 32, 64, 96, 128, 136, 140, 144, 148, 152],
+        "itemsize": HEADER_SIZE,
+    })
+
+"""
+The BlockHeader protocol buffer encoding of a header with every field set, a single byte codec and 32 byte hashes
+and target, which is the encoding of almost every mined block's header. The field tags and lengths are the constant
+fields.
+"""
+FULL_HEADER_FORMAT = struct.Struct("<BIBdBIBB32sBBBB32sBIBB32s")
+
+"""
+The BlockHeader protocol buffer encoding of the header of a block with an empty body, which has no Merkle root or
+blob count but is otherwise the same as a header with every field set.
+"""
+EMPTY_HEADER_FORMAT = struct.Struct("<BIBdBIBB32sBBBB32s")
+
+"""
+The BlockHeader protocol buffer encodings of headers with every field set and of headers of blocks with an empty
+body for blocks whose body isn't compressed, which omit the codec field since it is the default value.
+"""
+UNCOMPRESSED_FULL_HEADER_FORMAT = struct.Struct("<BIBdBIBB32sBB32sBIBB32s")
+UNCOMPRESSED_EMPTY_HEADER_FORMAT = struct.Struct("<BIBdBIBB32sBB32s")
+
+"""
+The empty hash that is packed as zeros in place of the genesis block's previous hash and empty Merkle roots.
+"""
+EMPTY_HASH = bytes(32)
+
+"""
+The number of block headers in each segment of a chain that is hashed by a single worker process.
+"""
+SEGMENT_SIZE = 32768
+
+"""
+The smallest number of block headers that are sent to a worker process at once so that splitting a short chain, such
+as a batch of a resolution chain, across the workers doesn't cost more than hashing it in the calling thread.
+"""
+MIN_SEGMENT_SIZE = 1024
+
+"""
+The number of worker processes that chain segments are hashed in.
+"""
+VERIFY_WORKERS = os.cpu_count() or 1
+
+
+def create_executor(workers=VERIFY_WORKERS):
+    """
+    Create the pool of worker processes that chain segments are hashed in. The pool is meant to be created once when
+    the node starts and shared by every verification. Workers are started with the forkserver method, or spawned
+    where it isn't available, so they never inherit the locks held by the node's other threads.
+    :param workers: The number of worker processes.
+    :return: The ProcessPoolExecutor or None if there is only a single worker so segments are hashed in the calling
+    thread.
+    """
+    if workers <= 1:
+        return None
+
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(method))
+
+
+def pack(block):
+    """
+    Pack a block's header into a fixed width record.
+    :param block: The block to be packed.
+    :return: The packed block header.
+    """
+    header = block.header
+    return HEADER_FORMAT.pack(block.prev_hash, header.body_hash, header.merkle_root, header.target, header.timestamp,
+                              header.difficulty, header.entropy, block.nonce, header.blob_count, header.codec)
+
+
+def encode_header(timestamp, difficulty, entropy, body_hash, codec, merkle_root, blob_count, target):
+    """
+    Encode the fields of a packed block header as the BlockHeader protocol buffer that the block's hash is computed
+    over without creating a protocol buffer object. Fields are written in order and omitted if they are the default
+    value the same as the protocol buffer encoder does.
+    :return: The encoded BlockHeader protocol buffer.
+    """
+    data = bytearray()
+    if entropy:
+        data += b'\x0d' + struct.pack("<I", entropy)
+    if timestamp:
+        data += b'\x11' + struct.pack("<d", timestamp)
+    if difficulty:
+        data += b'\x1d' + struct.pack("<I", difficulty)
+    if body_hash:
+        data += b'\x22' + encode_varint(len(body_hash)) + body_hash
+    if codec:
+        data += b'\x28' + encode_varint(codec)
+    if merkle_root:
+        data += b'\x32' + encode_varint(len(merkle_root)) + merkle_root
+    if blob_count:
+        data += b'\x3d' + struct.pack("<I", blob_count)
+    if target:
+        data += b'\x42' + encode_varint(len(target)) + target
+    return bytes(data)
+
+
+def hash_headers(data):
+    """
+    Compute the hash of every block in a segment of packed block headers. Each packed header contains its previous
+    hash so segments can be hashed independently in any order. Headers with every field set or with an empty body
+    are encoded with a fixed width format, which is almost every mined block's header, and the rest are encoded
+    field by field.
+    :param data: The packed block headers.
+    :return: The concatenated 32 byte block hashes in order.
+    """
+    hashes = []
+    append = hashes.append
+    for prev_hash, body_hash, merkle_root, target, timestamp, difficulty, entropy, nonce, blob_count, codec in \
+            HEADER_FORMAT.iter_unpack(data):
+        header = None
+        if entropy and timestamp and difficulty and codec < 0x80 and target != EMPTY_HASH:
+            if blob_count and merkle_root != EMPTY_HASH:
+                if codec:
+                    header = FULL_HEADER_FORMAT.pack(0x0d, entropy, 0x11, timestamp, 0x1d, difficulty, 0x22, 32,
+                                                     body_hash, 0x28, codec, 0x32, 32, merkle_root, 0x3d, blob_count,
+                                                     0x42, 32, target)
+                else:
+                    header = UNCOMPRESSED_FULL_HEADER_FORMAT.pack(0x0d, entropy, 0x11, timestamp, 0x1d, difficulty,
+                                                                  0x22, 32, body_hash, 0x32, 32, merkle_root, 0x3d,
+                                                                  blob_count, 0x42, 32, target)
+            elif not blob_count and merkle_root == EMPTY_HASH:
+                if codec:
+                    header = EMPTY_HEADER_FORMAT.pack(0x0d, entropy, 0x11, timestamp, 0x1d, difficulty, 0x22, 32,
+                                                      body_hash, 0x28, codec, 0x42, 32, target)
+                else:
+                    header = UNCOMPRESSED_EMPTY_HEADER_FORMAT.pack(0x0d, entropy, 0x11, timestamp, 0x1d, difficulty,
+                                                                   0x22, 32, body_hash, 0x42, 32, target)
+        if header is None:
+            header = encode_header(timestamp, difficulty, entropy, body_hash, codec, unpack_hash(merkle_root),
+                                   blob_count, unpack_hash(target))
+        if prev_hash == EMPTY_HASH:
+            prev_hash = b''
+        append(sha256(sha256(header).digest() + prev_hash + b'%d' % nonce).digest())
+    return b''.join(hashes)
+
+
+def unpack_hash(data):
+    """
+    Unpack a hash from a packed block header.
+    :param data: The packed hash.
+    :return: The hash or an empty byte string if it was packed as zeros.
+    """
+    data = bytes(data)
+    return b'' if data == EMPTY_HASH else data
+
+
+class HeaderChain:
+    """
+    The chain of block headers packed into fixed width records that is sent to peers undergoing chain resolution.
+    The records are parsed in bulk as a NumPy structured array when NumPy is available so that hash links and
+    difficulties can be checked for the whole chain at once before any blocks are created.
+    """
+
+    def __init__(self, data):
+        """
+        Parse a chain of packed block headers.
+        :param data: The packed block headers.
+        :return: None
+        :except: If the data isn't a whole number of packed headers then a ValueError is thrown.
+        """
+        if len(data) % HEADER_SIZE != 0:
+            raise ValueError("Packed header chain has a partial header")
+
+        self.data = bytes(data)
+        self.length = len(data) // HEADER_SIZE
+
+    def __len__(self):
+        return self.length
+
+    def header(self, idx):
+        """
+        Get the fields of a packed block header.
+        :param idx: The index of the block in the chain.
+        :return: A tuple of the block's previous hash, body hash, Merkle root, timestamp, difficulty, entropy, nonce,
+        blob count, codec and target, which is None if the header doesn't have a target.
+        """
+        return self.__unpack(HEADER_FORMAT.unpack_from(self.data, idx * HEADER_SIZE))
+
+    @staticmethod
+    def __unpack(record):
+        prev_hash, body_hash, merkle_root, target, timestamp, difficulty, entropy, nonce, blob_count, codec = record
+        target = int.from_bytes(target, "big") if target != EMPTY_HASH else None
+        return (unpack_hash(prev_hash), body_hash, unpack_hash(merkle_root), timestamp, difficulty, entropy, nonce,
+                blob_count, codec, target)
+
+    def block(self, idx):
+        """
+        Create the header only block for a packed block header.
+        :param idx: The index of the block in the chain.
+        :return: The block without its body data.
+        """
+        prev_hash, body_hash, merkle_root, timestamp, difficulty, entropy, nonce, blob_count, codec, target = \
+            self.header(idx)
+        return Block(prev_hash, difficulty, None, timestamp, entropy, nonce, body_hash, codec, merkle_root, blob_count,
+                     target)
+
+    def hashes(self, executor=None):
+        """
+        Compute the hash of every block in the chain from its packed header.
+        :param executor: The pool of worker processes created by create_executor to hash segments of the chain in or
+            None to hash the whole chain in the calling thread.
+        :return: The concatenated 32 byte block hashes in order.
+        """
+        # Chains too short to give every worker a whole segment are split evenly across the workers instead
+        segment_size = min(SEGMENT_SIZE, max(-(-self.length // VERIFY_WORKERS), MIN_SEGMENT_SIZE))
+        if executor is None or self.length <= segment_size:
+            return hash_headers(self.data)
+
+        segment_bytes = segment_size * HEADER_SIZE
+        segments = [self.data[start:start + segment_bytes] for start in range(0, len(self.data), segment_bytes)]
+        return b''.join(executor.map(hash_headers, segments))
+
+    def verify(self, executor=None, prev_hash=None):
+        """
+        Verify that the chain starts with the genesis block, that every block links to the hash of the block before it
+        and that every block's hash is below its target. The block hashes are computed in parallel segments and the
+        links between blocks, including those at segment boundaries, are checked afterwards.
+        :param executor: The pool of worker processes created by create_executor to hash segments of the chain in or
+            None to hash the whole chain in the calling thread.
+        :param prev_hash: The hash of the block before the first block if the headers continue a chain that has
+            already been verified or None if the headers start with the genesis block.
+        :return: The index of the first invalid block or None if the whole chain is valid.
+        """
+        if self.length == 0:
+            return 0
+
+        hashes = self.hashes(executor)
+        if prev_hash is None and hashes[:32] != Block.genesis().hash():
+            return 0
+
+        if numpy is None:
+            for idx in range(self.length):
+                header = self.header(idx)
+                if idx > 0:
+                    prev_hash = hashes[(idx - 1) * 32:idx * 32]
+                if prev_hash is not None and header[0] != prev_hash:
+                    return idx
+                target = header[9] if header[9] is not None else difficulty_target(header[4])
+                if int.from_bytes(hashes[idx * 32:(idx + 1) * 32], "big") >= target:
+                    return idx
+            return None
+
+        records = numpy.frombuffer(self.data, dtype=HEADER_DTYPE)
+        digests = numpy.frombuffer(hashes, dtype=numpy.uint8).reshape(-1, 32)
+
+        # The block is linked if its previous hash matches the hash of the block before it
+        linked = numpy.ones(self.length, dtype=bool)
+        linked[1:] = (records["prev_hash"][1:] == digests[:-1]).all(axis=1)
+        if prev_hash is not None:
+            linked[0] = self.header(0)[0] == prev_hash
+
+        # Headers without a target use the target with the single bit after the difficulty's leading 0 bits set
+        targets = records["target"].copy()
+        untargeted = ~targets.any(axis=1)
+        difficulty = records["difficulty"].astype(numpy.int64)
+        bit = difficulty - 1
+        rows = numpy.flatnonzero(untargeted & (difficulty > 0) & (difficulty <= HASH_BITS))
+        targets[rows, bit[rows] // 8] = 0x80 >> (bit[rows] % 8)
+
+        # The hash is below the target if it is smaller at the first byte where the two differ
+        differs = digests != targets
+        first = numpy.where(differs.any(axis=1), differs.argmax(axis=1), 0)
+        rows = numpy.arange(self.length)
+        mined = differs.any(axis=1) & (digests[rows, first] < targets[rows, first])
+
+        # A difficulty of 0 accepts every hash, which is a target too large to be packed
+        mined |= untargeted & (difficulty == 0)
+
+        invalid = numpy.flatnonzero(~(linked & mined))
+        if len(invalid) > 0:
+            return int(invalid[0])
+        return None
@@ -0,0 +1,402 @@
+import argparse
+import json
+import queue
+import random
+import socket
+import sys
+import threading
+import time
+from secrets import token_hex
+
+"""
+The ports of the input server that blobs are submitted to and the subscription server that mined blocks are
+pushed from when an address doesn't include a port.
+"""
+INPUT_PORT = 9999
+SUBSCRIPTION_PORT = 9997
+
+"""
+The percentiles of each latency that are reported.
+"""
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+def parse_address(address, default_port):
+    """
+    Parse an address of the form host or host:port.
+    :param address: The address.
+    :param default_port: The port used if the address doesn't include one.
+    :return: The (host, port) tuple.
+    :except: If the port isn't an integer then a ValueError is thrown.
+    """
+    host, sep, port = address.rpartition(":")
+    if not sep:
+        return address, default_port
+    return host, int(port)
+
+
+def percentile(values, p):
+    """
+    Get a percentile of a list of values using the nearest rank.
+    :param values: The sorted list of values.
+    :param p: The percentile between 0 and 100.
+    :return: The value at the percentile or None if the list is empty.
+    """
+    if len(values) == 0:
+        return None
+    rank = max(int(-(-p * len(values) // 100)), 1)
+    return values[min(rank, len(values)) - 1]
+
+
+def summarize(values):
+    """
+    Summarize a list of latencies.
+    :param values: The latencies in seconds.
+    :return: The dictionary of the number of latencies, their mean, maximum and percentiles.
+    """
+    values = sorted(values)
+    summary = {"count": len(values),
+               "mean": sum(values) / len(values) if len(values) > 0 else None,
+               "max": values[-1] if len(values) > 0 else None}
+    for p in PERCENTILES:
+        summary["p%g" % p] = percentile(values, p)
+    return summary
+
+
+def is_ack(line):
+    """
+    Determine if an input server's reply acknowledges that it accepted a blob. An accepted blob is answered with its
+    hex encoded digest while a rejected one is answered with an error line.
+    :param line: The line the input server replied with.
+    :return: True if the line is a complete hex encoded digest; otherwise, False.
+    """
+    if not line.endswith(b'\n'):
+        return False
+    digest = line.rstrip(b'\r\n')
+    if len(digest) != 64:
+        return False
+    try:
+        bytes.fromhex(digest.decode("ascii"))
+    except ValueError:
+        return False
+    return True
+
+
+class SizeDistribution:
+    """
+    The distribution that the size of each submitted blob is drawn from. The distribution is either fixed:SIZE,
+    uniform:MIN:MAX or exp:MEAN with sizes in bytes.
+    """
+
+    def __init__(self, spec):
+        """
+        Parse a size distribution.
+        :param spec: The distribution of the form fixed:SIZE, uniform:MIN:MAX or exp:MEAN.
+        :return: None
+        :except: If the distribution isn't one of the supported forms then a ValueError is thrown.
+        """
+        parts = spec.split(":")
+        self.kind = parts[0]
+        self.params = [int(param) for param in parts[1:]]
+        expected = {"fixed": 1, "uniform": 2, "exp": 1}
+        if self.kind not in expected or len(self.params) != expected[self.kind] or min(self.params) < 0:
+            raise ValueError("Expected a size distribution of the form fixed:SIZE, uniform:MIN:MAX or exp:MEAN")
+        self.spec = spec
+
+    def sample(self, rng):
+        """
+        Draw a blob size from the distribution.
+        :param rng: The random number generator.
+        :return: The size in bytes.
+        """
+        if self.kind == "fixed":
+            return self.params[0]
+        if self.kind == "uniform":
+            return rng.randint(self.params[0], self.params[1])
+        return int(rng.expovariate(1.0 / max(self.params[0], 1)))
+
+
+class LoadGenerator:
+    """
+    The load generator that submits blobs to the input servers of a network of nodes at a controlled rate and
+    measures how long each blob takes to be included in a mined block. Every blob is a line of JSON tagged with the
+    run's identifier and the blob's sequence number so that it can be recognized in the blocks pushed by each node's
+    subscription server. Blobs are scheduled at fixed intervals and latencies are measured from the scheduled time,
+    so a network that can't keep up shows up as latency rather than as a lower submission rate.
+    """
+
+    def __init__(self, inputs, nodes, rate, duration, concurrency, sizes, drain, seed=None):
+        """
+        Create a new load generator.
+        :param inputs: The (host, port) addresses of the input servers that blobs are submitted to in turn.
+        :param nodes: The (host, port) addresses of the subscription servers of every node in the network.
+        :param rate: The number of blobs submitted each second.
+        :param duration: The number of seconds to submit blobs for.
+        :param concurrency: The number of connections that blobs are submitted on at once.
+        :param sizes: The SizeDistribution of the blobs.
+        :param drain: The number of seconds to wait after the last submission for blobs to propagate.
+        :param seed: The seed of the random number generator for blob sizes.
+        :return: None
+        """
+        self.inputs = inputs
+        self.nodes = nodes
+        self.rate = rate
+        self.duration = duration
+        self.concurrency = concurrency
+        self.sizes = sizes
+        self.drain = drain
+        self.rng = random.Random(seed)
+        self.run_id = token_hex(4)
+
+        self.lock = threading.Lock()
+        self.stopped = threading.Event()
+
+        # The scheduled, submitted and acknowledged times of each blob keyed by its sequence number
+        self.scheduled = {}
+        self.submitted = {}
+        self.acked = {}
+
+        # The time each blob was first seen in a block keyed by its sequence number for each node
+        self.included = [{} for _ in nodes]
+
+        self.errors = 0
+        self.bytes = 0
+        self.connected = threading.Barrier(len(nodes) + 1)
+
+    def run(self):
+        """
+        Run the load test until every blob has propagated to every node or the drain time has passed.
+        :return: The results dictionary.
+        """
+        subscribers = [threading.Thread(target=self.subscribe, args=(idx, node), daemon=True)
+                       for idx, node in enumerate(self.nodes)]
+        for subscriber in subscribers:
+            subscriber.start()
+        try:
+            self.connected.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+
+        work = queue.Queue(self.concurrency * 4)
+        workers = [threading.Thread(target=self.submit, args=(work,), daemon=True) for _ in range(self.concurrency)]
+        for worker in workers:
+            worker.start()
+
+        count = int(self.rate * self.duration)
+        start = time.time()
+        for seq in range(count):
+            due = start + seq / self.rate
+            delay = due - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            self.scheduled[seq] = due
+            work.put(seq)
+        for _ in workers:
+            work.put(None)
+        for worker in workers:
+            worker.join()
+        submit_end = time.time()
+
+        deadline = submit_end + self.drain
+        while time.time() < deadline and not self.__propagated():
+            time.sleep(0.1)
+        self.stopped.set()
+
+        return self.results(start, submit_end)
+
+    def __propagated(self):
+        with self.lock:
+            return all(seq in included for included in self.included for seq in self.acked)
+
+    def submit(self, work):
+        """
+        Submit scheduled blobs to the input servers until there are none left.
+        :param work: The queue of sequence numbers of the blobs to submit which ends with None.
+        :return: None
+        """
+        while True:
+            seq = work.get()
+            if seq is None:
+                return
+
+            with self.lock:
+                size = self.sizes.sample(self.rng)
+            blob = json.dumps({"loadgen": self.run_id, "seq": seq, "pad": ""})
+            blob = blob[:-2] + "x" * max(size - len(blob) - 1, 0) + blob[-2:] + "\n"
+
+            submitted = time.time()
+            try:
+                with socket.create_connection(self.inputs[seq % len(self.inputs)], timeout=30) as s:
+                    s.sendall(blob.encode())
+                    ack = s.makefile("rb").readline()
+            except OSError:
+                ack = b''
+
+            with self.lock:
+                self.submitted[seq] = submitted
+                if is_ack(ack):
+                    self.acked[seq] = time.time()
+                    self.bytes += len(blob)
+                else:
+                    self.errors += 1
+
+    def subscribe(self, idx, node):
+        """
+        Record when each blob is first seen in a block pushed by a node's subscription server.
+        :param idx: The index of the node.
+        :param node: The (host, port) address of the node's subscription server.
+        :return: None
+        """
+        try:
+            s = socket.create_connection(node, timeout=10)
+        except OSError as err:
+            print("Unable to subscribe to %s:%d: %s" % (node[0], node[1], err), file=sys.stderr)
+            self.connected.abort()
+            return
+
+        try:
+            self.connected.wait(timeout=10)
+        except threading.BrokenBarrierError:
+            pass
+
+        # The socket times out regularly so that the subscriber stops once the load test is done
+        s.settimeout(0.5)
+        data = b''
+        with s:
+            while not self.stopped.is_set():
+                try:
+                    segment = s.recv(65536)
+                except socket.timeout:
+                    continue
+                except OSError:
+                    return
+                if segment == b'':
+                    return
+
+                now = time.time()
+                lines = (data + segment).split(b'\n')
+                data = lines.pop()
+                for line in lines:
+                    self.receive_event(idx, line, now)
+
+    def receive_event(self, idx, line, now):
+        """
+        Record the blobs of the load test in a block event pushed by a node's subscription server.
+        :param idx: The index of the node.
+        :param line: The line of JSON of the event.
+        :param now: The time the event was received at.
+        :return: None
+        """
+        try:
+            event = json.loads(line)
+        except ValueError:
+            return
+        if not isinstance(event, dict) or event.get("type") != "block":
+            return
+
+        # Blocks pushed by light nodes don't have their bodies
+        blobs = event["block"].get("blobs")
+        if blobs is None:
+            return
+
+        for blob in blobs:
+            try:
+                tag = json.loads(blob["blob"])
+            except ValueError:
+                continue
+            if isinstance(tag, dict) and tag.get("loadgen") == self.run_id:
+                with self.lock:
+                    self.included[idx].setdefault(tag["seq"], now)
+
+    def results(self, start, submit_end):
+        """
+        Compute the throughput and latencies of the load test.
+        :param start: The time that the first blob was scheduled at.
+        :param submit_end: The time that the last blob was acknowledged at.
+        :return: The results dictionary.
+        """
+        with self.lock:
+            acked = dict(self.acked)
+            included = [dict(node_included) for node_included in self.included]
+
+        inclusion = []
+        propagation = []
+        last_inclusion = start
+        for seq in acked:
+            seen = [node_included[seq] for node_included in included if seq in node_included]
+            if len(seen) > 0:
+                inclusion.append(min(seen) - self.scheduled[seq])
+                last_inclusion = max(last_inclusion, min(seen))
+            if len(seen) == len(included):
+                propagation.append(max(seen) - self.scheduled[seq])
+
+        submit_time = max(submit_end - start, 1e-9)
+        return {
+            "config": {
+                "inputs": ["%s:%d" % address for address in self.inputs],
+                "nodes": ["%s:%d" % address for address in self.nodes],
+                "rate": self.rate,
+                "duration": self.duration,
+                "concurrency": self.concurrency,
+                "sizes": self.sizes.spec,
+                "drain": self.drain,
+            },
+            "run_id": self.run_id,
+            "scheduled": len(self.scheduled),
+            "acked": len(acked),
+            "errors": self.errors,
+            "included": len(inclusion),
+            "propagated": len(propagation),
+            "submit_throughput": len(acked) / submit_time,
+            "submit_bytes_per_second": self.bytes / submit_time,
+            "inclusion_throughput": len(inclusion) / max(last_inclusion - start, 1e-9),
+            "latency": {
+                "submit_to_ack": summarize([acked[seq] - self.scheduled[seq] for seq in acked]),
+                "submit_to_inclusion": summarize(inclusion),
+                "submit_to_propagation": summarize(propagation),
+            },
+        }
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Submit blobs to a network of nodes at a controlled rate and "
+                                                 "measure how long they take to be mined and propagated.")
+    parser.add_argument("--input", action="append", default=[], metavar="HOST[:PORT]",
+                        help="An input server to submit blobs to in turn. May be repeated. Defaults to localhost.")
+    parser.add_argument("--node", action="append", default=[], metavar="HOST[:PORT]",
+                        help="The subscription server of a node in the network that inclusion is measured on. "
+                             "May be repeated. Defaults to localhost.")
+    parser.add_argument("--rate", type=float, default=10.0, help="The number of blobs submitted each second.")
+    parser.add_argument("--duration", type=float, default=60.0, help="The number of seconds to submit blobs for.")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="The number of connections that blobs are submitted on at once.")
+    parser.add_argument("--size", default="fixed:256", type=SizeDistribution,
+                        help="The blob size distribution in bytes: fixed:SIZE, uniform:MIN:MAX or exp:MEAN.")
+    parser.add_argument("--drain", type=float, default=120.0,
+                        help="The number of seconds to wait after the last submission for blobs to propagate.")
+    parser.add_argument("--seed", type=int, help="The seed for blob sizes.")
+    parser.add_argument("--output", metavar="PATH", help="The file to write the JSON results to instead of stdout.")
+    options = parser.parse_args(args[1:])
+
+    if options.rate <= 0 or options.duration <= 0 or options.concurrency <= 0:
+        parser.error("The rate, duration and concurrency must be positive.")
+    try:
+        inputs = [parse_address(address, INPUT_PORT) for address in options.input or ["127.0.0.1"]]
+        nodes = [parse_address(address, SUBSCRIPTION_PORT) for address in options.node or ["127.0.0.1"]]
+    except ValueError:
+        parser.error("Expected addresses of the form HOST[:PORT].")
+
+    generator = LoadGenerator(inputs, nodes, options.rate, options.duration, options.concurrency, options.size,
+                              options.drain, options.seed)
+    results = json.dumps(generator.run(), indent=2)
+
+    if options.output is None:
+        print(results)
+    else:
+        with open(options.output, "w") as f:
+            f.write(results + "\n")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -0,0 +1,135 @@
+import copy
+import logging
+import queue
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+"""
+The format of every log line.
+"""
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+"""
+The number of debug and info messages with the same format string that can be logged each second, and the number
+that can be logged in a burst, before the rest are dropped.
+"""
+RATE_LIMIT = 10.0
+RATE_LIMIT_BURST = 50
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    The handler that puts log records on a queue to be formatted and written by a background thread. Unlike the
+    standard queue handler, the message isn't formatted before the record is queued, so the thread that logged the
+    record only pays to create it. Arguments passed to log calls must not be changed after the call.
+    """
+
+    def prepare(self, record):
+        """
+        Prepare a record to be queued by copying it so that handlers can't see changes made by other handlers.
+        The traceback of an exception is formatted now because the frames may not be alive when the record is
+        written.
+        :param record: The log record.
+        :return: The record to be queued.
+        """
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record = copy.copy(record)
+        record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    The filter that drops debug and info messages that are logged too often, such as messages logged for every
+    blob, so that a burst of messages can't fill the log queue. Each format string has its own token bucket, and
+    the number of dropped messages is added to the next message with the same format string that is logged.
+    Warnings and errors are never dropped.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_LIMIT_BURST):
+        """
+        Create a new rate limit filter.
+        :param rate: The number of messages with the same format string that can be logged each second.
+        :param burst: The number of messages with the same format string that can be logged in a burst.
+        :return: None
+        """
+        logging.Filter.__init__(self)
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+
+        # The (tokens, time last updated, dropped messages) tuples keyed by the logger name and format string
+        self.buckets = {}
+
+    def filter(self, record):
+        """
+        Determine if a record should be logged.
+        :param record: The log record.
+        :return: True if the record should be logged; otherwise, False.
+        """
+        if record.levelno > logging.INFO:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            tokens, updated, dropped = self.buckets.get(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self.buckets[key] = (tokens, now, dropped + 1)
+                return False
+            self.buckets[key] = (tokens - 1, now, 0)
+
+        if dropped > 0:
+            record.msg = "%s (dropped %d similar messages)" % (record.msg, dropped)
+        return True
+
+
+def parse_module_levels(specs):
+    """
+    Parse the log levels of individual modules.
+    :param specs: The list of strings of the form module=LEVEL.
+    :return: The dictionary of log levels keyed by module name.
+    :except: If a string isn't of the form module=LEVEL with a known level then a ValueError is thrown.
+    """
+    levels = {}
+    for spec in specs:
+        module, sep, level = spec.partition("=")
+        if not sep or not module or not isinstance(logging.getLevelName(level.upper()), int):
+            raise ValueError("Expected a module log level of the form module=LEVEL: %s" % spec)
+        levels[module] = level.upper()
+    return levels
+
+
+def configure(level=logging.INFO, module_levels=None, stream=sys.stderr):
+    """
+    Configure logging so that records are queued by the thread that logs them and written to the stream by a
+    background thread. Debug and info messages are rate limited.
+    :param level: The log level of the root logger that all modules use unless configured otherwise.
+    :param module_levels: The dictionary of log levels keyed by the name of the module whose logger they're set on.
+    :param stream: The stream that log lines are written to.
+    :return: The started listener that writes the queued records which should be stopped when the node exits to
+    flush any remaining records.
+    """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+
+    records = queue.Queue()
+    queue_handler = DeferredQueueHandler(records)
+    queue_handler.addFilter(RateLimitFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    for module, module_level in (module_levels or {}).items():
+        logging.getLogger(module).setLevel(module_level)
+
+    listener = QueueListener(records, handler, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+import util
+
+
+class Mempool:
+    """
+    The pool of blobs that have been received but not yet mined into a block. Blobs are kept in the order they
+    were received so that the oldest blobs are included in blocks first, and the total size of the pool is capped
+    so that memory use stays bounded during bursts of incoming data.
+    """
+
+    def __init__(self, max_size):
+        """
+        Create a new empty mempool.
+        :param max_size: The maximum total size in bytes of all blobs that can be pending at once.
+        :return: None
+        """
+        self.max_size = max_size
+        self.size = 0
+
+        # The pending blobs keyed by their digest in the order they were received
+        self.blobs = OrderedDict()
+
+    def __len__(self):
+        return len(self.blobs)
+
+    def __contains__(self, digest):
+        return digest in self.blobs
+
+    def __iter__(self):
+        return iter(self.blobs.values())
+
+    def add(self, blob, digest=None):
+        """
+        Add a blob to the end of the pool.
+        :param blob: The encoded BlobMessage protocol buffer to be added.
+        :param digest: The blob's digest if it has already been computed.
+        :return: True if the blob was added; otherwise, False if it was already pending or the pool is full.
+        """
+        if digest is None:
+            digest = util.blob_digest(blob)
+
+        if digest in self.blobs or self.size + len(blob) > self.max_size:
+            return False
+
+        self.blobs[digest] = blob
+        self.size += len(blob)
+        return True
+
+    def restore(self, blobs):
+        """
+        Return blobs to the front of the pool ahead of any newer blobs. This is used when the blocks that included
+        the blobs were removed from the chain so the blobs should be mined again before blobs received after them.
+        Restored blobs are added even if the pool is full, and the newest blobs are evicted from the end of the pool
+        until it is back within its size limit.
+        :param blobs: The list of (digest, blob) tuples in the order they should be mined.
+        :return: The list of (digest, blob) tuples of the blobs that were evicted.
+        """
+        for digest, blob in reversed(blobs):
+            if digest in self.blobs:
+                continue
+            self.blobs[digest] = blob
+            self.blobs.move_to_end(digest, last=False)
+            self.size += len(blob)
+
+        evicted = []
+        while self.size > self.max_size:
+            digest, blob = self.blobs.popitem()
+            self.size -= len(blob)
+            evicted.append((digest, blob))
+        return evicted
+
+    def remove(self, digest):
+        """
+        Remove a blob from the pool if it is pending.
+        :param digest: The digest of the blob to be removed.
+        :return: True if the blob was pending and removed; otherwise, False.
+        """
+        blob = self.blobs.pop(digest, None)
+        if blob is None:
+            return False
+
+        self.size -= len(blob)
+        return True
+
+    def remove_all(self, digests):
+        """
+        Remove every blob in the collection from the pool. This is used when blobs have been included in a block.
+        :param digests: The collection of digests of the blobs to be removed.
+        :return: None
+        """
+        for digest in digests:
+            self.remove(digest)
+
+    def take(self, max_size):
+        """
+        Get the oldest pending blobs that fit within the provided size limit without removing them from the pool.
+        Blobs are taken strictly in the order they were received, stopping at the first blob that doesn't fit.
+        :param max_size: The maximum total size in bytes of the blobs to be returned.
+        :return: A list of (digest, blob) tuples for the oldest encoded BlobMessage protocol buffers that fit within
+        the size limit.
+        """
+        blobs = []
+        size = 0
+        for digest, blob in self.blobs.items():
+            if size + len(blob) > max_size:
+                break
+            blobs.append((digest, blob))
+            size += len(blob)
+        return blobs
@@ -0,0 +1,149 @@
+from hashlib import sha256
+
+"""
+The prefixes used to separate the hashes of leaves from the hashes of interior nodes so that an interior node
+can never be passed off as a leaf.
+"""
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+
+
+def leaf_hash(digest):
+    """
+    Compute the hash of a leaf of the tree.
+    :param digest: The digest of the blob stored in the leaf.
+    :return: The leaf's hash.
+    """
+    return sha256(LEAF_PREFIX + digest).digest()
+
+
+def node_hash(left, right):
+    """
+    Compute the hash of an interior node of the tree.
+    :param left: The hash of the node's left child.
+    :param right: The hash of the node's right child.
+    :return: The node's hash.
+    """
+    return sha256(NODE_PREFIX + left + right).digest()
+
+
+def split_point(size):
+    """
+    Get the number of leaves in the left subtree of a tree, which is the largest power of two less than its size.
+    :param size: The number of leaves in the tree which must be greater than 1.
+    :return: The number of leaves in the left subtree.
+    """
+    return 1 << ((size - 1).bit_length() - 1)
+
+
+class MerkleTree:
+    """
+    The Merkle tree over the digests of the blobs in a block's body. The tree allows the inclusion of a single blob
+    in a block to be proven using a logarithmic number of hashes. Leaves can be appended incrementally, keeping
+    only the roots of the perfect subtrees on the right edge of the tree to compute the root.
+    """
+
+    def __init__(self, digests=()):
+        """
+        Create a new tree.
+        :param digests: The digests of the blobs to be added to the tree in order.
+        :return: None
+        """
+        self.leaves = []
+
+        # The (size, hash) tuples of the perfect subtrees along the right edge of the tree in decreasing size
+        self.frontier = []
+
+        for digest in digests:
+            self.append(digest)
+
+    def __len__(self):
+        return len(self.leaves)
+
+    def append(self, digest):
+        """
+        Append a leaf to the tree.
+        :param digest: The digest of the blob to be added.
+        :return: None
+        """
+        node = leaf_hash(digest)
+        self.leaves.append(node)
+
+        size = 1
+        while len(self.frontier) > 0 and self.frontier[-1][0] == size:
+            left_size, left = self.frontier.pop()
+            node = node_hash(left, node)
+            size += left_size
+        self.frontier.append((size, node))
+
+    def root(self):
+        """
+        Compute the root hash of the tree.
+        :return: The root hash or an empty byte string if the tree has no leaves.
+        """
+        if len(self.frontier) == 0:
+            return b''
+
+        root = self.frontier[-1][1]
+        for _, node in reversed(self.frontier[:-1]):
+            root = node_hash(node, root)
+        return root
+
+    def proof(self, idx):
+        """
+        Compute the proof that a leaf is included in the tree. The proof consists of the hashes of the siblings
+        of each node on the path from the leaf to the root, starting with the leaf's sibling.
+        :param idx: The index of the leaf.
+        :return: The list of sibling hashes.
+        """
+        return self.__proof(idx, 0, len(self.leaves))
+
+    def __proof(self, idx, start, end):
+        if end - start <= 1:
+            return []
+
+        k = split_point(end - start)
+        if idx < start + k:
+            return self.__proof(idx, start, start + k) + [self.__subtree_root(start + k, end)]
+        return self.__proof(idx, start + k, end) + [self.__subtree_root(start, start + k)]
+
+    def __subtree_root(self, start, end):
+        if end - start == 1:
+            return self.leaves[start]
+
+        k = split_point(end - start)
+        return node_hash(self.__subtree_root(start, start + k), self.__subtree_root(start + k, end))
+
+
+def verify_proof(digest, idx, size, proof, root):
+    """
+    Verify that a blob is included in a block using only the block's header.
+    :param digest: The digest of the blob.
+    :param idx: The position of the blob in the block's body.
+    :param size: The number of blobs in the block's body.
+    :param proof: The list of sibling hashes from the leaf to the root.
+    :param root: The Merkle root from the block's header.
+    :return: True if the proof shows the blob is included in the block; otherwise, False.
+    """
+    if idx >= size:
+        return False
+
+    fn = idx
+    sn = size - 1
+    node = leaf_hash(digest)
+    for sibling in proof:
+        if sn == 0:
+            return False
+
+        if fn & 1 or fn == sn:
+            node = node_hash(sibling, node)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            node = node_hash(node, sibling)
+
+        fn >>= 1
+        sn >>= 1
+
+    return sn == 0 and node == root
@@ -0,0 +1,243 @@
+import threading
+
+"""
+The upper bounds of the histogram buckets in seconds used for latencies when no buckets are provided.
+"""
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def format_labels(names, values, extra=()):
+    """
+    Format the labels of a sample in the text exposition format.
+    :param names: The names of the metric's labels.
+    :param values: The values of the labels in the same order as their names.
+    :param extra: Additional (name, value) tuples to append to the labels.
+    :return: The formatted labels including the braces or an empty string if there are no labels.
+    """
+    labels = list(zip(names, values)) + list(extra)
+    if len(labels) == 0:
+        return ""
+
+    escaped = (str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, value in labels)
+    return "{" + ",".join("%s=\"%s\"" % (name, value) for (name, _), value in zip(labels, escaped)) + "}"
+
+
+def format_value(value):
+    """
+    Format the value of a sample in the text exposition format.
+    :param value: The integer or float value.
+    :return: The formatted value.
+    """
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Metric:
+    """
+    A named metric that is exposed when the node is scraped. A metric holds a value for every combination of the
+    values of its labels, and can instead read its value from a function when the scrape happens so that sizes
+    that are already tracked elsewhere in the node don't need to be updated in two places.
+    """
+
+    """
+    The type of the metric in the text exposition format. Set when subclassing this class.
+    """
+    TYPE = "untyped"
+
+    def __init__(self, name, description, label_names=(), function=None):
+        """
+        Create a new metric.
+        :param name: The name of the metric.
+        :param description: The help text describing what the metric measures.
+        :param label_names: The names of the labels that the metric's values are split by.
+        :param function: The function that is called to get the metric's value when scraped or None if the value is
+            updated by the metric's methods.
+        :return: None
+        """
+        self.name = name
+        self.description = description
+        self.label_names = tuple(label_names)
+        self.function = function
+        self.lock = threading.Lock()
+
+        # The values of the metric keyed by the tuple of the values of its labels
+        # Metrics without labels start at 0 so that they are exposed before they are first updated
+        self.values = {}
+        if len(self.label_names) == 0:
+            self.values[()] = 0
+
+    def samples(self):
+        """
+        Get the samples of the metric that are exposed when the node is scraped.
+        :return: A list of (name suffix, label values, extra labels, value) tuples.
+        """
+        if self.function is not None:
+            return [("", (), (), self.function())]
+
+        with self.lock:
+            return [("", labels, (), value) for labels, value in sorted(self.values.items())]
+
+    def expose(self):
+        """
+        Format the metric in the text exposition format.
+        :return: The lines of the metric's help, type and samples.
+        """
+        lines = ["# HELP %s %s" % (self.name, self.description), "# TYPE %s %s" % (self.name, self.TYPE)]
+        for suffix, labels, extra, value in self.samples():
+            lines.append("%s%s%s %s" % (self.name, suffix, format_labels(self.label_names, labels, extra),
+                                        format_value(value)))
+        return lines
+
+
+class Counter(Metric):
+    """
+    A metric that counts events and only ever increases.
+    """
+
+    TYPE = "counter"
+
+    def inc(self, amount=1, labels=()):
+        """
+        Increase the counter.
+        :param amount: The amount to increase the counter by.
+        :param labels: The values of the counter's labels.
+        :return: None
+        """
+        with self.lock:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    A metric that holds a value that can go up and down.
+    """
+
+    TYPE = "gauge"
+
+    def set(self, value, labels=()):
+        """
+        Set the gauge's value.
+        :param value: The new value.
+        :param labels: The values of the gauge's labels.
+        :return: None
+        """
+        with self.lock:
+            self.values[labels] = value
+
+
+class Histogram(Metric):
+    """
+    A metric that counts observed values in buckets so that their distribution can be estimated.
+    """
+
+    TYPE = "histogram"
+
+    def __init__(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Create a new histogram.
+        :param name: The name of the metric.
+        :param description: The help text describing what the metric measures.
+        :param label_names: The names of the labels that the metric's values are split by.
+        :param buckets: The sorted upper bounds of the buckets.
+        :return: None
+        """
+        Metric.__init__(self, name, description, label_names)
+        self.buckets = tuple(buckets)
+        if len(self.label_names) == 0:
+            self.values[()] = [0] * (len(self.buckets) + 2)
+
+    def observe(self, value, labels=()):
+        """
+        Record an observed value.
+        :param value: The observed value.
+        :param labels: The values of the histogram's labels.
+        :return: None
+        """
+        with self.lock:
+            counts = self.values.get(labels)
+            if counts is None:
+                # The count of each bucket followed by the count of all values and their sum
+                counts = self.values[labels] = [0] * (len(self.buckets) + 2)
+
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += 1
+            counts[-1] += value
+
+    def samples(self):
+        with self.lock:
+            values = [(labels, list(counts)) for labels, counts in sorted(self.values.items())]
+
+        samples = []
+        for labels, counts in values:
+            for bound, count in zip(self.buckets, counts):
+                samples.append(("_bucket", labels, (("le", format_value(float(bound))),), count))
+            samples.append(("_bucket", labels, (("le", "+Inf"),), counts[-2]))
+            samples.append(("_count", labels, (), counts[-2]))
+            samples.append(("_sum", labels, (), counts[-1]))
+        return samples
+
+
+class MetricsRegistry:
+    """
+    The registry of all metrics of the node that are exposed in the text exposition format when the node is
+    scraped. Metrics are updated by the parts of the node that they measure and only formatted when scraped.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+
+        # The registered metrics keyed by their name in the order they were registered
+        self.metrics = {}
+
+    def __getitem__(self, name):
+        return self.metrics[name]
+
+    def register(self, metric):
+        """
+        Register a metric so that it is exposed when the node is scraped.
+        :param metric: The metric to be registered.
+        :return: The registered metric.
+        :except: If a metric with the same name is already registered then a ValueError is thrown.
+        """
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError("Metric already registered: %s" % metric.name)
+            self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, description, label_names=(), function=None):
+        """
+        Create and register a counter.
+        :return: The registered counter.
+        """
+        return self.register(Counter(name, description, label_names, function))
+
+    def gauge(self, name, description, label_names=(), function=None):
+        """
+        Create and register a gauge.
+        :return: The registered gauge.
+        """
+        return self.register(Gauge(name, description, label_names, function))
+
+    def histogram(self, name, description, label_names=(), buckets=DEFAULT_BUCKETS):
+        """
+        Create and register a histogram.
+        :return: The registered histogram.
+        """
+        return self.register(Histogram(name, description, label_names, buckets))
+
+    def expose(self):
+        """
+        Format every registered metric in the text exposition format.
+        :return: The text exposition of all metrics.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.expose())
+        return "\n".join(lines) + "\n"
@@ -1,9 +1,16 @@
 import logging
-import math
 import threading
 import time
 
+import util
+from block import BlockBuilder, target_difficulty
 from chain import Chain
+from fork_cache import ForkCache
+from mempool import Mempool
+from protos import block_pb2
+from retarget import Retarget
+
+logger = logging.getLogger(__name__)
 
 
 class Miner:
@@ -20,33 +27,99 @@ class Miner:
     """
     DIFFICULTY_TARGET = 15.0
 
+    """
+    The maximum total size in bytes of the blobs that can be included in a single block. Mined blocks too large for
+    a single datagram are sent to peers over TCP instead.
+    """
+    BLOCK_SIZE_LIMIT = 1 << 20
+
+    """
+    The maximum total size in bytes of the blobs that can be waiting to be included in a block.
+    """
+    MEMPOOL_SIZE_LIMIT = 64 << 20
+
+    """
+    The codec used to compress the body of each mined block.
+    """
+    BODY_CODEC = block_pb2.ZLIB
+
     def get_resolution_chain(self):
         """
-        Returns the binary encoded chain without the block bodies that can be used
+        Returns the chain's block headers packed into fixed width records that can be used
         to resolve a node with a lower cost chain that needs to catch up.
-        :return: The binary encoded resolution chain.
+        :return: The packed block headers of the resolution chain.
+        """
+        return self.snapshot.pack_headers()
+
+    def __init__(self, block_size_limit=BLOCK_SIZE_LIMIT, mempool_size_limit=MEMPOOL_SIZE_LIMIT, codec=BODY_CODEC,
+                 light=False, verify_executor=None):
+        """
+        Initialize a new miner starting from a chain containing only the genesis block.
+        :param block_size_limit: The maximum total size in bytes of the blobs in each mined block.
+        :param mempool_size_limit: The maximum total size in bytes of the blobs waiting to be mined.
+        :param codec: The Codec used to compress the body of each mined block.
+        :param light: True if only the block headers of the chain should be tracked without mining; otherwise, False.
+        :param verify_executor: The pool of worker processes created by header_chain.create_executor that long
+            resolution chains are verified in or None to verify them in the calling thread.
+        :return: None
         """
-        return self.chain.encode(False)
+        self.block_size_limit = block_size_limit
+        self.codec = codec
 
-    def __init__(self):
+        # Light miners only store block headers and discard the body data of any blocks they receive
+        self.light = light
+        self.verify_executor = verify_executor
 
-        # the set of blobs that have yet to be validated
+        # the pool of blobs that have yet to be validated in the order they were received
         self.pending_blobs_lock = threading.Lock()
-        self.pending_blobs = set()
+        self.pending_blobs = Mempool(mempool_size_limit)
+
+        # The body of the next block to be mined that is built incrementally from the oldest pending blobs
+        self.template = None
+
+        # If all pending blobs fit in the template so newly received blobs can be appended to it
+        self.template_open = False
 
         self.chain_lock = threading.Lock()
 
         self.chain = Chain()
 
-        # The list of higher cost chains that need to be resolved to catch up the node
+        # The immutable snapshot of the current chain that is read without holding the chain lock
+        # The snapshot is replaced by a new one whenever the current chain changes
+        self.snapshot = self.chain.snapshot()
+
+        # The window of the most recent blocks in the current chain that the target of the next block is set from
+        self.retarget = Retarget(Miner.DIFFICULTY_TARGET)
+        self.retarget.reset(self.chain.blocks)
+
+        # The cache of higher cost chains that need to be resolved to catch up the node
         # All floating chains must be the same cost but there may be multiple due to ties
-        self.floating_chains = []
+        self.floating_chains = ForkCache()
 
         # The highest cost floating chain that is currently being resolved
         self.resolution_chain = None
 
         self.mine_event = []
 
+        # The handlers called with the block and its index whenever a block is added to the end of the current chain
+        self.add_event = []
+
+        # The handlers called with the fork index and the new chain whenever the current chain is replaced
+        self.reorg_event = []
+
+        # The handlers called with the new floating chain whenever a block starts a new fork
+        self.fork_event = []
+
+        # The handlers called with the encoded BlobMessage of every blob added to the pending blobs and with the block
+        # and chain cost of every block received from a peer. They are called while the lock that orders the event
+        # with the miner's other events is held
+        self.blob_event = []
+        self.receive_event = []
+
+        # The total number of hashes computed while mining and the hashes per second over the last mined block
+        self.hashes = 0
+        self.hash_rate = 0.0
+
         # If the block chain has been modified since mining started
         self.dirty = True
 
@@ -56,33 +129,59 @@ class Miner:
         This method never returns.
         :return: None
         """
+        cur = None
         while True:
+            start = time.time()
             while not self.dirty and not cur.is_valid():
                 cur.next()
 
+            # Every nonce up to and including the current one has been hashed
+            if cur is not None:
+                self.hashes += cur.get_nonce() + 1
+                elapsed = time.time() - start
+                if elapsed > 0:
+                    self.hash_rate = (cur.get_nonce() + 1) / elapsed
+
             with self.chain_lock:
                 if not self.dirty:
                     self.___add_block(cur)
                     self.__notify_handlers(cur)
 
-                logging.debug("Valid chain: %s Cost: %d", self.chain.is_valid(), self.chain.get_cost())
+                logger.debug("Chain length: %d Cost: %d", len(self.chain.blocks), self.chain.get_cost())
 
-                difficulty = self.__compute_difficulty()
+                target = self.retarget.next_target(self.chain.blocks[-1])
                 with self.pending_blobs_lock:
-                    cur = self.chain.next(difficulty, self.pending_blobs)
+                    cur = self.__next_block(target)
                 self.dirty = False
 
     def add(self, msg):
         """
-        Add a Blob Message to the set of pending blobs to be added to the body of the next block that is created.
+        Add a Blob Message to the pool of pending blobs to be added to the body of the next block that is created.
         :param msg: The Blob Message as an encoded BlobMessage protocol buffer object consisting of a timestamp
         and binary data.
-        :return: None
+        :return: True if the blob was added; otherwise, False if it is already pending or mined, it is too large to
+        fit in a block, or the pool of pending blobs is full.
         """
+        if len(msg) > self.block_size_limit:
+            return False
+
+        digest = util.blob_digest(msg)
+        if self.snapshot.contains_blob(digest):
+            return False
+
         with self.pending_blobs_lock:
-            if msg in self.pending_blobs:
+            if not self.pending_blobs.add(msg, digest):
                 return False
-            self.pending_blobs.add(msg)
+
+            for handler in self.blob_event:
+                handler(msg)
+
+            # Append the blob to the next block's body if it fits without skipping any older pending blobs
+            if self.template is not None and self.template_open:
+                if self.template.size + len(msg) <= self.block_size_limit:
+                    self.template.add(msg, digest)
+                else:
+                    self.template_open = False
         return True
 
     def receive_block(self, block, chain_cost):
@@ -92,25 +191,36 @@ class Miner:
         :param chain_cost: The total cost of the chain that the peer node is working on.
         :return: None
         """
-        logging.debug("Receive with cost: %s", chain_cost)
+        logger.debug("Receive with cost: %s", chain_cost)
+        if self.light:
+            block.clear_body()
+
         with self.chain_lock:
+            for handler in self.receive_event:
+                handler(block, chain_cost)
+
             cur = self.chain.blocks[-1]
             if chain_cost > self.chain.get_cost():
                 if not block.is_valid(cur.hash()):
                     return self.__add_floating_block(block)
 
-                logging.debug("Added valid remote block")
+                # The body is only verified once the header shows the block would extend the current chain
+                if not self.light and not block.has_body():
+                    logger.error("Error: Received block with a body that doesn't match its header")
+                    return None
+
+                logger.debug("Added valid remote block")
                 block.set_previous_hash(cur.hash())
                 self.___add_block(block)
                 self.dirty = True
 
             elif chain_cost == self.chain.get_cost() and block != cur:
-                logging.debug('Needs tie resolution')
+                logger.debug('Needs tie resolution')
                 return self.__add_floating_block(block)
 
             return None
 
-    def receive_resolution_chain(self, chain, res_chain):
+    def receive_resolution_chain(self, chain, res_chain, verified=False):
         """
         Handles a resolution chain from a peer node in the network. This is a chain only consisting of block headers
         with no block data that has been discovered to have a higher cost than the chain that is currently being
@@ -120,8 +230,15 @@ class Miner:
         missing all block's between the genesis block and the head.
         :param res_chain: The chain used to complete the potentially higher cost chain consisting of the block
         headers for all blocks in the chain.
+        :param verified: True if the resolution chain's block headers were already verified so only the link to the
+        floating blocks needs to be checked; otherwise, False to verify the whole combined chain.
         :return: True if combining the two chains resulted in a valid chain; otherwise, False.
         """
+        # The resolution chain is verified before the chain lock is taken since it can be arbitrarily long
+        if not verified and not res_chain.is_valid(self.verify_executor):
+            self.remove_floating_chain(chain)
+            return False
+
         with self.chain_lock:
             i = 1
             chain_len = len(self.chain.blocks)
@@ -133,14 +250,18 @@ class Miner:
                     block = self.chain.blocks[i]
                     chain.insert(i, block)
                 else:
-                    res_block.body = None
+                    res_block.clear_body()
                     chain.insert(i, res_block)
                 i += 1
 
-        is_valid = chain.is_valid() and chain.get_cost() >= self.chain.get_cost()
+            # The floating blocks after the resolution chain were verified as they were added so only the first
+            # floating block needs to be linked, which is checked under the lock so that the chain is never seen
+            # as complete before it is
+            is_linked = i >= len(chain.blocks) or chain.blocks[i].is_valid(chain.blocks[i - 1].hash())
+            is_valid = is_linked and chain.get_cost() >= self.chain.get_cost()
         if not is_valid:
-            logging.debug("Cur cost: %s New cost: %s", chain.get_cost(), self.chain.get_cost())
-            self.floating_chains.remove(chain)
+            logger.debug("Cur cost: %s New cost: %s", chain.get_cost(), self.chain.get_cost())
+            self.remove_floating_chain(chain)
         return is_valid
 
     def receive_resolution_block(self, block, idx, chain):
@@ -177,11 +298,11 @@ class Miner:
         data to send to a node as a resolution block to help it build the higher cost chain.
         :param idx: The index of the block to be encoded and returned.
         :return: The byte string representation of the block at the provided index or None if the provided index
-        was out of the current chain's bounds.
+        was out of the current chain's bounds or the block doesn't have its body data.
         """
         block = self.get_block(idx)
-        if block is None:
-            return block
+        if block is None or not block.has_body():
+            return None
         return block.encode()
 
     def get_block(self, idx):
@@ -190,10 +311,51 @@ class Miner:
         :param idx: The index of the block to get.
         :return: The block at the specified index or None if the index is out of the current chain's bounds.
         """
-        with self.chain_lock:
-            if idx < 0 or idx >= len(self.chain.blocks):
-                return None
-            return self.chain.blocks[idx]
+        return self.snapshot.get_block(idx)
+
+    def get_blocks(self, start, end):
+        """
+        Get the Blocks in a range of indices.
+        :param start: The index of the first block to get.
+        :param end: The index after the last block to get or None to get all blocks up to the end of the chain.
+        :return: A list of the blocks in the range which is truncated to the current chain's bounds.
+        """
+        return self.snapshot.get_blocks(start, end)
+
+    def find_blob(self, digest):
+        """
+        Find the blocks in the current chain that contain a blob.
+        :param digest: The digest of the blob to find.
+        :return: A list of (block index, position, block) tuples for each location of the blob.
+        """
+        snapshot = self.snapshot
+        return [(block_idx, pos, snapshot.blocks[block_idx]) for block_idx, pos in snapshot.find_blob(digest)]
+
+    def find_blobs_between(self, start, end):
+        """
+        Find all blobs in the current chain that were received within a time range.
+        :param start: The timestamp at the start of the time range.
+        :param end: The timestamp at the end of the time range which is excluded.
+        :return: A list of (block index, position, block) tuples for each blob in order by the time it was received.
+        """
+        snapshot = self.snapshot
+        return [(block_idx, pos, snapshot.blocks[block_idx])
+                for block_idx, pos in snapshot.find_blobs_between(start, end)]
+
+    def is_complete(self, chain):
+        """
+        Determine if a chain undergoing chain resolution is ready to replace the current chain. Light miners only
+        require the chain of block headers to be valid since they never store block body data. Every block of a
+        floating chain is verified as it is linked into the chain, so the chain is valid once its first block links
+        to the genesis block and this takes constant time.
+        :param chain: The chain undergoing chain resolution.
+        :return: True if the chain is complete; otherwise, False.
+        """
+        genesis, first = chain.blocks[0], chain.blocks[1]
+        is_linked = first.prev_hash == genesis.hash() and first.is_valid(genesis.hash())
+        if self.light:
+            return is_linked
+        return is_linked and chain.is_complete()
 
     def remove_floating_chain(self, chain):
         """
@@ -225,26 +387,48 @@ class Miner:
         """
         if chain.get_cost() > self.chain.get_cost():
             self.floating_chains.remove(chain)
-            self.chain = chain
-            self.dirty = True
 
-            with self.pending_blobs_lock:
+            # Find the first block that differs between the current chain and the new chain by walking back from the
+            # end of the shorter chain since blocks are linked by their hashes so the chains match up to the fork
+            fork_idx = min(len(self.chain.blocks), len(chain.blocks))
+            while fork_idx > 1 and self.chain.blocks[fork_idx - 1] != chain.blocks[fork_idx - 1]:
+                fork_idx -= 1
+
+            # Only replace the blocks after the fork so that switching chains costs time proportional to the depth
+            orphaned = self.chain.truncate(fork_idx)
+            added = chain.blocks[fork_idx:]
+            for block in added:
+                self.chain.add(block)
+            self.snapshot = self.chain.snapshot()
+            self.retarget.reset(self.chain.blocks)
+            self.dirty = True
 
-                # Add any blobs associated with removed blocks back to pending so they aren't lost
-                for block in self.chain.blocks:
-                    self.pending_blobs.union(block.get_body().blobs)
+            logger.debug("Its longer. Replace %d blocks with %d blocks.", len(orphaned), len(added))
 
-                # Remove any pending blobs that have already been included in the new chain
-                for block in chain.blocks:
-                    self.pending_blobs.difference_update(block.get_body().blobs)
+            # Return the blobs from the orphaned blocks that weren't mined in the new chain to the pending blobs
+            # and remove the pending blobs that were mined in the new chain
+            mined = set()
+            for block in added:
+                mined.update(block.get_blob_digests())
+            restored = [(digest, blob) for block in orphaned if block.has_body()
+                        for digest, blob in zip(block.get_blob_digests(), block.get_body().blobs)
+                        if digest not in mined and not self.snapshot.contains_blob(digest)]
+            with self.pending_blobs_lock:
+                self.pending_blobs.remove_all(mined)
+                evicted = self.pending_blobs.restore(restored)
+                self.template = None
+            if len(evicted) > 0:
+                logger.warning("Evicted %d pending blobs to restore %d blobs from orphaned blocks.", len(evicted),
+                               len(restored))
 
-            logging.debug("Its longer. Replace the chain.")
+            for handler in self.reorg_event:
+                handler(fork_idx, self.chain)
 
         elif chain.get_cost() < self.chain.get_cost():
-            logging.debug("Its too short. Throw it out.")
+            logger.debug("Its too short. Throw it out.")
             self.floating_chains.remove(chain)
         else:
-            logging.debug("The chains are the same length.")
+            logger.debug("The chains are the same length.")
 
     def __add_floating_block(self, block):
         """
@@ -255,25 +439,28 @@ class Miner:
         :return: None if the floating block was added to an already tracked chain; otherwise, the newly created
         chain to undergo chain resolution.
         """
-        for chain in self.floating_chains:
-            cur = chain.blocks[-1]
-            if block.is_valid(cur.hash()):
+        chain = self.floating_chains.find(block.prev_hash)
+        if chain is not None and block.is_valid(chain.blocks[-1].hash()):
 
-                logging.debug("Add to existing floating chain")
-                block.set_previous_hash(cur.hash())
-                chain.add(block)
+            logger.debug("Add to existing floating chain")
+            block.set_previous_hash(chain.blocks[-1].hash())
+            chain.add(block)
+            self.floating_chains.update(chain)
 
-                if chain.is_complete():
-                    self.__receive_complete_chain(chain)
-                return None
+            if self.is_complete(chain):
+                self.__receive_complete_chain(chain)
+            return None
 
-            elif block in chain.blocks:
-                return None
+        if self.floating_chains.find(block.hash()) is not None:
+            return None
 
-        logging.debug("Create new floating chain")
+        logger.debug("Create new floating chain")
         chain = Chain()
         chain.add(block)
-        self.floating_chains.append(chain)
+        self.floating_chains.add(chain)
+
+        for handler in self.fork_event:
+            handler(chain)
         return chain
 
     def ___add_block(self, block):
@@ -282,9 +469,44 @@ class Miner:
         :param block: The block to be added.
         """
         self.chain.add(block)
+        self.snapshot = self.chain.snapshot()
+        self.retarget.add(block)
+        self.__remove_pending_blobs(block.get_blob_digests())
+
+        for handler in self.add_event:
+            handler(block, len(self.chain.blocks) - 1)
 
+    def __remove_pending_blobs(self, digests):
+        """
+        Remove blobs that have been included in a block from the pending blobs. The next block's body will be
+        rebuilt if it contains any of the blobs.
+        :param digests: The digests of the blobs to be removed.
+        :return: None
+        """
         with self.pending_blobs_lock:
-            self.pending_blobs.difference_update(block.get_body().blobs)
+            self.pending_blobs.remove_all(digests)
+            if self.template is not None and not self.template.digests.isdisjoint(digests):
+                self.template = None
+
+    def __next_block(self, target):
+        """
+        Build the next block to be mined from the incrementally built template body. The template is only rebuilt
+        from the oldest pending blobs if some of its blobs were included in another block. The pending blobs lock
+        must be held when calling this method.
+        :param target: The 256 bit integer target that the next block's hash must be below.
+        :return: The next block to be mined.
+        """
+        if self.template is None:
+            self.template = BlockBuilder(None, 0, self.codec)
+            taken = self.pending_blobs.take(self.block_size_limit)
+            for digest, blob in taken:
+                self.template.add(blob, digest)
+            self.template_open = len(taken) == len(self.pending_blobs)
+
+        self.template.prev_hash = self.chain.blocks[-1].hash()
+        self.template.target = target
+        self.template.difficulty = target_difficulty(target)
+        return self.template.build()
 
     def __notify_handlers(self, block):
         """
@@ -295,19 +517,3 @@ class Miner:
         """
         for handler in self.mine_event:
             handler(block, self.chain.get_cost())
-
-    def __compute_difficulty(self):
-        """
-        Compute the difficulty for the next block in the chain.
-        :return: The difficulty required for the next block to be mined.
-        """
-        prev = self.chain.blocks[-1]
-        if len(self.chain.blocks) == 1:
-            return prev.get_difficulty()
-
-        delta = time.time() - self.chain.blocks[-1].get_timestamp()
-        difficulty = math.log2(Miner.DIFFICULTY_TARGET / delta) * 0.1 + prev.get_difficulty()
-
-        logging.info("New difficulty: %f Delta: %f", difficulty, delta)
-
-        return int(round(max(difficulty, 1)))
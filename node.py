@@ -1,23 +1,40 @@
+import json
 import logging
+import queue
 import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from secrets import randbits
 
 from google.protobuf import message
 
 import framing
+import header_chain
+import util
 import peer_to_peer_discovery as p2p
 from block import Block
 from chain import Chain
+from chunk_store import ChunkStore
+from event_trace import TraceWriter
+from feed import SubscriptionFeed
+from metrics import MetricsRegistry
 from miner import Miner
+from profiling import Instrumentation, SamplingProfiler
 from node_pool import NodePool
 from protos import request_pb2
-from requests import RequestRouter
+from requests import RequestRouter, request_type_name
 from servers import server
 from servers.data_server import DataServer
+from servers.metrics_server import MetricsServer
 from servers.output_server import OutputServer
+from servers.query_server import QueryServer
+from servers.subscription_server import SubscriptionServer
 from servers.tcp_router import TCPRouter
 from servers.udp_router import UDPRouter
 
+logger = logging.getLogger(__name__)
+
 
 class Node:
     """
@@ -30,15 +47,71 @@ class Node:
     """
     REQUEST_PORT = 10000
 
-    def __init__(self):
+    """
+    The number of chunks of out of line blobs that are requested from a peer at once.
+    """
+    CHUNK_BATCH_SIZE = 16
+
+    """
+    The maximum number of chunk batches that are fetched from peers in parallel.
+    """
+    CHUNK_FETCH_WORKERS = 8
+
+    """
+    The number of block bodies that are fetched from a peer at once when a query needs them or during chain resolution.
+    """
+    BODY_BATCH_SIZE = 64
+
+    """
+    The number of packed block headers sent in each segment of a resolution chain so that the receiving peer can
+    validate them and start fetching bodies while the rest of the chain is still being sent.
+    """
+    RESOLUTION_BATCH_SIZE = 4096
+
+    """
+    The formats that a range of blocks can be streamed to output clients in. Binary blocks are sent as length
+    framed Block protocol buffers and NDJSON blocks are sent as one JSON object per line.
+    """
+    ASCII_FORMAT = "ascii"
+    BINARY_FORMAT = "binary"
+    NDJSON_FORMAT = "ndjson"
+    OUTPUT_FORMATS = (ASCII_FORMAT, BINARY_FORMAT, NDJSON_FORMAT)
+
+    """
+    The number of bytes of serialized blocks that are buffered before being sent to an output client.
+    """
+    OUTPUT_BATCH_SIZE = 64 * 1024
+
+    def __init__(self, light=False, replica=False, trace_path=None):
         """
         Initialize the servers and miner required for a peer to peer node to operate.
+        :param light: True if the node should only sync block headers without mining or accepting input data,
+            fetching block bodies from peers when queries need them; otherwise, False.
+        :param replica: True if the node should follow the highest cost chain with full block bodies to serve output
+            and query requests without mining or accepting input data; otherwise, False.
+        :param trace_path: The path of the file that added blobs, received and mined blocks and chain switches are
+            recorded to so that they can be replayed or None to not record them.
         """
         self.node_id = randbits(32)  # Create a unique ID for this node
+        self.light = light
+        self.replica = replica
+
+        # Only full nodes mine blocks, light and replica nodes just follow the chain mined by their peers
+        self.mining = not light and not replica
         self.node_pool = NodePool(self.node_id, 30, 105)
 
-        self.miner = Miner()
+        self.chunk_store = ChunkStore()
+
+        # The pool of worker processes that long header chains are verified in which is started before any of the
+        # node's threads so that it is shared by every chain resolution
+        self.verify_executor = header_chain.create_executor()
+
+        self.miner = Miner(light=light, verify_executor=self.verify_executor)
         self.miner.mine_event.append(self.block_mined)
+
+        self.feed = SubscriptionFeed()
+        self.miner.add_event.append(self.feed.block_added)
+        self.miner.reorg_event.append(self.feed.chain_replaced)
         self.heartbeat = p2p.Heartbeat(Node.REQUEST_PORT, 30, self.node_id)
 
         router = RequestRouter(self)
@@ -47,6 +120,7 @@ class Node:
         router.handlers[request_pb2.MINED_BLOCK] = self.handle_mined_block
         router.handlers[request_pb2.RESOLUTION] = self.handle_resolution
         router.handlers[request_pb2.BLOCK_RESOLUTION] = self.handle_block_resolution
+        router.handlers[request_pb2.CHUNK] = self.handle_chunk
 
         self.tcp_router = server.TCPServer(Node.REQUEST_PORT, TCPRouter)
         self.tcp_router.router = router
@@ -54,12 +128,113 @@ class Node:
         self.udp_router = server.UDPServer(Node.REQUEST_PORT, UDPRouter)
         self.udp_router.router = router
 
-        self.input_server = server.TCPServer(9999, DataServer)
-        self.input_server.node = self
+        # Light and replica nodes don't accept input data because they never mine
+        self.input_server = None
+        if self.mining:
+            self.input_server = server.TCPServer(9999, DataServer)
+            self.input_server.node = self
 
         self.output_server = server.TCPServer(9998, OutputServer)
         self.output_server.node = self
 
+        self.subscription_server = server.TCPServer(9997, SubscriptionServer)
+        self.subscription_server.node = self
+
+        self.query_server = server.TCPServer(9996, QueryServer)
+        self.query_server.node = self
+
+        # The metrics of the node's internals that are exposed to scrapers on the metrics port
+        self.metrics = MetricsRegistry()
+        self.register_metrics(router)
+
+        self.metrics_server = server.TCPServer(9995, MetricsServer)
+        self.metrics_server.node = self
+
+        # The timers of the node's request handlers, servers and key miner and chain methods
+        self.instrumentation = Instrumentation(self.metrics)
+        self.instrument(router)
+
+        # The profiler that is switched on through the metrics server to sample where the node spends time
+        self.profiler = SamplingProfiler()
+
+        # The recorder of the node's events for offline replay which is only created if a trace path was provided
+        self.trace = None
+        if trace_path is not None:
+            self.trace = TraceWriter(trace_path)
+            self.miner.blob_event.append(self.trace.blob_added)
+            self.miner.receive_event.append(self.trace.block_received)
+            self.miner.mine_event.append(self.trace.block_mined)
+            self.miner.reorg_event.append(self.trace.chain_replaced)
+
+    def register_metrics(self, router):
+        """
+        Register the node's metrics and the handlers that update them as the node runs.
+        :param router: The request router that the messages received from peers are routed by.
+        :return: None
+        """
+        miner = self.miner
+        metrics = self.metrics
+
+        metrics.gauge("blobchain_hash_rate", "Hashes per second computed while mining the last block.",
+                      function=lambda: miner.hash_rate)
+        metrics.counter("blobchain_hashes_total", "Hashes computed while mining.", function=lambda: miner.hashes)
+
+        blocks_mined = metrics.counter("blobchain_blocks_mined_total", "Blocks mined by this node.")
+        miner.mine_event.append(lambda block, chain_cost: blocks_mined.inc())
+        self.blocks_received = metrics.counter("blobchain_blocks_received_total", "Mined blocks received from peers.")
+
+        forks = metrics.counter("blobchain_forks_total", "Floating chains started by blocks from peers.")
+        miner.fork_event.append(lambda chain: forks.inc())
+        reorgs = metrics.counter("blobchain_reorgs_total", "Times the current chain was replaced.")
+        reorg_depth = metrics.histogram("blobchain_reorg_depth", "Blocks after the fork in the chain of each reorg.",
+                                        buckets=(1, 2, 4, 8, 16, 64, 256, 1024))
+
+        def chain_replaced(fork_idx, chain):
+            reorgs.inc()
+            reorg_depth.observe(len(chain.blocks) - fork_idx)
+        miner.reorg_event.append(chain_replaced)
+
+        metrics.gauge("blobchain_chain_length", "Blocks in the current chain.", function=lambda: len(miner.snapshot))
+        metrics.gauge("blobchain_chain_cost", "Total cost of the current chain.",
+                      function=lambda: miner.snapshot.get_cost())
+        metrics.gauge("blobchain_pending_blobs", "Blobs waiting to be mined.",
+                      function=lambda: len(miner.pending_blobs))
+        metrics.gauge("blobchain_pending_blob_bytes", "Total size of the blobs waiting to be mined.",
+                      function=lambda: miner.pending_blobs.size)
+        metrics.gauge("blobchain_floating_chains", "Higher or equal cost chains undergoing chain resolution.",
+                      function=lambda: len(miner.floating_chains))
+
+        self.resolution_seconds = metrics.histogram("blobchain_resolution_seconds", "Duration of chain resolution.",
+                                                    ("result",))
+        self.resolution_bytes = metrics.counter("blobchain_resolution_bytes_total",
+                                                "Bytes of headers and blocks received during chain resolution.")
+
+        requests = metrics.counter("blobchain_requests_total", "Requests received from peers.", ("request_type",))
+        router.route_event.append(lambda request_type: requests.inc(
+            labels=(request_type_name(request_type),)))
+
+    def instrument(self, router):
+        """
+        Time every call of the node's request handlers, the requests handled by its servers and the miner and chain
+        methods that do the most work.
+        :param router: The request router whose handlers should be timed.
+        :return: None
+        """
+        instrumentation = self.instrumentation
+        for request_type, handler in router.handlers.items():
+            router.handlers[request_type] = instrumentation.wrap(handler, request_type_name(request_type))
+
+        for serv in (self.input_server, self.output_server, self.query_server):
+            if serv is not None:
+                instrumentation.instrument(serv, "finish_request", serv.RequestHandlerClass.__name__)
+
+        instrumentation.instrument(self, "start_chain_resolution")
+        instrumentation.instrument(self.miner, "add")
+        instrumentation.instrument(self.miner, "receive_block")
+        instrumentation.instrument(self.miner, "receive_resolution_chain")
+        instrumentation.instrument(self.miner, "receive_complete_chain")
+        instrumentation.instrument(Chain, "is_valid")
+
     def block_mined(self, block, chain_cost):
         """
         The block mined callback that is called when the miner has succeeded in mining a block and adding it
@@ -81,18 +256,26 @@ class Node:
 
     def run(self):
         """
-        Run the servers for receiving incoming requests and start mining.
+        Run the servers for receiving incoming requests and start mining if the node is a full node.
         This method never returns.
         """
         self.node_pool.start()
 
         server.start_server(self.tcp_router)
-        server.start_server(self.input_server)
+        if self.input_server is not None:
+            server.start_server(self.input_server)
         server.start_server(self.output_server)
+        server.start_server(self.subscription_server)
+        server.start_server(self.query_server)
+        server.start_server(self.metrics_server)
         server.start_server(self.udp_router)
 
         self.heartbeat.start()
-        self.miner.mine()
+        if self.mining:
+            self.miner.mine()
+        else:
+            # Light and replica nodes only respond to requests so wait until the node is stopped
+            threading.Event().wait()
 
     def shutdown(self):
         """
@@ -102,35 +285,67 @@ class Node:
         self.tcp_router.shutdown()
         self.tcp_router.server_close()
 
-        self.input_server.shutdown()
-        self.input_server.server_close()
+        if self.input_server is not None:
+            self.input_server.shutdown()
+            self.input_server.server_close()
 
         self.output_server.shutdown()
         self.output_server.server_close()
 
+        self.subscription_server.shutdown()
+        self.subscription_server.server_close()
+
+        self.query_server.shutdown()
+        self.query_server.server_close()
+
+        self.metrics_server.shutdown()
+        self.metrics_server.server_close()
+
+        if self.trace is not None:
+            self.trace.close()
+
         self.udp_router.shutdown()
         self.udp_router.server_close()
 
+        if self.verify_executor is not None:
+            self.verify_executor.shutdown()
+
     def handle_blob(self, data, handler):
         """
         Handle a binary object that has been submitted to the block chain network by an outside client. This
         data will be forwarded to this nodes peers.
         :param data: The binary data that has been submitted to be added to the block chain.
         :param handler: The handler that received the message.
-        :return: 
+        :return: True if the blob was added to the pending blobs; otherwise, False if the node doesn't mine or the
+        miner rejected the blob.
         """
-        logging.debug("Got a blob " + str(data))
+        logger.debug("Got a blob: %d bytes", len(data))
+
+        # Blobs are multicast to every peer by the node that received them so nodes that don't mine can drop them
+        if not self.mining:
+            return False
 
         if self.miner.add(data):
-            logging.debug("forward blob to peers")
+            logger.debug("forward blob to peers")
             req = request_pb2.Request()
             req.request_type = request_pb2.BLOB
             req.request_message = data
             msg = req.SerializeToString()
 
             self.node_pool.multicast(msg, Node.REQUEST_PORT)
-        else:
-            logging.debug("received duplicate blob")
+            return True
+
+        logger.debug("received duplicate blob or the pending blob pool is full")
+        return False
+
+    def handle_profile_request(self, duration):
+        """
+        Handle a request to profile the node by sampling the stacks of all of its threads.
+        :param duration: The number of seconds to profile for.
+        :return: The collapsed stacks or None if another profile is already running.
+        """
+        logger.info("Profiling for %f seconds", duration)
+        return self.profiler.profile(duration)
 
     def handle_discovery(self, data, handler):
         """
@@ -139,12 +354,12 @@ class Node:
         :param handler: The handler that received the message.
         :return: None
         """
-        logging.debug("Got discovery message")
+        logger.debug("Got discovery message")
         msg = request_pb2.DiscoveryMessage()
         try:
             msg.ParseFromString(data)
         except message.DecodeError:
-            logging.error("Error decoding message: %s", data)
+            logger.error("Error decoding message: %s", data)
             return
 
         self.node_pool.add(msg.node_id, handler.client_address[0])
@@ -162,9 +377,211 @@ class Node:
             handler.send("Index out of bounds.\n".encode())
             return
 
-        output = str(self.node_id) + " : " + block.to_ascii()
+        if not block.has_body():
+            block = self.fetch_blocks({idx: block}).get(idx)
+            if block is None:
+                handler.send("Block data is unavailable.\n".encode())
+                return
+
+        output = str(self.node_id) + " : " + block.to_ascii(self.resolve_blob)
         handler.send(output.encode())
 
+    def handle_output_range(self, start, end, output_format, handler):
+        """
+        Handle an output request from a client outside the network that is requesting the data in a range of
+        blocks within the block chain. The blocks are serialized incrementally and streamed over the client's
+        connection in batches so that the whole range is never held in memory at once.
+        :param start: The index of the first block being requested.
+        :param end: The index after the last block being requested or None to request up to the end of the chain.
+        :param output_format: The format to send the blocks in. This is one of the OUTPUT_FORMATS.
+        :param handler: The handler that received the client's request.
+        :return: None
+        """
+        blocks = self.iter_blocks_with_bodies(max(start, 0), self.miner.get_blocks(start, end))
+
+        if output_format == Node.BINARY_FORMAT:
+            segments = (framing.frame_segment(block.encode()) for idx, block in blocks)
+        elif output_format == Node.NDJSON_FORMAT:
+            segments = (block.to_json(idx, self.resolve_blob).encode() for idx, block in blocks)
+        else:
+            segments = (str(idx).encode() + b" : " + block.to_ascii(self.resolve_blob).encode() for idx, block in blocks)
+
+        batch = []
+        batch_size = 0
+        for segment in segments:
+            batch.append(segment)
+            batch_size += len(segment)
+            if batch_size >= Node.OUTPUT_BATCH_SIZE:
+                handler.send(b''.join(batch))
+                batch = []
+                batch_size = 0
+        handler.send(b''.join(batch))
+
+    def iter_blocks_with_bodies(self, start, blocks):
+        """
+        Iterate over a range of blocks, fetching the body data of any blocks that are missing it from peers in
+        the network in batches. Blocks whose body data can't be fetched are omitted.
+        :param start: The index of the first block in the range.
+        :param blocks: The list of blocks in the range.
+        :return: A generator of (index, block) tuples for each block with its body data.
+        """
+        for batch_start in range(0, len(blocks), Node.BODY_BATCH_SIZE):
+            batch = blocks[batch_start:batch_start + Node.BODY_BATCH_SIZE]
+            headers = {start + batch_start + i: block for i, block in enumerate(batch) if not block.has_body()}
+            fetched = self.fetch_blocks(headers) if len(headers) > 0 else {}
+
+            for i, block in enumerate(batch):
+                idx = start + batch_start + i
+                if not block.has_body():
+                    block = fetched.get(idx)
+                    if block is None:
+                        logger.error("Error: Unable to fetch the body data of block: %d", idx)
+                        continue
+                yield idx, block
+
+    def fetch_blocks(self, headers):
+        """
+        Fetch the full blocks for blocks that are missing their body data from peers in the network. The fetched
+        blocks are only used if they match the headers in the current chain and are not stored.
+        :param headers: The dictionary of bodiless blocks in the current chain keyed by their index.
+        :return: The dictionary of fetched blocks with their body data keyed by their index.
+        """
+        fetched = {}
+        for peer_addr in self.node_pool.get_addresses():
+            indices = [idx for idx in sorted(headers) if idx not in fetched]
+            if len(indices) == 0:
+                break
+
+            for idx, block_data in zip(indices, self.request_blocks(peer_addr, indices)):
+                # Stop using the peer if it is working on a different chain
+                try:
+                    block = Block.decode(block_data)
+                except message.DecodeError:
+                    break
+                if block != headers[idx] or not block.has_body():
+                    break
+                block.set_previous_hash(headers[idx].prev_hash)
+                fetched[idx] = block
+
+        return fetched
+
+    def request_blocks(self, peer_addr, indices):
+        """
+        Request full blocks from a peer in the network using a block resolution request.
+        :param peer_addr: The address of the peer to request the blocks from.
+        :param indices: The indices of the blocks in the peer's chain.
+        :return: A generator of the encoded blocks in the order they were requested which stops early if the peer
+        closes the connection or the connection fails.
+        """
+        msg = request_pb2.BlockResolutionMessage()
+        msg.indices.extend(indices)
+
+        req = request_pb2.Request()
+        req.request_type = request_pb2.BLOCK_RESOLUTION
+        req.request_message = msg.SerializeToString()
+
+        try:
+            with socket.create_connection((peer_addr, Node.REQUEST_PORT)) as s:
+                s.sendall(framing.frame_segment(req.SerializeToString()))
+                for _ in indices:
+                    block_data = framing.receive_framed_segment(s)
+                    if block_data == b'':
+                        return
+                    yield block_data
+        except (socket.error, RuntimeError):
+            logger.debug("Error: Unable to fetch blocks from peer: %s", peer_addr)
+
+    def handle_blob_query(self, digest, handler):
+        """
+        Handle a query from a client outside the network that is looking up which block contains a blob.
+        :param digest: The digest of the blob.
+        :param handler: The handler that received the client's query.
+        :return: None
+        """
+        locations = self.miner.find_blob(digest)
+        if len(locations) == 0:
+            handler.send("Blob not found.\n".encode())
+            return
+
+        handler.send(b''.join(self.blob_to_json(*location) for location in locations))
+
+    def handle_proof_query(self, digest, handler):
+        """
+        Handle a query from a client outside the network for a blob along with the proof that it is included in
+        a block. The proof can be verified against the Merkle root in the block's header without the block's body.
+        :param digest: The digest of the blob.
+        :param handler: The handler that received the client's query.
+        :return: None
+        """
+        locations = self.miner.find_blob(digest)
+        if len(locations) == 0:
+            handler.send("Blob not found.\n".encode())
+            return
+
+        lines = []
+        for block_idx, pos, block in locations:
+            lines.append((json.dumps({"digest": digest.hex(),
+                                      "index": block_idx,
+                                      "position": pos,
+                                      "block": block.hash().hex(),
+                                      "merkle_root": block.get_merkle_root().hex(),
+                                      "blob_count": block.get_blob_count(),
+                                      "proof": [node.hex() for node in block.merkle_proof(pos)],
+                                      "blob": block.get_body().blobs[pos].hex()}) + "\n").encode())
+        handler.send(b''.join(lines))
+
+    def handle_time_query(self, start, end, handler):
+        """
+        Handle a query from a client outside the network that is looking up all blobs received within a time range.
+        :param start: The timestamp at the start of the time range.
+        :param end: The timestamp at the end of the time range which is excluded.
+        :param handler: The handler that received the client's query.
+        :return: None
+        """
+        locations = self.miner.find_blobs_between(start, end)
+
+        batch = []
+        batch_size = 0
+        body_block = None
+        for block_idx, pos, block in locations:
+
+            # Consecutive blobs are usually in the same block so only decompress each block's body once
+            if block is not body_block:
+                body = block.get_body()
+                body_block = block
+
+            segment = self.blob_to_json(block_idx, pos, block, body)
+            batch.append(segment)
+            batch_size += len(segment)
+            if batch_size >= Node.OUTPUT_BATCH_SIZE:
+                handler.send(b''.join(batch))
+                batch = []
+                batch_size = 0
+        handler.send(b''.join(batch))
+
+    def blob_to_json(self, block_idx, pos, block, body=None):
+        """
+        Creates a JSON representation of a mined blob and its location in the chain.
+        :param block_idx: The index of the block containing the blob.
+        :param pos: The position of the blob within the block's body.
+        :param block: The block containing the blob.
+        :param body: The block's body if it has already been decompressed.
+        :return: The JSON encoded representation of the blob on a single line.
+        """
+        if body is None:
+            body = block.get_body()
+        blob = body.blobs[pos]
+        msg = request_pb2.BlobMessage()
+        msg.ParseFromString(blob)
+        data = self.resolve_blob(msg)
+
+        return (json.dumps({"digest": util.blob_digest(blob).hex(),
+                            "index": block_idx,
+                            "position": pos,
+                            "block": block.hash().hex(),
+                            "timestamp": msg.timestamp,
+                            "blob": data.decode(errors='replace') if data is not None else None}) + "\n").encode()
+
     def handle_mined_block(self, data, handler):
         """
         Handle a message from a peer in the network notifying the current node that it mined a block.
@@ -172,15 +589,17 @@ class Node:
         :param handler: The handler that received the message.
         :return: None
         """
-        logging.debug("Got mined block")
+        logger.debug("Got mined block")
         msg = request_pb2.MinedBlockMessage()
         try:
             msg.ParseFromString(data)
-            block = Block.decode(msg.block)
+            # Light nodes discard the body so it is never kept or verified
+            block = Block.decode(msg.block, not self.miner.light)
         except message.DecodeError:
-            logging.error("Error decoding message: %s", data)
+            logger.error("Error decoding message: %s", data)
             return
 
+        self.blocks_received.inc()
         chain = self.miner.receive_block(block, msg.chain_cost)
         if chain is None:
             # The block was added to an existing chain
@@ -198,13 +617,14 @@ class Node:
         :param handler: The handler that received the message.
         :return: None
         """
-        res_chain = self.miner.get_resolution_chain()
-        msg = framing.frame_segment(res_chain)
-        handler.send(msg)
-
-        # handle block resolution with the same connection if
-        # block resolution is required
-        handler.handle()
+        # Stream the packed block headers in batches so the peer can validate them as they arrive
+        # The connection is closed once all headers are sent
+        res_chain = memoryview(self.miner.get_resolution_chain())
+        batch_size = Node.RESOLUTION_BATCH_SIZE * header_chain.HEADER_SIZE
+        for start in range(0, len(res_chain), batch_size):
+            batch = res_chain[start:start + batch_size]
+            handler.send(framing.convert_int_to_4_bytes(len(batch)))
+            handler.send(batch)
 
     def handle_block_resolution(self, data, handler):
         """
@@ -230,21 +650,116 @@ class Node:
             data = framing.frame_segment(block_data)
             handler.send(data)
 
+    def handle_chunk(self, data, handler):
+        """
+        Handle a chunk request from a peer in the network to fetch the data for the chunks of out of line blobs.
+        The chunks are sent in the order they were requested and an empty segment is sent for any chunk that
+        isn't stored on this node.
+        :param data: The chunk request message containing the digests of the chunks to fetch.
+        :param handler: The handler that received the message.
+        :return: None
+        """
+        msg = request_pb2.ChunkRequestMessage()
+        try:
+            msg.ParseFromString(data)
+        except message.DecodeError:
+            return
+
+        for digest in msg.digests:
+            chunk = self.chunk_store.get(digest)
+            handler.send(framing.frame_segment(chunk if chunk is not None else b''))
+
+    def resolve_blob(self, msg):
+        """
+        Get the data for a blob, fetching any of its out of line chunks that are missing from peers in the network.
+        :param msg: The BlobMessage protocol buffer.
+        :return: The blob's data or None if any of its chunks couldn't be fetched.
+        """
+        missing = self.chunk_store.missing(msg)
+        if len(missing) > 0:
+            self.fetch_chunks(missing)
+        return self.chunk_store.join(msg)
+
+    def fetch_chunks(self, digests):
+        """
+        Fetch the data for chunks of out of line blobs from peers in the network. The chunks are split into batches
+        that are fetched from different peers in parallel. Any chunks that a peer doesn't have are requested from
+        the next peer until every peer has been asked.
+        :param digests: The digests of the chunks to fetch.
+        :return: True if all of the chunks were fetched; otherwise, False.
+        """
+        peers = self.node_pool.get_addresses()
+        missing = list(digests)
+
+        for attempt in range(len(peers)):
+            batches = [missing[i:i + Node.CHUNK_BATCH_SIZE] for i in range(0, len(missing), Node.CHUNK_BATCH_SIZE)]
+            batch_peers = [peers[(i + attempt) % len(peers)] for i in range(len(batches))]
+
+            with ThreadPoolExecutor(max_workers=Node.CHUNK_FETCH_WORKERS) as executor:
+                list(executor.map(self.fetch_chunk_batch, batch_peers, batches))
+
+            missing = [digest for digest in missing if digest not in self.chunk_store]
+            if len(missing) == 0:
+                return True
+
+        if len(missing) > 0:
+            logger.error("Error: Unable to fetch %d chunks from peers.", len(missing))
+        return len(missing) == 0
+
+    def fetch_chunk_batch(self, peer_addr, digests):
+        """
+        Fetch the data for a batch of chunks from a single peer and add them to the chunk store.
+        :param peer_addr: The address of the peer to fetch the chunks from.
+        :param digests: The digests of the chunks to fetch.
+        :return: None
+        """
+        msg = request_pb2.ChunkRequestMessage()
+        msg.digests.extend(digests)
+
+        req = request_pb2.Request()
+        req.request_type = request_pb2.CHUNK
+        req.request_message = msg.SerializeToString()
+
+        try:
+            with socket.create_connection((peer_addr, Node.REQUEST_PORT)) as s:
+                s.sendall(framing.frame_segment(req.SerializeToString()))
+                for digest in digests:
+                    chunk = framing.receive_framed_segment(s)
+                    if chunk != b'' and not self.chunk_store.put(chunk, digest):
+                        logger.error("Error: Received chunk that doesn't match its digest.")
+                        return
+        except (socket.error, RuntimeError):
+            logger.debug("Error: Unable to fetch chunks from peer: %s", peer_addr)
+
     def start_chain_resolution(self, peer_addr, chain):
         """
-        Begin the chain resolution protocol for fetching all data associated with a higher cost chain in 
-        the network to allow the current node to mine the correct chain.
+        Begin the chain resolution protocol for a higher cost chain and record how long it took.
         :param peer_addr: The address of the peer with the higher cost chain.
         :param chain: The incomplete higher cost chain that requires resolution.
         :return: None
         """
+        start = time.time()
+        completed = self.resolve_chain(peer_addr, chain)
+        self.resolution_seconds.observe(time.time() - start, ("complete" if completed else "failed",))
+
+    def resolve_chain(self, peer_addr, chain):
+        """
+        Run the chain resolution protocol for fetching all data associated with a higher cost chain in 
+        the network to allow the current node to mine the correct chain. The resolution is pipelined so that
+        block headers are validated as they arrive, the bodies of accepted headers are requested while more headers
+        are still being received and the bodies are verified in a separate stage.
+        :param peer_addr: The address of the peer with the higher cost chain.
+        :param chain: The incomplete higher cost chain that requires resolution.
+        :return: True if the chain was completed; otherwise, False.
+        """
         # Connect to the peer with the higher cost chain
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         try:
             s.connect((peer_addr, Node.REQUEST_PORT))
         except socket.error:
-            logging.debug("Error: Unable to connect to peer for chain resolution.")
-            return
+            logger.debug("Error: Unable to connect to peer for chain resolution.")
+            self.miner.remove_floating_chain(chain)
+            return False
 
         # Ask for the peer's block headers from the chain to find
         # the point where the current chain diverges from the higher
@@ -254,102 +769,171 @@ class Node:
         req_data = req.SerializeToString()
         msg = framing.frame_segment(req_data)
 
-        logging.debug("Ask for resolution chain from: %s", peer_addr)
+        logger.debug("Ask for resolution chain from: %s", peer_addr)
         s.sendall(msg)
 
-        # Receive the resolution chain from the peer
-        try:
-            res_data = framing.receive_framed_segment(s)
-        except RuntimeError:
-            logging.error("Error receiving resolve chain")
-            return
-        logging.debug("Received resolution chain")
+        # The stages that fetch and verify block bodies while the headers are still being received
+        # Light nodes never store block body data so they only receive the headers
+        res_chain = Chain()
+        bodies = {}
+        fetch_queue = queue.Queue()
+        verify_queue = queue.Queue()
+        stages = []
+        if not self.light:
+            stages.append(threading.Thread(target=self.fetch_resolution_bodies,
+                                           args=(peer_addr, fetch_queue, verify_queue)))
+            stages.append(threading.Thread(target=self.verify_resolution_bodies, args=(res_chain, verify_queue, bodies)))
+        for stage in stages:
+            stage.start()
 
-        # Decode the resolution chain's protocol buffer
         try:
-            res_chain = Chain.decode(res_data, False)
-        except message.DecodeError:
-            logging.error("Error decoding resolve chain: %s", res_data)
-            return
+            is_valid = self.receive_resolution_headers(s, res_chain, fetch_queue)
+        finally:
+            s.close()
+            fetch_queue.put(None)
+            for stage in stages:
+                stage.join()
+
+        if not is_valid:
+            self.miner.remove_floating_chain(chain)
+            return False
+        logger.debug("Received resolution chain")
 
         # Notify the miner that the block headers for the longer chain
         # were received to verify if the chain has a higher cost than
-        # the current chain and hashes correctly
-        is_valid = self.miner.receive_resolution_chain(chain, res_chain)
-        if not is_valid:
-            logging.error("Invalid resolution chain")
-            return
+        # the current chain and links to the floating blocks
+        if not self.miner.receive_resolution_chain(chain, res_chain, True):
+            logger.error("Invalid resolution chain")
+            return False
 
-        self.start_block_resolution(s, chain)
+        if not self.light and not self.complete_resolution_bodies(peer_addr, chain, bodies):
+            self.miner.remove_floating_chain(chain)
+            return False
+        logger.debug("Received block resolution data and completed the chain")
+
+        self.miner.receive_complete_chain(chain)
+        return True
 
-    def start_block_resolution(self, sock, chain):
+    def receive_resolution_headers(self, sock, res_chain, fetch_queue):
         """
-        Start the block resolution process for the resolution chain. This involves fetching the block data for 
-        any blocks in the chain that are missing their body data. The miner will be notified once the chain has 
-        all of its data complete.
-        :param sock: The socket to communicate with the peer who has the data.
-        :param chain: The chain that has missing block body data.
+        The header stage of chain resolution that receives batches of packed block headers from the peer, validates
+        each batch as it arrives and queues the indices of any blocks whose bodies need to be fetched.
+        :param sock: The socket that the peer is sending the resolution chain on.
+        :param res_chain: The chain that the header only blocks are added to.
+        :param fetch_queue: The queue of lists of block indices that need their bodies fetched.
+        :return: True if a valid chain of headers was received; otherwise, False.
+        """
+        prev_hash = None
+        while True:
+            try:
+                data = framing.receive_framed_segment(sock)
+                if data == b'':
+                    break
+                self.resolution_bytes.inc(len(data))
+                headers = header_chain.HeaderChain(data)
+            except RuntimeError:
+                logger.error("Error receiving resolve chain")
+                return False
+            except ValueError:
+                logger.error("Error decoding resolve chain: %d bytes", len(data))
+                return False
+
+            invalid_idx = headers.verify(self.verify_executor, prev_hash)
+            if invalid_idx is not None:
+                logger.error("Error: Invalid block header in resolution chain at index: %d",
+                              len(res_chain.blocks) + invalid_idx - (1 if prev_hash is None else 0))
+                return False
+
+            # The first batch starts with the genesis block which every chain already has
+            indices = []
+            for i in range(1 if prev_hash is None else 0, len(headers)):
+                block = headers.block(i)
+                res_chain.add(block)
+
+                # Blocks that match the current chain are taken from it rather than fetched
+                idx = len(res_chain.blocks) - 1
+                if self.miner.get_block(idx) != block:
+                    indices.append(idx)
+            prev_hash = res_chain.blocks[-1].hash()
+
+            if len(indices) > 0:
+                fetch_queue.put(indices)
+
+        return prev_hash is not None
+
+    def fetch_resolution_bodies(self, peer_addr, fetch_queue, verify_queue):
+        """
+        The fetch stage of chain resolution that requests the full blocks for the queued indices from the peer in
+        batches and queues the encoded blocks to be verified.
+        :param peer_addr: The address of the peer with the higher cost chain.
+        :param fetch_queue: The queue of lists of block indices that need their bodies fetched which ends with None.
+        :param verify_queue: The queue of (index, encoded block) tuples that is ended with None.
         :return: None
         """
-        res_block_indices = self.miner.get_resolution_block_indices(chain)
-
-        # If all the blocks have both their header and body data
-        # then the chain is complete and no block data needs resolving
-        if len(res_block_indices) == 0:
-            self.miner.receive_complete_chain(chain)
-            sock.close()
-            return
-
-        logging.debug("Ask for block bodies to populate the resolution chain")
-
-        # Fetch the bodies for any blocks in the chain that are missing them
-        msg = request_pb2.BlockResolutionMessage()
-        for idx in res_block_indices:
-            msg.indices.append(idx)
-        msg_data = msg.SerializeToString()
+        while True:
+            indices = fetch_queue.get()
+            if indices is None:
+                break
 
-        req = request_pb2.Request()
-        req.request_type = request_pb2.BLOCK_RESOLUTION
-        req.request_message = msg_data
-        req_data = req.SerializeToString()
-
-        data = framing.frame_segment(req_data)
-        sock.sendall(data)
-
-        try:
-            # Receive the block's body data in order by index
-            for idx in res_block_indices:
+            for start in range(0, len(indices), Node.BODY_BATCH_SIZE):
+                batch = indices[start:start + Node.BODY_BATCH_SIZE]
+                for idx, block_data in zip(batch, self.request_blocks(peer_addr, batch)):
+                    self.resolution_bytes.inc(len(block_data))
+                    verify_queue.put((idx, block_data))
 
-                block_data = framing.receive_framed_segment(sock)
+        verify_queue.put(None)
 
-                # The segment was empty meaning the connection was closed
-                # The peer will close the connection if an out of bounds block
-                # was requested
-                if block_data == b'':
-                    logging.error("Error: Connection closed due to out of bounds index while resolving block data.")
-                    self.miner.remove_floating_chain(chain)
-                    return
+    def verify_resolution_bodies(self, res_chain, verify_queue, bodies):
+        """
+        The verify stage of chain resolution that decodes fetched blocks and verifies their bodies against the headers
+        of the resolution chain.
+        :param res_chain: The chain of header only blocks received from the peer.
+        :param verify_queue: The queue of (index, encoded block) tuples that is ended with None.
+        :param bodies: The dictionary that the verified blocks are added to keyed by their index.
+        :return: None
+        """
+        while True:
+            item = verify_queue.get()
+            if item is None:
+                break
 
+            idx, block_data = item
+            try:
                 block = Block.decode(block_data)
+            except message.DecodeError:
+                logger.error("Error: Failed decoding resolution block.")
+                continue
 
-                # Bail if adding the received block's data to the chain caused the block's chain of hashes to fail
-                if not self.miner.receive_resolution_block(block, idx, chain):
-                    logging.error("Error: Invalid resolution block hash for chain..")
-                    self.miner.remove_floating_chain(chain)
-                    return
+            if block != res_chain.blocks[idx] or not block.has_body():
+                logger.error("Error: Resolution block doesn't match the resolution chain: %d", idx)
+                continue
+            bodies[idx] = block
 
-        # Unknown TCP error from the connection failing in the middle of receiving a message
-        # Stop block resolution due to losing connection with the peer
-        except RuntimeError:
-            logging.error("Error: Connection closed while resolving block data.")
-            self.miner.remove_floating_chain(chain)
-            return
+    def complete_resolution_bodies(self, peer_addr, chain, bodies):
+        """
+        Add the verified bodies to the blocks of the resolution chain that are missing them. The bodies of any blocks
+        that are still missing, such as blocks that were removed from the current chain while resolving, are
+        fetched from the peer.
+        :param peer_addr: The address of the peer with the higher cost chain.
+        :param chain: The chain undergoing chain resolution.
+        :param bodies: The dictionary of verified blocks keyed by their index.
+        :return: True if every block in the chain has its body; otherwise, False.
+        """
+        res_block_indices = self.miner.get_resolution_block_indices(chain)
+        missing = [idx for idx in res_block_indices if idx not in bodies]
 
-        # Stop block resolution due to a block failing to decode meaning an error occurred with the peer
-        except message.DecodeError:
-            logging.error("Error: Failed decoding resolution block.")
-            self.miner.remove_floating_chain(chain)
-            return
-        logging.debug("Received block resolution data and completed the chain")
+        for idx, block_data in zip(missing, self.request_blocks(peer_addr, missing)):
+            self.resolution_bytes.inc(len(block_data))
+            try:
+                bodies[idx] = Block.decode(block_data)
+            except message.DecodeError:
+                logger.error("Error: Failed decoding resolution block.")
+                return False
 
-        self.miner.receive_complete_chain(chain)
+        for idx in res_block_indices:
+            # Bail if adding the received block's data to the chain caused the block's chain of hashes to fail
+            if idx not in bodies or not self.miner.receive_resolution_block(bodies[idx], idx, chain):
+                logger.error("Error: Invalid or missing resolution block for chain: %d", idx)
+                return False
+
+        return True
@@ -3,6 +3,10 @@ import socket
 import threading
 import time
 
+import framing
+
+logger = logging.getLogger(__name__)
+
 
 class NodePool:
     """
@@ -10,18 +14,62 @@ class NodePool:
     approach to track nodes that are alive.
     """
 
+    """
+    The number of seconds to wait to connect to and send a message to a peer over TCP.
+    """
+    SEND_TIMEOUT = 5.0
+
     def multicast(self, data, port):
         """
         Psuedo-UDP multi-casting by sending the provided data to all known peers in the pool
         on the provided port. True multi-casting cannot be used due to lack of Docker support.
+        Data too large for a single datagram, such as a block with a large body, is sent to each peer as a length
+        framed message over TCP in a background thread so that the caller never waits on a peer's connection.
+        Peers that the data can't be sent to are skipped.
         :param data: The data to be sent to all known peers in the pool.
         :param port: The port to send the data to on the peers.
         :return: None
         """
+        addresses = self.get_addresses()
+        if len(data) > framing.MAX_DATAGRAM_SIZE:
+            sender = threading.Thread(target=self.__send_framed, args=(data, addresses, port))
+            sender.daemon = True
+            sender.start()
+            return
+
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            for address in addresses:
+                try:
+                    sock.sendto(data, (address, port))
+                except OSError as err:
+                    logger.debug("Error: Unable to send %d bytes to peer %s: %s", len(data), address, err)
+        finally:
+            sock.close()
+
+    def __send_framed(self, data, addresses, port):
+        """
+        Send a length framed message to each peer over its own TCP connection.
+        :param data: The data to be sent.
+        :param addresses: The addresses of the peers.
+        :param port: The port to send the data to on the peers.
+        :return: None
+        """
+        msg = framing.frame_segment(data)
+        for address in addresses:
+            try:
+                with socket.create_connection((address, port), NodePool.SEND_TIMEOUT) as sock:
+                    sock.sendall(msg)
+            except OSError as err:
+                logger.debug("Error: Unable to send %d bytes to peer %s: %s", len(data), address, err)
+
+    def get_addresses(self):
+        """
+        Get the addresses of all known peers in the pool.
+        :return: A list of the addresses of all known peers.
+        """
         with self.pool_lock:
-            for node in self.pool.keys():
-                sock.sendto(data, (node[1], port))
+            return [node[1] for node in self.pool.keys()]
 
     def __init__(self, node_id, cleanup_interval, timeout):
         """
@@ -53,7 +101,7 @@ class NodePool:
         node = (node_id, node_address)
         with self.pool_lock:
             self.pool[node] = time.time()
-            logging.debug("update pool: %s", self.pool)
+            logger.debug("update pool: %s", dict(self.pool))
 
     def cleanup(self):
         """
@@ -72,7 +120,7 @@ class NodePool:
             with self.pool_lock:
                 for key, prev in list(self.pool.items()):
                     if cur - prev > self.timeout:
-                        logging.debug("cleanup node: %s", key)
+                        logger.debug("cleanup node: %s", key)
                         self.pool.pop(key)
 
     def start(self):
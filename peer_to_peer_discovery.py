@@ -5,6 +5,8 @@ import time
 
 from protos import request_pb2
 
+logger = logging.getLogger(__name__)
+
 
 class Heartbeat:
     """
@@ -42,7 +44,7 @@ class Heartbeat:
 
         while True:
             sock.sendto(msg, ('255.255.255.255', self.broadcast_port))
-            logging.debug("Sent heartbeat")
+            logger.debug("Sent heartbeat")
             time.sleep(self.heartbeat)
 
     def start(self):
@@ -0,0 +1,131 @@
+import functools
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+"""
+The upper bounds of the call latency histogram buckets in seconds. The buckets start lower than the default
+buckets because most instrumented calls handle a single message.
+"""
+CALL_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class Instrumentation:
+    """
+    The timers that measure how long the node spends in each call of its request handlers, servers and key miner
+    and chain methods. Each call is timed with the performance counter and recorded in a single latency histogram
+    labelled by the name of the function so that instrumenting a function only costs two clock reads and a
+    histogram update per call.
+    """
+
+    def __init__(self, metrics):
+        """
+        Create the latency histogram that instrumented calls are recorded in.
+        :param metrics: The metrics registry that the histogram is registered with.
+        :return: None
+        """
+        self.calls = metrics.histogram("blobchain_call_seconds", "Duration of calls to instrumented functions.",
+                                       ("function",), CALL_BUCKETS)
+
+    def wrap(self, function, name):
+        """
+        Wrap a function so that the duration of every call is recorded.
+        :param function: The function to be timed.
+        :param name: The name that the function's calls are recorded under.
+        :return: The wrapped function.
+        """
+        labels = (name,)
+        observe = self.calls.observe
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(time.perf_counter() - start, labels)
+
+        timed.instrumented = True
+        return timed
+
+    def instrument(self, obj, attr, name=None):
+        """
+        Replace a method of an object or class with one that records the duration of every call. Replacing a method
+        of a class times calls on every instance, and a method that is already instrumented is left as it is.
+        :param obj: The object or class whose method should be timed.
+        :param attr: The name of the method.
+        :param name: The name that the method's calls are recorded under or None to use the class and method name.
+        :return: None
+        """
+        function = getattr(obj, attr)
+        if getattr(function, "instrumented", False):
+            return
+
+        if name is None:
+            cls = obj if isinstance(obj, type) else type(obj)
+            name = "%s.%s" % (cls.__name__, attr)
+        setattr(obj, attr, self.wrap(function, name))
+
+
+class SamplingProfiler:
+    """
+    The sampling profiler that can be switched on while the node is running to find where its threads spend time.
+    The stacks of every thread are sampled at a fixed interval and counted in the collapsed stack format, one line
+    per distinct stack of semicolon separated frames from the root followed by the number of samples, which flame
+    graph tools read directly. Only one profile runs at a time.
+    """
+
+    """
+    The number of seconds between samples of every thread's stack.
+    """
+    INTERVAL = 0.005
+
+    """
+    The maximum number of seconds that a single profile can run for.
+    """
+    MAX_DURATION = 300.0
+
+    def __init__(self, interval=INTERVAL):
+        """
+        Create a new idle profiler.
+        :param interval: The number of seconds between samples of every thread's stack.
+        :return: None
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+
+    def profile(self, duration):
+        """
+        Sample the stacks of every other thread for a duration. The calling thread blocks until the profile ends.
+        :param duration: The number of seconds to profile for which is capped at MAX_DURATION.
+        :return: The collapsed stacks or None if another profile is already running.
+        """
+        if not self.lock.acquire(blocking=False):
+            return None
+
+        try:
+            stacks = Counter()
+            current = threading.get_ident()
+            end = time.time() + min(duration, SamplingProfiler.MAX_DURATION)
+            while time.time() < end:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident != current:
+                        stacks[self.__collapse(names.get(ident, str(ident)), frame)] += 1
+                time.sleep(self.interval)
+        finally:
+            self.lock.release()
+
+        return "".join("%s %d\n" % (stack, count) for stack, count in sorted(stacks.items()))
+
+    @staticmethod
+    def __collapse(thread_name, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append("%s:%s" % (os.path.basename(code.co_filename), code.co_name))
+            frame = frame.f_back
+        frames.append(thread_name.replace(" ", "_"))
+        return ";".join(reversed(frames)).replace(" ", "_")
@@ -3,6 +3,7 @@
 
 import sys
 _b=sys.version_info[0]<3 and (lambda x:x) or (lambda x:x.encode('latin1'))
+from google.protobuf.internal import enum_type_wrapper
 from google.protobuf import descriptor as _descriptor
 from google.protobuf import message as _message
 from google.protobuf import reflection as _reflection
@@ -19,9 +20,39 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='protos/block.proto',
   package='',
   syntax='proto3',
-  serialized_pb=_b('\n\x12protos/block.proto\"X\n\x0b\x42lockHeader\x12\x0f\n\x07\x65ntropy\x18\x01 \x01(\x07\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x12\n\ndifficulty\x18\x03 \x01(\x07\x12\x11\n\tbody_hash\x18\x04 \x01(\x0c\"\x1a\n\tBlockBody\x12\r\n\x05\x62lobs\x18\x01 \x03(\x0c\"a\n\x05\x42lock\x12\r\n\x05nonce\x18\x01 \x01(\x07\x12\x11\n\tprev_hash\x18\x02 \x01(\x0c\x12\x1c\n\x06header\x18\x03 \x01(\x0b\x32\x0c.BlockHeader\x12\x18\n\x04\x62ody\x18\x04 \x01(\x0b\x32\n.BlockBodyb\x06proto3')
+  serialized_pb=_b('\n\x12protos/block.proto\"\xa8\x01\n\x0b\x42lockHeader\x12\x0f\n\x07\x65ntropy\x18\x01 \x01(\x07\x12\x11\n\ttimestamp\x18\x02 \x01(\x01\x12\x12\n\ndifficulty\x18\x03 \x01(\x07\x12\x11\n\tbody_hash\x18\x04 \x01(\x0c\x12\x15\n\x05\x63odec\x18\x05 \x01(\x0e\x32\x06.Codec\x12\x13\n\x0bmerkle_root\x18\x06 \x01(\x0c\x12\x12\n\nblob_count\x18\x07 \x01(\x07\x12\x0e\n\x06target\x18\x08 \x01(\x0c\"\x1a\n\tBlockBody\x12\r\n\x05\x62lobs\x18\x01 \x03(\x0c\"U\n\x05\x42lock\x12\r\n\x05nonce\x18\x01 \x01(\x07\x12\x11\n\tprev_hash\x18\x02 \x01(\x0c\x12\x1c\n\x06header\x18\x03 \x01(\x0b\x32\x0c.BlockHeader\x12\x0c\n\x04\x62ody\x18\x04 \x01(\x0c*%\n\x05\x43odec\x12\x08\n\x04NONE\x10\x00\x12\x08\n\x04ZLIB\x10\x01\x12\x08\n\x04LZMA\x10\x02\x62\x06proto3')
 )
 
+_CODEC = _descriptor.EnumDescriptor(
+  name='Codec',
+  full_name='Codec',
+  filename=None,
+  file=DESCRIPTOR,
+  values=[
+    _descriptor.EnumValueDescriptor(
+      name='NONE', index=0, number=0,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='ZLIB', index=1, number=1,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='LZMA', index=2, number=2,
+      options=None,
+      type=None),
+  ],
+  containing_type=None,
+  options=None,
+  serialized_start=308,
+  serialized_end=345,
+)
+_sym_db.RegisterEnumDescriptor(_CODEC)
+
+Codec = enum_type_wrapper.EnumTypeWrapper(_CODEC)
+NONE = 0
+ZLIB = 1
+LZMA = 2
 
 
 
@@ -60,6 +91,34 @@ _BLOCKHEADER = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='codec', full_name='BlockHeader.codec', index=4,
+      number=5, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='merkle_root', full_name='BlockHeader.merkle_root', index=5,
+      number=6, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='blob_count', full_name='BlockHeader.blob_count', index=6,
+      number=7, type=7, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='target', full_name='BlockHeader.target', index=7,
+      number=8, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -72,8 +131,8 @@ _BLOCKHEADER = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=22,
-  serialized_end=110,
+  serialized_start=23,
+  serialized_end=191,
 )
 
 
@@ -103,8 +162,8 @@ _BLOCKBODY = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=112,
-  serialized_end=138,
+  serialized_start=193,
+  serialized_end=219,
 )
 
 
@@ -138,8 +197,8 @@ _BLOCK = _descriptor.Descriptor(
       options=None, file=DESCRIPTOR),
     _descriptor.FieldDescriptor(
       name='body', full_name='Block.body', index=3,
-      number=4, type=11, cpp_type=10, label=1,
-      has_default_value=False, default_value=None,
+      number=4, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None, file=DESCRIPTOR),
@@ -155,15 +214,16 @@ _BLOCK = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=140,
-  serialized_end=237,
+  serialized_start=221,
+  serialized_end=306,
 )
 
+_BLOCKHEADER.fields_by_name['codec'].enum_type = _CODEC
 _BLOCK.fields_by_name['header'].message_type = _BLOCKHEADER
-_BLOCK.fields_by_name['body'].message_type = _BLOCKBODY
 DESCRIPTOR.message_types_by_name['BlockHeader'] = _BLOCKHEADER
 DESCRIPTOR.message_types_by_name['BlockBody'] = _BLOCKBODY
 DESCRIPTOR.message_types_by_name['Block'] = _BLOCK
+DESCRIPTOR.enum_types_by_name['Codec'] = _CODEC
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
 BlockHeader = _reflection.GeneratedProtocolMessageType('BlockHeader', (_message.Message,), dict(
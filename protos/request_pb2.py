@@ -20,7 +20,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='protos/request.proto',
   package='',
   syntax='proto3',
-  serialized_pb=_b('\n\x14protos/request.proto\"F\n\x07Request\x12\"\n\x0crequest_type\x18\x01 \x01(\x0e\x32\x0c.RequestType\x12\x17\n\x0frequest_message\x18\x02 \x01(\x0c\".\n\x0b\x42lobMessage\x12\x11\n\ttimestamp\x18\x01 \x01(\x01\x12\x0c\n\x04\x62lob\x18\x02 \x01(\x0c\"6\n\x11MinedBlockMessage\x12\x12\n\nchain_cost\x18\x01 \x01(\r\x12\r\n\x05\x62lock\x18\x02 \x01(\x0c\"#\n\x10\x44iscoveryMessage\x12\x0f\n\x07node_id\x18\x01 \x01(\x07\")\n\x16\x42lockResolutionMessage\x12\x0f\n\x07indices\x18\x01 \x03(\x07*g\n\x0bRequestType\x12\x08\n\x04\x42LOB\x10\x00\x12\t\n\x05\x41LIVE\x10\x01\x12\x0f\n\x0bMINED_BLOCK\x10\x02\x12\x0c\n\x08\x44ISOVERY\x10\x03\x12\x0e\n\nRESOLUTION\x10\x04\x12\x14\n\x10\x42LOCK_RESOLUTION\x10\x05\x62\x06proto3')
+  serialized_pb=_b('\n\x14protos/request.proto\"F\n\x07Request\x12\"\n\x0crequest_type\x18\x01 \x01(\x0e\x32\x0c.RequestType\x12\x17\n\x0frequest_message\x18\x02 \x01(\x0c\"L\n\x0b\x42lobMessage\x12\x11\n\ttimestamp\x18\x01 \x01(\x01\x12\x0c\n\x04\x62lob\x18\x02 \x01(\x0c\x12\x0e\n\x06\x63hunks\x18\x03 \x03(\x0c\x12\x0c\n\x04size\x18\x04 \x01(\x04\"6\n\x11MinedBlockMessage\x12\x12\n\nchain_cost\x18\x01 \x01(\x04\x12\r\n\x05\x62lock\x18\x02 \x01(\x0c\"#\n\x10\x44iscoveryMessage\x12\x0f\n\x07node_id\x18\x01 \x01(\x07\")\n\x16\x42lockResolutionMessage\x12\x0f\n\x07indices\x18\x01 \x03(\x07\"&\n\x13\x43hunkRequestMessage\x12\x0f\n\x07\x64igests\x18\x01 \x03(\x0c*r\n\x0bRequestType\x12\x08\n\x04\x42LOB\x10\x00\x12\t\n\x05\x41LIVE\x10\x01\x12\x0f\n\x0bMINED_BLOCK\x10\x02\x12\x0c\n\x08\x44ISOVERY\x10\x03\x12\x0e\n\nRESOLUTION\x10\x04\x12\x14\n\x10\x42LOCK_RESOLUTION\x10\x05\x12\t\n\x05\x43HUNK\x10\x06\x62\x06proto3')
 )
 
 _REQUESTTYPE = _descriptor.EnumDescriptor(
@@ -53,11 +53,15 @@ _REQUESTTYPE = _descriptor.EnumDescriptor(
       name='BLOCK_RESOLUTION', index=5, number=5,
       options=None,
       type=None),
+    _descriptor.EnumValueDescriptor(
+      name='CHUNK', index=6, number=6,
+      options=None,
+      type=None),
   ],
   containing_type=None,
   options=None,
-  serialized_start=280,
-  serialized_end=383,
+  serialized_start=350,
+  serialized_end=464,
 )
 _sym_db.RegisterEnumDescriptor(_REQUESTTYPE)
 
@@ -68,6 +72,7 @@ MINED_BLOCK = 2
 DISOVERY = 3
 RESOLUTION = 4
 BLOCK_RESOLUTION = 5
+CHUNK = 6
 
 
 
@@ -130,6 +135,20 @@ _BLOBMESSAGE = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='chunks', full_name='BlobMessage.chunks', index=2,
+      number=3, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='BlobMessage.size', index=3,
+      number=4, type=4, cpp_type=4, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
   ],
   extensions=[
   ],
@@ -143,7 +162,7 @@ _BLOBMESSAGE = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=96,
-  serialized_end=142,
+  serialized_end=172,
 )
 
 
@@ -156,7 +175,7 @@ _MINEDBLOCKMESSAGE = _descriptor.Descriptor(
   fields=[
     _descriptor.FieldDescriptor(
       name='chain_cost', full_name='MinedBlockMessage.chain_cost', index=0,
-      number=1, type=13, cpp_type=3, label=1,
+      number=1, type=4, cpp_type=4, label=1,
       has_default_value=False, default_value=0,
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
@@ -180,8 +199,8 @@ _MINEDBLOCKMESSAGE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=144,
-  serialized_end=198,
+  serialized_start=174,
+  serialized_end=228,
 )
 
 
@@ -211,8 +230,8 @@ _DISCOVERYMESSAGE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=200,
-  serialized_end=235,
+  serialized_start=230,
+  serialized_end=265,
 )
 
 
@@ -242,8 +261,39 @@ _BLOCKRESOLUTIONMESSAGE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=237,
-  serialized_end=278,
+  serialized_start=267,
+  serialized_end=308,
+)
+
+
+_CHUNKREQUESTMESSAGE = _descriptor.Descriptor(
+  name='ChunkRequestMessage',
+  full_name='ChunkRequestMessage',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='digests', full_name='ChunkRequestMessage.digests', index=0,
+      number=1, type=12, cpp_type=9, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None, file=DESCRIPTOR),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=310,
+  serialized_end=348,
 )
 
 _REQUEST.fields_by_name['request_type'].enum_type = _REQUESTTYPE
@@ -252,6 +302,7 @@ DESCRIPTOR.message_types_by_name['BlobMessage'] = _BLOBMESSAGE
 DESCRIPTOR.message_types_by_name['MinedBlockMessage'] = _MINEDBLOCKMESSAGE
 DESCRIPTOR.message_types_by_name['DiscoveryMessage'] = _DISCOVERYMESSAGE
 DESCRIPTOR.message_types_by_name['BlockResolutionMessage'] = _BLOCKRESOLUTIONMESSAGE
+DESCRIPTOR.message_types_by_name['ChunkRequestMessage'] = _CHUNKREQUESTMESSAGE
 DESCRIPTOR.enum_types_by_name['RequestType'] = _REQUESTTYPE
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -290,5 +341,12 @@ BlockResolutionMessage = _reflection.GeneratedProtocolMessageType('BlockResoluti
   ))
 _sym_db.RegisterMessage(BlockResolutionMessage)
 
+ChunkRequestMessage = _reflection.GeneratedProtocolMessageType('ChunkRequestMessage', (_message.Message,), dict(
+  DESCRIPTOR = _CHUNKREQUESTMESSAGE,
+  __module__ = 'protos.request_pb2'
+  # @@protoc_insertion_point(class_scope:ChunkRequestMessage)
+  ))
+_sym_db.RegisterMessage(ChunkRequestMessage)
+
 
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,189 @@
+import argparse
+import logging
+import sys
+import time
+
+from google.protobuf import message
+
+import event_trace
+import header_chain
+import log_config
+from block import Block
+from chain import Chain
+from miner import Miner
+
+logger = logging.getLogger(__name__)
+
+
+class TraceReplay:
+    """
+    The replay of a node's trace into a miner in a single process without any network access. Added blobs and blocks
+    received from peers are passed to the miner the same way the node passed them, blocks the node mined are added as
+    they were mined, and chain switches are replayed from the blocks recorded with them in place of chain resolution.
+    The miner's chain is checked against the trace after every mined block and chain switch so that a replay that
+    diverges from the recorded node is reported. Events are replayed as fast as possible unless a speed is given.
+    """
+
+    def __init__(self, miner, speed=None):
+        """
+        Create a new replay.
+        :param miner: The miner that the trace is replayed into which should not be mining.
+        :param speed: The factor that the time between events is divided by or None to replay without waiting.
+        :return: None
+        """
+        self.miner = miner
+        self.speed = speed
+
+        # The number of events replayed and the number of times the miner's chain didn't match the trace
+        self.events = 0
+        self.mismatches = 0
+
+    def replay(self, records):
+        """
+        Replay the records of a trace in order.
+        :param records: The (event type, timestamp, fields) tuples of the trace.
+        :return: None
+        """
+        start = time.time()
+        first_timestamp = None
+        for event_type, timestamp, fields in records:
+            if self.speed is not None:
+                if first_timestamp is None:
+                    first_timestamp = timestamp
+                delay = start + (timestamp - first_timestamp) / self.speed - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+
+            if event_type == event_trace.BLOB_EVENT:
+                self.replay_blob(*fields)
+            elif event_type == event_trace.RECEIVED_EVENT:
+                self.replay_received(*fields)
+            elif event_type == event_trace.MINED_EVENT:
+                self.replay_mined(*fields)
+            elif event_type == event_trace.SWITCH_EVENT:
+                self.replay_switch(*fields)
+            self.events += 1
+
+    def replay_blob(self, data):
+        """
+        Replay a blob that was added to the pending blobs after being submitted by a client or forwarded by a peer.
+        :param data: The encoded BlobMessage protocol buffer.
+        :return: None
+        """
+        if not self.miner.light:
+            self.miner.add(data)
+
+    def replay_received(self, chain_cost, block_data):
+        """
+        Replay a block that a peer mined. A block that starts a floating chain is left for the chain switch that
+        followed its resolution.
+        :param chain_cost: The total cost of the peer's chain.
+        :param block_data: The encoded block.
+        :return: None
+        """
+        try:
+            block = Block.decode(block_data, not self.miner.light)
+        except message.DecodeError:
+            logger.error("Error decoding traced received block")
+            return
+
+        self.miner.receive_block(block, chain_cost)
+
+    def replay_mined(self, chain_cost, block_data):
+        """
+        Replay a block that the node mined by adding it to the end of the miner's chain.
+        :param chain_cost: The cost of the chain after the block was added.
+        :param block_data: The encoded block.
+        :return: None
+        """
+        try:
+            block = Block.decode(block_data, not self.miner.light)
+        except message.DecodeError:
+            self.mismatch("Mined block at length %d couldn't be decoded", len(self.miner.chain.blocks))
+            return
+
+        self.miner.receive_block(block, chain_cost)
+
+        if self.miner.chain.blocks[-1] != block:
+            self.mismatch("Mined block wasn't added to the end of the chain at length: %d",
+                          len(self.miner.chain.blocks))
+
+    def replay_switch(self, fork_idx, length, blocks):
+        """
+        Replay the node switching to a higher cost chain. The new chain is built from the miner's chain up to the
+        fork and the recorded blocks after it.
+        :param fork_idx: The index of the first block that differs from the replaced chain.
+        :param length: The length of the new chain.
+        :param blocks: The encoded blocks of the new chain from the fork.
+        :return: None
+        """
+        if fork_idx > len(self.miner.chain.blocks):
+            self.mismatch("Chain switch forks at %d after the end of the chain of length: %d", fork_idx,
+                          len(self.miner.chain.blocks))
+            return
+
+        chain = Chain()
+        for block in self.miner.chain.blocks[1:fork_idx]:
+            chain.add(block)
+        for block_data in blocks:
+            try:
+                chain.add(Block.decode(block_data))
+            except message.DecodeError:
+                self.mismatch("Chain switch at %d has a block that couldn't be decoded", fork_idx)
+                return
+        if not chain.is_valid(self.miner.verify_executor):
+            self.mismatch("Chain switch at %d has an invalid chain", fork_idx)
+            return
+
+        self.miner.receive_complete_chain(chain)
+
+        tip = self.miner.chain.blocks[-1]
+        if len(self.miner.chain.blocks) != length or tip != chain.blocks[-1]:
+            self.mismatch("Chain switch at %d ended with length %d instead of %d", fork_idx,
+                          len(self.miner.chain.blocks), length)
+
+    def mismatch(self, msg, *args):
+        """
+        Report that the miner's chain diverged from the trace.
+        :param msg: The message describing the divergence.
+        :param args: The arguments of the message.
+        :return: None
+        """
+        self.mismatches += 1
+        logger.error("Replay diverged after %d events: " + msg, self.events, *args)
+
+
+def main(args):
+    parser = argparse.ArgumentParser(description="Replay a node's trace into a miner in a single process.")
+    parser.add_argument("trace", help="The trace file recorded by a node run with --trace.")
+    parser.add_argument("--light", action="store_true", help="Replay into a light miner that only keeps headers.")
+    parser.add_argument("--speed", type=float,
+                        help="Replay at this multiple of real time instead of as fast as possible.")
+    parser.add_argument("--log-level", default="WARNING", type=str.upper,
+                        choices=["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"], help="The log level of the replay.")
+    options = parser.parse_args(args[1:])
+
+    listener = log_config.configure(options.log_level)
+    executor = header_chain.create_executor()
+    try:
+        replay = TraceReplay(Miner(light=options.light, verify_executor=executor), options.speed)
+        start = time.time()
+        try:
+            replay.replay(event_trace.read_trace(options.trace))
+        except (OSError, ValueError) as err:
+            parser.error(str(err))
+        elapsed = time.time() - start
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        listener.stop()
+
+    chain = replay.miner.chain
+    print("Events: %d in %.3f s (%.0f events/s)" % (replay.events, elapsed, replay.events / max(elapsed, 1e-9)))
+    print("Chain length: %d Cost: %d Tip: %s" % (len(chain.blocks), chain.get_cost(), chain.blocks[-1].hash().hex()))
+    print("Mismatches: %d" % replay.mismatches)
+    return 1 if replay.mismatches > 0 else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
@@ -4,6 +4,21 @@ from google.protobuf import message
 
 from protos import request_pb2
 
+logger = logging.getLogger(__name__)
+
+
+def request_type_name(request_type):
+    """
+    Get the name of a request type to label logs and metrics with. Peers can send request types that this node
+    doesn't know about since the RequestType enum is open.
+    :param request_type: The RequestType of a request.
+    :return: The name of the request type or its number if it isn't a known request type.
+    """
+    try:
+        return request_pb2.RequestType.Name(request_type)
+    except ValueError:
+        return str(request_type)
+
 
 class RequestRouter:
     """
@@ -18,6 +33,9 @@ class RequestRouter:
         """
         self.handlers = {}
 
+        # The handlers called with the RequestType of every request that is successfully parsed
+        self.route_event = []
+
     def route(self, data, handler):
         """
         Parse the message and route its data to its corresponding handler.
@@ -32,11 +50,14 @@ class RequestRouter:
         try:
             req.ParseFromString(data)
         except message.DecodeError:
-            logging.error("Error decoding request: %s", data)
+            logger.error("Error decoding request: %s", data)
             return
 
+        for route_handler in self.route_event:
+            route_handler(req.request_type)
+
         # Call the corresponding request handler
         if req.request_type in self.handlers:
             self.handlers[req.request_type](req.request_message, handler)
         else:
-            logging.error("Unsupported request type: %s", request_pb2.RequestType.Name(req.request_type))
+            logger.error("Unsupported request type: %s", request_type_name(req.request_type))
@@ -0,0 +1,100 @@
+import logging
+from collections import deque
+
+from block import HASH_BITS
+
+logger = logging.getLogger(__name__)
+
+"""
+The largest target that a block's hash can be below, which is the largest 256 bit integer.
+"""
+MAX_TARGET = (1 << HASH_BITS) - 1
+
+
+class Retarget:
+    """
+    The engine that sets the target of each block from the rate that work was done over a sliding window of the
+    most recent blocks in the chain. The total work and time span of the window are kept as running sums so that
+    adding a block takes constant time, and the target is a 256 bit integer so that the work required for each
+    block can be adjusted by any amount instead of doubling or halving it.
+    """
+
+    """
+    The number of most recent blocks that the rate of work is measured over.
+    """
+    WINDOW = 32
+
+    """
+    The largest factor that the target can be changed by from one block to the next.
+    """
+    MAX_ADJUSTMENT = 4
+
+    def __init__(self, block_time, window=WINDOW, max_adjustment=MAX_ADJUSTMENT):
+        """
+        Create a new retarget engine with an empty window.
+        :param block_time: The number of seconds that each block should take to mine.
+        :param window: The number of most recent blocks that the rate of work is measured over.
+        :param max_adjustment: The largest factor that the target can be changed by from one block to the next.
+        :return: None
+        """
+        self.block_time = block_time
+        self.window = window
+        self.max_adjustment = max_adjustment
+
+        # The (timestamp, work) tuples of the blocks in the window with an extra block at the start
+        # whose timestamp begins the window's time span
+        self.blocks = deque()
+
+        # The total work of every block in the window except the first whose work was done before the time span
+        self.work = 0
+
+    def __len__(self):
+        return len(self.blocks)
+
+    def add(self, block):
+        """
+        Add a block that was added to the end of the chain to the window, removing the oldest block from the
+        window if it is full.
+        :param block: The block that was added to the chain.
+        :return: None
+        """
+        if len(self.blocks) > 0:
+            self.work += block.get_cost()
+        self.blocks.append((block.get_timestamp(), block.get_cost()))
+
+        if len(self.blocks) > self.window + 1:
+            self.blocks.popleft()
+            self.work -= self.blocks[0][1]
+
+    def reset(self, blocks):
+        """
+        Rebuild the window from the blocks at the end of a chain after the chain was replaced.
+        :param blocks: The blocks of the chain in order.
+        :return: None
+        """
+        self.blocks.clear()
+        self.work = 0
+        for block in blocks[-(self.window + 1):]:
+            self.add(block)
+
+    def next_target(self, prev):
+        """
+        Compute the target for the next block in the chain so that the work it requires is the work done over
+        the window in the time it should take to mine a block.
+        :param prev: The block at the end of the chain that the next block will be added after.
+        :return: The 256 bit integer target that the next block's hash must be below.
+        """
+        prev_target = prev.get_target()
+        if len(self.blocks) < 2:
+            return min(max(prev_target, 1), MAX_TARGET)
+
+        # Blocks can be received with timestamps out of order so the time span is kept positive
+        timespan = max(self.blocks[-1][0] - self.blocks[0][0], 1e-3)
+        expected_work = max(int(self.work * self.block_time / timespan), 1)
+        target = (1 << HASH_BITS) // expected_work
+
+        logger.debug("New target: %064x Timespan: %f Blocks: %d", target, timespan, len(self.blocks) - 1)
+
+        lo = max(prev_target // self.max_adjustment, 1)
+        hi = min(prev_target * self.max_adjustment, MAX_TARGET)
+        return min(max(target, lo), hi)
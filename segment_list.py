@@ -0,0 +1,106 @@
+class SegmentList:
+    """
+    The list of items stored in fixed size segments so that a view of the list can be taken, and items can be
+    removed from the end of the list, in time proportional to the number of segments rather than the number of items.
+    Segments are shared with the views of the list and are only ever appended to, so a segment that a view may be
+    reading is copied rather than shortened when items are removed from the list.
+    """
+
+    """
+    The number of items in each segment.
+    """
+    SEGMENT_SIZE = 1024
+
+    def __init__(self, items=()):
+        """
+        Create a new list.
+        :param items: The items that the list starts with.
+        :return: None
+        """
+        self.segments = []
+        self.length = 0
+        for item in items:
+            self.append(item)
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, idx):
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(self.length)
+            if step != 1:
+                return list(self)[idx]
+            return list(self.__iter_range(start, stop))
+
+        if idx < 0:
+            idx += self.length
+        if idx < 0 or idx >= self.length:
+            raise IndexError("SegmentList index out of range")
+        return self.segments[idx // SegmentList.SEGMENT_SIZE][idx % SegmentList.SEGMENT_SIZE]
+
+    def __iter__(self):
+        return self.__iter_range(0, self.length)
+
+    def __iter_range(self, start, stop):
+        """
+        Iterate over the items in a range of indices.
+        :param start: The index of the first item.
+        :param stop: The index after the last item.
+        :return: The iterator over the items.
+        """
+        while start < stop:
+            segment_idx, offset = divmod(start, SegmentList.SEGMENT_SIZE)
+            end = min(stop - start + offset, SegmentList.SEGMENT_SIZE)
+            yield from self.segments[segment_idx][offset:end]
+            start += end - offset
+
+    def append(self, item):
+        """
+        Append an item to the end of the list.
+        :param item: The item to be appended.
+        :return: None
+        """
+        if self.length == len(self.segments) * SegmentList.SEGMENT_SIZE:
+            self.segments.append([])
+        self.segments[-1].append(item)
+        self.length += 1
+
+    def insert(self, idx, item):
+        """
+        Insert an item into the list, shifting the items after it.
+        :param idx: The index to insert the item at.
+        :param item: The item to be inserted.
+        :return: None
+        """
+        shifted = self.truncate(min(max(idx, 0), self.length))
+        self.append(item)
+        for shifted_item in shifted:
+            self.append(shifted_item)
+
+    def truncate(self, length):
+        """
+        Remove every item from an index to the end of the list.
+        :param length: The index of the first item to be removed which becomes the length of the list.
+        :return: The list of removed items.
+        """
+        if length >= self.length:
+            return []
+
+        removed = self[length:]
+        count, remainder = divmod(length, SegmentList.SEGMENT_SIZE)
+        del self.segments[count + (remainder > 0):]
+        if remainder > 0:
+            self.segments[-1] = self.segments[-1][:remainder]
+        self.length = length
+        return removed
+
+    def view(self):
+        """
+        Take a read only view of the list as it currently is. The view shares the list's segments and stays the same
+        as items are appended to or removed from the list.
+        :return: The SegmentList view which must not be modified.
+        """
+        view = SegmentList()
+        view.segments = list(self.segments)
+        view.length = self.length
+        return view
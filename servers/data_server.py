@@ -1,9 +1,12 @@
 import logging
 import time
 
+import util
 from protos import request_pb2
 from servers import server
 
+logger = logging.getLogger(__name__)
+
 
 class DataServer(server.TCPLineRequestHandler):
     """
@@ -12,7 +15,9 @@ class DataServer(server.TCPLineRequestHandler):
 
     def receive(self, data):
         """
-        Receive binary data from an incoming TCP request that should be added to the block chain.
+        Receive binary data from an incoming TCP request that should be added to the block chain. The blob's
+        hex encoded digest is sent back to the client so that it can be used to look up the blob once it is mined,
+        or an error line if the blob wasn't accepted.
         :param data: The binary data to be added to the block chain.
         :return: None
         """
@@ -20,6 +25,18 @@ class DataServer(server.TCPLineRequestHandler):
         message.timestamp = time.time()
         message.blob = data
 
+        # Large blobs are stored out of line so only a reference to their chunks is added to the block chain
+        message = self.server.node.chunk_store.split(message)
+        if message is None:
+            logger.warning("Rejected a %d byte blob because the chunk store is full", len(data))
+            self.send("Error: The chunk store is full.\n".encode())
+            return
+
         msg = message.SerializeToString()
-        logging.debug("Received data: (%f, %s) = %s", message.timestamp, message.blob, msg)
-        self.server.node.handle_blob(msg, self)
+        logger.debug("Received data: %f %d bytes", message.timestamp, len(msg))
+        # The blob is rejected if it's already pending or mined, too large, the pending blob pool is full or the node
+        # doesn't mine
+        if not self.server.node.handle_blob(msg, self):
+            self.send("Error: The blob was rejected.\n".encode())
+            return
+        self.send((util.blob_digest(msg).hex() + "\n").encode())
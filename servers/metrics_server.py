@@ -0,0 +1,70 @@
+from urllib.parse import parse_qs, urlsplit
+
+from servers import server
+
+
+class MetricsServer(server.TCPLineRequestHandler):
+    """
+    The metrics server for scraping the node's metrics in the text exposition format and for profiling the node.
+    HTTP GET requests are answered with an HTTP response so that standard scrapers can be pointed at the port, and
+    any other line is answered with the plain text response.
+    """
+
+    """
+    The content type of the text exposition format.
+    """
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def receive(self, data):
+        """
+        Receive a scrape or profile request. The request is either a line with "profile <seconds>" to sample the
+        stacks of the node's threads for a number of seconds and get the collapsed stacks, or any other line to get
+        all of the node's metrics. HTTP clients request "GET /profile?seconds=<seconds>" or any other path.
+        :param data: The first line of the request.
+        :return: None
+        """
+        is_http = data.startswith(b'GET ')
+        if is_http:
+            # Skip the request headers which end with an empty line
+            while self.rfile.readline().strip() != b'':
+                pass
+
+            request = []
+            line = data.decode(errors='replace').split()
+            url = urlsplit(line[1] if len(line) > 1 else "/")
+            if url.path == "/profile":
+                request = ["profile"] + parse_qs(url.query).get("seconds", [])[:1]
+        else:
+            request = data.decode(errors='replace').split()
+
+        if len(request) > 0 and request[0] == "profile":
+            try:
+                duration = float(request[1])
+            except (IndexError, ValueError):
+                self.respond(is_http, "400 Bad Request", b"Error: Expected a profile duration in seconds.\n")
+                return
+
+            stacks = self.server.node.handle_profile_request(duration)
+            if stacks is None:
+                self.respond(is_http, "409 Conflict", b"Error: A profile is already running.\n")
+                return
+            self.respond(is_http, "200 OK", stacks.encode())
+            return
+
+        self.respond(is_http, "200 OK", self.server.node.metrics.expose().encode())
+
+    def respond(self, is_http, status, body):
+        """
+        Send a response to the request.
+        :param is_http: True if the request was an HTTP request so the body should be sent in an HTTP response.
+        :param status: The HTTP status of the response.
+        :param body: The body of the response.
+        :return: None
+        """
+        if not is_http:
+            self.send(body)
+            return
+
+        header = "HTTP/1.0 %s\r\nContent-Type: %s\r\nContent-Length: %d\r\n\r\n" % (status, MetricsServer.CONTENT_TYPE,
+                                                                                    len(body))
+        self.send(header.encode() + body)
@@ -8,14 +8,38 @@ class OutputServer(server.TCPLineRequestHandler):
 
     def receive(self, data):
         """
-        Receive a request for block data.
+        Receive a request for block data. The request is either the index of a single block or a range of blocks
+        in the form start:end followed by an optional output format, where the end may be omitted to request all
+        blocks up to the end of the chain.
         :param data: The binary data to be added to the block chain.
         :return: None
         """
+        request = data.split()
+        if len(request) == 0 or len(request) > 2:
+            self.send("Error: Expected an integer or a range start:end [format].\n".encode())
+            return
+
+        if b':' not in request[0] and len(request) == 1:
+            try:
+                idx = int(request[0])
+            except ValueError:
+                self.send("Error: Expected an integer.\n".encode())
+                return
+
+            self.server.node.handle_output_request(idx, self)
+            return
+
         try:
-            idx = int(data)
+            start, end = request[0].split(b':', 1)
+            start = int(start)
+            end = int(end) if end != b'' else None
         except ValueError:
-            self.send("Error: Expected an integer.\n".encode())
+            self.send("Error: Expected a range start:end.\n".encode())
+            return
+
+        output_format = request[1].decode(errors='replace') if len(request) > 1 else self.server.node.ASCII_FORMAT
+        if output_format not in self.server.node.OUTPUT_FORMATS:
+            self.send(("Error: Expected a format in: %s.\n" % ", ".join(self.server.node.OUTPUT_FORMATS)).encode())
             return
 
-        self.server.node.handle_output_request(idx, self)
+        self.server.node.handle_output_range(start, end, output_format, self)
@@ -0,0 +1,42 @@
+from servers import server
+
+
+class QueryServer(server.TCPLineRequestHandler):
+    """
+    The query server for receiving incoming TCP requests to look up mined blobs by their digest or by the time
+    they were received.
+    """
+
+    def receive(self, data):
+        """
+        Receive a query for mined blobs. The query is either "blob <digest>" with the hex encoded digest of a blob,
+        "proof <digest>" to also get the Merkle proof that the blob is included in its block, or "time <start> <end>"
+        with the timestamps at the start and end of a time range.
+        :param data: The query.
+        :return: None
+        """
+        query = data.split()
+        if len(query) == 2 and query[0] in (b'blob', b'proof'):
+            try:
+                digest = bytes.fromhex(query[1].decode())
+            except ValueError:
+                self.send("Error: Expected a hex encoded digest.\n".encode())
+                return
+
+            if query[0] == b'blob':
+                self.server.node.handle_blob_query(digest, self)
+            else:
+                self.server.node.handle_proof_query(digest, self)
+
+        elif len(query) == 3 and query[0] == b'time':
+            try:
+                start = float(query[1])
+                end = float(query[2])
+            except ValueError:
+                self.send("Error: Expected a start and end timestamp.\n".encode())
+                return
+
+            self.server.node.handle_time_query(start, end, self)
+
+        else:
+            self.send("Error: Expected a query of the form: blob <digest>, proof <digest> or time <start> <end>.\n".encode())
@@ -4,6 +4,8 @@ import threading
 
 import framing
 
+logger = logging.getLogger(__name__)
+
 
 class TCPServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
     """
@@ -28,7 +30,7 @@ class TCPRequestHandler(socketserver.BaseRequestHandler):
         try:
             data = framing.receive_framed_segment(self.request)
         except RuntimeError as err:
-            logging.error("Error receiving framed TCP segment %s", err)
+            logger.error("Error receiving framed TCP segment %s", err)
             return
         if data != b'':
             self.receive(data)
@@ -85,6 +87,11 @@ class UDPServer(socketserver.ThreadingMixIn, socketserver.UDPServer):
     A UDP server for handling incoming UDP requests.
     """
 
+    """
+    The size of the buffer that each datagram is received into which fits the largest datagram.
+    """
+    max_packet_size = framing.MAX_DATAGRAM_SIZE
+
     def __init__(self, port, handler, node_id=None):
         self.waiting_for_more_data = False
         socketserver.UDPServer.allow_reuse_address = True
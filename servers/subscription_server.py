@@ -0,0 +1,54 @@
+import json
+
+from feed import SubscriptionFeed
+from servers import server
+
+
+class SubscriptionServer(server.TCPLineRequestHandler):
+    """
+    The subscription server for pushing chain events to long lived TCP connections from outside the network.
+    Each event is sent as a single line of JSON as soon as it is published. Light nodes only store block headers
+    so the body of each block is fetched from peers before it is sent, and the block is sent without its blobs if
+    its body can't be fetched.
+    """
+
+    """
+    The number of seconds to wait for an event before checking if the subscriber was dropped.
+    """
+    POLL_INTERVAL = 1.0
+
+    def handle(self):
+        """
+        Called by the server when a subscriber connects. Events are pushed to the subscriber until it disconnects
+        or falls too far behind.
+        :return: None
+        """
+        feed = self.server.node.feed
+        subscription = feed.subscribe()
+        try:
+            while not subscription.overflowed:
+                event = subscription.get(SubscriptionServer.POLL_INTERVAL)
+                if event is not None:
+                    self.send(self.encode(event))
+
+            self.send((json.dumps({"type": "error", "message": "Subscriber too slow."}) + "\n").encode())
+        except OSError:
+            pass
+        finally:
+            feed.unsubscribe(subscription)
+
+    def encode(self, event):
+        """
+        Encode an event to be sent to the subscriber.
+        :param event: The event published by the SubscriptionFeed.
+        :return: The event encoded as a line of JSON.
+        """
+        if event[0] == SubscriptionFeed.REORG_EVENT:
+            _, fork_idx, length = event
+            msg = {"type": SubscriptionFeed.REORG_EVENT, "fork": fork_idx, "length": length}
+        else:
+            _, idx, block = event
+            if not block.has_body():
+                block = dict(self.server.node.iter_blocks_with_bodies(idx, [block])).get(idx, block)
+            msg = {"type": SubscriptionFeed.BLOCK_EVENT, "block": block.to_dict(idx, self.server.node.resolve_blob)}
+        return (json.dumps(msg) + "\n").encode()
@@ -0,0 +1,12 @@
+import os
+import sys
+
+"""
+The directories of the node's modules and of the tests which share helpers by importing each other.
+"""
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(TESTS_DIR)
+
+for path in (ROOT_DIR, TESTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
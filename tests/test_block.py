@@ -0,0 +1,161 @@
+import lzma
+import unittest
+import zlib
+from unittest import mock
+
+from google.protobuf import message
+
+import block
+from protos import block_pb2
+from retarget import MAX_TARGET, Retarget
+
+
+def make_header(difficulty, timestamp, target=None):
+    return block.Block(b'', difficulty, None, float(timestamp), body_hash=bytes(32), target=target)
+
+
+class DecompressTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        data = b'blob' * 1000
+        for codec in (block_pb2.NONE, block_pb2.ZLIB, block_pb2.LZMA):
+            self.assertEqual(block.decompress(block.compress(data, codec), codec), data)
+
+    def test_body_at_limit(self):
+        data = b'\0' * 1024
+        for codec in (block_pb2.NONE, block_pb2.ZLIB, block_pb2.LZMA):
+            self.assertEqual(block.decompress(block.compress(data, codec), codec, len(data)), data)
+
+    def test_body_over_limit(self):
+        data = b'\0' * (block.MAX_BODY_SIZE + 1)
+        for codec in (block_pb2.NONE, block_pb2.ZLIB, block_pb2.LZMA):
+            with self.assertRaises(message.DecodeError):
+                block.decompress(block.compress(data, codec), codec)
+
+    def test_truncated_body(self):
+        data = bytes(range(256)) * 64
+        with self.assertRaises(message.DecodeError):
+            block.decompress(zlib.compress(data)[:100], block_pb2.ZLIB)
+        with self.assertRaises(message.DecodeError):
+            block.decompress(lzma.compress(data)[:100], block_pb2.LZMA)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(message.DecodeError):
+            block.decompress(b'', 99)
+
+
+class BodilessBlockTest(unittest.TestCase):
+
+    def setUp(self):
+        builder = block.BlockBuilder(block.Block.genesis().hash(), 1)
+        builder.add(b'\x09' + bytes(8) + b'\x12\x04blob')
+        self.block = builder.build()
+
+    def test_with_body(self):
+        self.assertEqual(list(self.block.iter_blobs()), [(0.0, b'blob')])
+        self.assertEqual(self.block.to_dict(1)["blobs"], [{"timestamp": 0.0, "blob": "blob"}])
+
+    def test_without_body(self):
+        self.block.clear_body()
+        self.assertEqual(list(self.block.iter_blobs()), [])
+        self.assertEqual(self.block.to_ascii(), "{}\n")
+        self.assertIsNone(self.block.to_dict(1)["blobs"])
+
+    def test_decode_without_body(self):
+        decoded = block.Block.decode(self.block.encode(), False)
+        self.assertFalse(decoded.has_body())
+        self.assertEqual(decoded, self.block)
+        self.assertIsNone(decoded.to_dict(1)["blobs"])
+
+    def test_body_decompressed_once(self):
+        for to_text in (self.block.to_ascii, lambda: self.block.to_dict(1)):
+            with mock.patch.object(block, "decompress", wraps=block.decompress) as decompress:
+                to_text()
+            self.assertEqual(decompress.call_count, 1)
+
+
+class DecodeHeaderTest(unittest.TestCase):
+
+    def setUp(self):
+        self.block = block.Block.block(bytes(range(1, 33)), 1, block_pb2.BlockBody())
+
+    def decode(self, update):
+        block_data = block_pb2.Block()
+        block_data.ParseFromString(self.block.encode())
+        update(block_data)
+        return block.Block.decode(block_data.SerializeToString())
+
+    def test_valid_header(self):
+        self.assertEqual(self.decode(lambda block_data: None), self.block)
+
+    def test_invalid_header(self):
+        updates = [
+            lambda block_data: setattr(block_data.header, "codec", 300),
+            lambda block_data: setattr(block_data.header, "body_hash", b''),
+            lambda block_data: setattr(block_data, "prev_hash", bytes(31)),
+            lambda block_data: setattr(block_data, "prev_hash", bytes(32)),
+            lambda block_data: setattr(block_data.header, "merkle_root", b'\x01' * 33),
+            lambda block_data: setattr(block_data.header, "target", b'\x01'),
+        ]
+        for update in updates:
+            with self.assertRaises(message.DecodeError):
+                self.decode(update)
+
+
+class TargetTest(unittest.TestCase):
+
+    def test_difficulty_round_trip(self):
+        for difficulty in range(block.HASH_BITS + 2):
+            self.assertEqual(block.target_difficulty(block.difficulty_target(difficulty)), difficulty)
+
+    def test_difficulty_target_boundary(self):
+        for difficulty in (1, 8, 100, block.HASH_BITS):
+            target = block.difficulty_target(difficulty)
+            self.assertEqual(((target - 1) >> (block.HASH_BITS - difficulty)), 0)
+            self.assertEqual((target >> (block.HASH_BITS - difficulty)), 1)
+
+    def test_hash_must_be_below_target(self):
+        mined = make_header(1, 1.0, MAX_TARGET)
+        value = int.from_bytes(mined.hash(), "big")
+        mined.target = value
+        self.assertFalse(mined.is_valid())
+        mined.target = value + 1
+        self.assertTrue(mined.is_valid())
+
+    def test_cost(self):
+        self.assertEqual(make_header(4, 1.0).get_cost(), 1 << 4)
+        self.assertEqual(make_header(0, 1.0, 1 << 200).get_cost(), 1 << 56)
+
+
+class RetargetTest(unittest.TestCase):
+
+    def make_blocks(self, target, block_time, count):
+        return [make_header(0, i * block_time, target) for i in range(count)]
+
+    def test_steady_rate_keeps_target(self):
+        retarget = Retarget(10, window=4)
+        blocks = self.make_blocks(1 << 240, 10, 10)
+        retarget.reset(blocks)
+        self.assertEqual(len(retarget), 5)
+        self.assertEqual(retarget.next_target(blocks[-1]), 1 << 240)
+
+    def test_adjustment_is_clamped(self):
+        retarget = Retarget(10, window=4, max_adjustment=4)
+        fast = self.make_blocks(1 << 240, 0.01, 5)
+        retarget.reset(fast)
+        self.assertEqual(retarget.next_target(fast[-1]), 1 << 238)
+
+        slow = self.make_blocks(1 << 240, 1000, 5)
+        retarget.reset(slow)
+        self.assertEqual(retarget.next_target(slow[-1]), 1 << 242)
+
+    def test_target_stays_in_range(self):
+        retarget = Retarget(10, window=4)
+        slow = self.make_blocks(MAX_TARGET, 1000, 5)
+        retarget.reset(slow)
+        self.assertEqual(retarget.next_target(slow[-1]), MAX_TARGET)
+        self.assertEqual(Retarget(10).next_target(make_header(0, 1.0, 0)), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import struct
+import unittest
+
+import header_chain
+import util
+from blob_index import BlobIndex
+from block import Block, BlockBuilder
+from chain import Chain
+from protos import request_pb2
+
+
+def make_blob(timestamp, data):
+    msg = request_pb2.BlobMessage()
+    msg.timestamp = timestamp
+    msg.blob = data
+    return msg.SerializeToString()
+
+
+def make_block(prev_hash, blobs):
+    builder = BlockBuilder(prev_hash, 1)
+    for blob in blobs:
+        builder.add(blob)
+    block = builder.build()
+    while not block.is_valid():
+        block.next()
+    return block
+
+
+def make_chain(bodies):
+    chain = Chain()
+    for blobs in bodies:
+        chain.add(make_block(chain.blocks[-1].hash(), blobs))
+    return chain
+
+
+class BlobIndexTest(unittest.TestCase):
+
+    def test_find_blob(self):
+        first, second = make_blob(1.0, b'first'), make_blob(2.0, b'second')
+        snapshot = make_chain([[first], [second]]).snapshot()
+        self.assertEqual(snapshot.find_blob(util.blob_digest(first)), [(1, 0)])
+        self.assertEqual(snapshot.find_blob(util.blob_digest(second)), [(2, 0)])
+        self.assertFalse(snapshot.contains_blob(util.blob_digest(b'missing')))
+
+    def test_find_blobs_between(self):
+        blobs = [make_blob(float(timestamp), b'%d' % timestamp) for timestamp in range(6)]
+        snapshot = make_chain([blobs[:3], blobs[3:]]).snapshot()
+        self.assertEqual(snapshot.find_blobs_between(1.0, 4.0), [(1, 1), (1, 2), (2, 0)])
+        self.assertEqual(snapshot.find_blobs_between(6.0, 10.0), [])
+
+    def test_find_blobs_between_same_blob_in_two_blocks(self):
+        blob = make_blob(1.0, b'twice')
+        snapshot = make_chain([[blob], [blob]]).snapshot()
+        self.assertEqual(snapshot.find_blobs_between(0.0, 2.0), [(1, 0), (2, 0)])
+
+    def test_find_blobs_between_out_of_order(self):
+        snapshot = make_chain([[make_blob(2.0, b'late')], [make_blob(1.0, b'early')]]).snapshot()
+        self.assertEqual(snapshot.find_blobs_between(0.0, 3.0), [(2, 0), (1, 0)])
+
+    def test_out_of_order_runs_stay_logarithmic(self):
+        index = BlobIndex()
+        blocks = []
+        for i in range(64):
+            # Every other block has a blob received before all of the blobs already indexed
+            timestamp = float(i) if i % 2 == 0 else -float(i)
+            blocks.append(make_block(b'', [make_blob(timestamp, b'%d' % i)]))
+            index.add(i, blocks[-1])
+            self.assertLessEqual(len(index.runs), (i + 1).bit_length() + 1)
+
+        expected = sorted(range(64), key=lambda i: float(i) if i % 2 == 0 else -float(i))
+        self.assertEqual(index.find_between(-100.0, 100.0, blocks, len(blocks)), [(i, 0) for i in expected])
+        self.assertEqual(index.find_between(0.0, 10.0, blocks, len(blocks)), [(i, 0) for i in range(0, 10, 2)])
+
+    def test_insert_shifts_index(self):
+        blob = make_blob(1.0, b'shifted')
+        chain = make_chain([[blob]])
+        inserted = make_blob(0.5, b'inserted')
+        chain.insert(1, make_block(chain.blocks[0].hash(), [inserted]))
+
+        snapshot = chain.snapshot()
+        self.assertEqual(snapshot.find_blob(util.blob_digest(blob)), [(2, 0)])
+        self.assertEqual(snapshot.find_blob(util.blob_digest(inserted)), [(1, 0)])
+        self.assertEqual(snapshot.find_blobs_between(0.0, 2.0), [(1, 0), (2, 0)])
+
+    def test_truncate_removes_from_index(self):
+        blob = make_blob(1.0, b'removed')
+        chain = make_chain([[make_blob(0.5, b'kept')], [blob]])
+        chain.truncate(2)
+
+        snapshot = chain.snapshot()
+        self.assertFalse(snapshot.contains_blob(util.blob_digest(blob)))
+        self.assertEqual(snapshot.find_blobs_between(0.0, 2.0), [(1, 0)])
+
+    def test_snapshot_unchanged_by_truncate(self):
+        removed, added = make_blob(1.0, b'removed'), make_blob(1.0, b'added')
+        chain = make_chain([[removed]])
+        snapshot = chain.snapshot()
+        chain.truncate(1)
+        chain.add(make_block(chain.blocks[0].hash(), [added]))
+
+        self.assertEqual(snapshot.find_blob(util.blob_digest(removed)), [(1, 0)])
+        self.assertFalse(snapshot.contains_blob(util.blob_digest(added)))
+        self.assertEqual(chain.snapshot().find_blob(util.blob_digest(added)), [(1, 0)])
+        self.assertFalse(chain.snapshot().contains_blob(util.blob_digest(removed)))
+
+    def test_snapshot_unchanged_by_add(self):
+        chain = make_chain([[make_blob(1.0, b'first')]])
+        snapshot = chain.snapshot()
+        chain.add(make_block(chain.blocks[-1].hash(), [make_blob(0.5, b'second')]))
+        self.assertEqual(snapshot.find_blobs_between(0.0, 2.0), [(1, 0)])
+        self.assertEqual(chain.snapshot().find_blobs_between(0.0, 2.0), [(2, 0), (1, 0)])
+
+    def test_compact_after_truncate(self):
+        blobs = [make_blob(float(i), b'%d' % i) for i in range(BlobIndex.MIN_COMPACT_SIZE)]
+        chain = make_chain([[make_blob(0.0, b'kept')], blobs])
+        index = chain.mined_blobs
+        chain.truncate(2)
+
+        self.assertIsNot(chain.mined_blobs, index)
+        self.assertEqual(chain.mined_blobs.entries, 1)
+        self.assertEqual(chain.snapshot().find_blobs_between(0.0, float(len(blobs))), [(1, 0)])
+
+
+class SnapshotTest(unittest.TestCase):
+
+    def test_pack_headers(self):
+        chain = make_chain([[make_blob(1.0, b'first')], []])
+        snapshot = chain.snapshot()
+        packed = snapshot.pack_headers()
+        chain.truncate(1)
+        chain.add(make_block(chain.blocks[0].hash(), []))
+
+        self.assertEqual(len(packed), 3 * header_chain.HEADER_SIZE)
+        self.assertIs(snapshot.pack_headers(), packed)
+        repacked = chain.snapshot().pack_headers()
+        self.assertEqual(len(repacked), 2 * header_chain.HEADER_SIZE)
+        self.assertEqual(packed[:header_chain.HEADER_SIZE], repacked[:header_chain.HEADER_SIZE])
+        self.assertNotEqual(packed[:len(repacked)], repacked)
+        self.assertIsNone(header_chain.HeaderChain(packed).verify())
+
+
+class ChainTest(unittest.TestCase):
+
+    def test_unpackable_header_leaves_chain_unchanged(self):
+        chain = make_chain([[make_blob(1.0, b'blob')]])
+        block = Block(chain.blocks[-1].hash(), 1, None, 2.0, body_hash=bytes(32), codec=300)
+        for add in (chain.add, lambda unpackable: chain.insert(1, unpackable)):
+            with self.assertRaises(struct.error):
+                add(block)
+            self.assertEqual(len(chain.blocks), 2)
+            self.assertEqual(len(chain.packed_headers), 2)
+            self.assertTrue(chain.is_complete())
+            self.assertEqual(chain.get_cost(), sum(cur.get_cost() for cur in chain.blocks))
+
+    def test_replace_block_with_body(self):
+        blob = make_blob(1.0, b'blob')
+        chain = make_chain([[blob]])
+        self.assertTrue(chain.replace(1, Block.decode(chain.blocks[1].encode())))
+        self.assertTrue(chain.is_complete())
+        self.assertEqual(chain.mined_blobs.entries, 1)
+        self.assertEqual(chain.snapshot().find_blob(util.blob_digest(blob)), [(1, 0)])
+        self.assertEqual(chain.snapshot().find_blobs_between(0.0, 2.0), [(1, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
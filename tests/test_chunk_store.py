@@ -0,0 +1,79 @@
+import unittest
+from hashlib import sha256
+
+from chunk_store import ChunkStore
+from protos import request_pb2
+
+
+class ChunkStoreTest(unittest.TestCase):
+
+    def test_split_and_join(self):
+        store = ChunkStore(chunk_size=4)
+        msg = request_pb2.BlobMessage()
+        msg.blob = b'0123456789'
+        ref = store.split(msg)
+        self.assertEqual(len(ref.chunks), 3)
+        self.assertEqual(ref.size, 10)
+        self.assertEqual(store.missing(ref), [])
+        self.assertEqual(store.join(ref), msg.blob)
+
+    def test_put_rejects_wrong_digest(self):
+        store = ChunkStore()
+        self.assertFalse(store.put(b'data', sha256(b'other').digest()))
+        self.assertNotIn(sha256(b'data').digest(), store)
+
+    def test_evicts_least_recently_used(self):
+        store = ChunkStore(max_size=8)
+        first, second, third = (sha256(data).digest() for data in (b'aaaa', b'bbbb', b'cccc'))
+        store.put(b'aaaa')
+        store.put(b'bbbb')
+        self.assertEqual(store.get(first), b'aaaa')
+        store.put(b'cccc')
+
+        self.assertIn(first, store)
+        self.assertNotIn(second, store)
+        self.assertIn(third, store)
+        self.assertEqual(store.size, 8)
+
+    def test_put_existing_chunk(self):
+        store = ChunkStore(max_size=8)
+        store.put(b'aaaa')
+        store.put(b'aaaa')
+        self.assertEqual(store.size, 4)
+
+
+    def split(self, store, data):
+        msg = request_pb2.BlobMessage()
+        msg.blob = data
+        return store.split(msg)
+
+    def test_split_chunks_are_never_evicted(self):
+        store = ChunkStore(chunk_size=4, max_size=12)
+        ref = self.split(store, b'aaaabbbb')
+        store.put(b'cccc')
+        store.put(b'dddd')
+
+        self.assertEqual(store.join(ref), b'aaaabbbb')
+        self.assertNotIn(sha256(b'cccc').digest(), store)
+        self.assertIn(sha256(b'dddd').digest(), store)
+        self.assertEqual(store.size, 12)
+
+    def test_split_rejected_when_full(self):
+        store = ChunkStore(chunk_size=4, max_size=12)
+        self.assertIsNotNone(self.split(store, b'aaaabbbb'))
+        self.assertIsNone(self.split(store, b'ccccdddd'))
+        self.assertNotIn(sha256(b'cccc').digest(), store)
+        self.assertIsNotNone(self.split(store, b'aaaacccc'))
+        self.assertEqual(store.pinned_size, 12)
+
+    def test_split_pins_cached_chunk(self):
+        store = ChunkStore(chunk_size=4)
+        store.put(b'aaaa')
+        self.split(store, b'aaaabbbb')
+        self.assertEqual(store.size, 8)
+        self.assertEqual(store.pinned_size, 8)
+        self.assertEqual(len(store.chunks), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
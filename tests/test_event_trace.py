@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+import event_trace
+from chain import Chain
+from miner import Miner
+from replay import TraceReplay
+from test_chain import make_blob, make_block
+
+
+class TraceTest(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp()
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_round_trip(self):
+        blob = make_blob(1.0, b'blob')
+        block = make_block(Chain().blocks[-1].hash(), [blob])
+        chain = Chain()
+        chain.add(block)
+
+        trace = event_trace.TraceWriter(self.path)
+        trace.blob_added(blob)
+        trace.block_received(block, 7)
+        trace.block_mined(block, 8)
+        trace.chain_replaced(1, chain)
+        trace.close()
+
+        records = [(event_type, fields) for event_type, _, fields in event_trace.read_trace(self.path)]
+        self.assertEqual(records, [
+            (event_trace.BLOB_EVENT, (blob,)),
+            (event_trace.RECEIVED_EVENT, (7, block.encode())),
+            (event_trace.MINED_EVENT, (8, block.encode())),
+            (event_trace.SWITCH_EVENT, (1, 2, [block.encode()])),
+        ])
+
+    def test_partial_record(self):
+        trace = event_trace.TraceWriter(self.path)
+        trace.blob_added(make_blob(1.0, b'blob'))
+        trace.close()
+        with open(self.path, "ab") as f:
+            f.write(event_trace.RECORD_HEADER.pack(event_trace.BLOB_EVENT, 0.0, 10) + b'partial')
+
+        self.assertEqual(len(list(event_trace.read_trace(self.path))), 1)
+
+    def test_not_a_trace(self):
+        with open(self.path, "wb") as f:
+            f.write(b'not a trace')
+        with self.assertRaises(ValueError):
+            list(event_trace.read_trace(self.path))
+
+    def test_replay(self):
+        miner = Miner()
+        trace = event_trace.TraceWriter(self.path)
+        miner.blob_event.append(trace.blob_added)
+        miner.receive_event.append(trace.block_received)
+        miner.mine_event.append(trace.block_mined)
+        miner.reorg_event.append(trace.chain_replaced)
+
+        orphaned, mined = make_blob(1.0, b'orphaned'), make_blob(2.0, b'mined')
+        miner.add(orphaned)
+        miner.add(mined)
+        block = make_block(miner.chain.blocks[-1].hash(), [orphaned])
+        miner.receive_block(block, miner.chain.get_cost() + block.get_cost())
+
+        fork = Chain()
+        for blobs in ([mined], []):
+            fork.add(make_block(fork.blocks[-1].hash(), blobs))
+        miner.receive_complete_chain(fork)
+        trace.close()
+
+        replay = TraceReplay(Miner())
+        replay.replay(event_trace.read_trace(self.path))
+        self.assertEqual(replay.events, 4)
+        self.assertEqual(replay.mismatches, 0)
+        self.assertEqual(list(replay.miner.chain.blocks), list(miner.chain.blocks))
+        self.assertEqual(list(replay.miner.pending_blobs), list(miner.pending_blobs))
+
+    def test_replay_undecodable_blocks(self):
+        chain = Chain()
+        block = make_block(chain.blocks[-1].hash(), [make_blob(1.0, b'blob')])
+        replay = TraceReplay(Miner())
+        replay.replay([(event_trace.MINED_EVENT, 0.0, (1, b'corrupt')),
+                       (event_trace.SWITCH_EVENT, 0.0, (1, 2, [b'corrupt'])),
+                       (event_trace.MINED_EVENT, 0.0, (chain.get_cost() + block.get_cost(), block.encode()))])
+        self.assertEqual(replay.events, 3)
+        self.assertEqual(replay.mismatches, 2)
+        self.assertEqual(replay.miner.chain.blocks[-1], block)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import unittest
+from unittest import mock
+
+import header_chain
+from block import Block, BlockBuilder, HASH_BITS
+from protos import block_pb2
+from test_chain import make_blob
+
+
+def make_block(prev_hash, blobs, codec=block_pb2.NONE, target=None, difficulty=1):
+    builder = BlockBuilder(prev_hash, difficulty, codec, target)
+    for blob in blobs:
+        builder.add(blob)
+    block = builder.build()
+    while not block.is_valid():
+        block.next()
+    return block
+
+
+def pack_chain(blocks):
+    return b''.join(header_chain.pack(block) for block in blocks)
+
+
+class HashHeadersTest(unittest.TestCase):
+
+    def assert_hashes(self, block):
+        self.assertEqual(header_chain.hash_headers(header_chain.pack(block)), block.hash())
+
+    def test_genesis(self):
+        self.assert_hashes(Block.genesis())
+
+    def test_with_and_without_target(self):
+        prev_hash = Block.genesis().hash()
+        for codec in (block_pb2.NONE, block_pb2.ZLIB, block_pb2.LZMA):
+            for blobs in ([], [make_blob(1.0, b'blob')]):
+                self.assert_hashes(make_block(prev_hash, blobs, codec))
+                self.assert_hashes(make_block(prev_hash, blobs, codec, 1 << (HASH_BITS - 1)))
+
+    def test_large_nonce(self):
+        block = make_block(Block.genesis().hash(), [make_blob(1.0, b'blob')], block_pb2.ZLIB, 1 << (HASH_BITS - 1))
+        block.nonce = 1 << 31
+        self.assert_hashes(block)
+
+    def test_segment(self):
+        blocks = [Block.genesis()]
+        for i in range(5):
+            blocks.append(make_block(blocks[-1].hash(), [make_blob(float(i), b'%d' % i)] * (i % 2),
+                                     block_pb2.ZLIB, 1 << (HASH_BITS - 1)))
+        self.assertEqual(header_chain.hash_headers(pack_chain(blocks)), b''.join(block.hash() for block in blocks))
+
+
+class HeaderChainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.blocks = [Block.genesis()]
+        for i in range(4):
+            self.blocks.append(make_block(self.blocks[-1].hash(), [make_blob(float(i), b'%d' % i)], block_pb2.ZLIB,
+                                          1 << (HASH_BITS - 2)))
+
+    def verify(self, data, prev_hash=None):
+        # Both the NumPy and the pure Python verification must agree
+        result = header_chain.HeaderChain(data).verify(prev_hash=prev_hash)
+        numpy = header_chain.numpy
+        header_chain.numpy = None
+        try:
+            self.assertEqual(header_chain.HeaderChain(data).verify(prev_hash=prev_hash), result)
+        finally:
+            header_chain.numpy = numpy
+        return result
+
+    def test_valid_chain(self):
+        self.assertIsNone(self.verify(pack_chain(self.blocks)))
+
+    def test_block_round_trip(self):
+        headers = header_chain.HeaderChain(pack_chain(self.blocks))
+        for idx, block in enumerate(self.blocks):
+            unpacked = headers.block(idx)
+            self.assertEqual(unpacked, block)
+            self.assertEqual(unpacked.hash(), block.hash())
+            self.assertEqual(unpacked.get_target(), block.get_target())
+
+    def test_continued_chain(self):
+        self.assertIsNone(self.verify(pack_chain(self.blocks[2:]), self.blocks[1].hash()))
+        self.assertEqual(self.verify(pack_chain(self.blocks[2:]), self.blocks[0].hash()), 0)
+
+    def test_broken_link(self):
+        data = bytearray(pack_chain(self.blocks))
+        data[3 * header_chain.HEADER_SIZE] ^= 1
+        self.assertEqual(self.verify(bytes(data)), 3)
+
+    def test_tampered_target(self):
+        block = self.blocks[2]
+        block.header.target = (1).to_bytes(HASH_BITS // 8, "big")
+        self.assertEqual(self.verify(pack_chain(self.blocks)), 2)
+
+    def test_executor(self):
+        data = pack_chain(self.blocks) * (header_chain.SEGMENT_SIZE // len(self.blocks) + 1)
+        executor = header_chain.create_executor(2)
+        try:
+            self.assertEqual(header_chain.HeaderChain(data).hashes(executor), header_chain.hash_headers(data))
+            self.assertIsNone(header_chain.HeaderChain(pack_chain(self.blocks)).verify(executor))
+        finally:
+            executor.shutdown()
+
+    def test_executor_splits_short_chain(self):
+        data = pack_chain(self.blocks) * (header_chain.MIN_SEGMENT_SIZE // len(self.blocks) + 1)
+        executor = header_chain.create_executor(2)
+        workers = header_chain.VERIFY_WORKERS
+        header_chain.VERIFY_WORKERS = 2
+        try:
+            with mock.patch.object(executor, "map", wraps=executor.map) as executor_map:
+                self.assertEqual(header_chain.HeaderChain(data).hashes(executor), header_chain.hash_headers(data))
+            self.assertEqual(len(executor_map.call_args[0][1]), 2)
+        finally:
+            header_chain.VERIFY_WORKERS = workers
+            executor.shutdown()
+
+    def test_partial_header(self):
+        with self.assertRaises(ValueError):
+            header_chain.HeaderChain(pack_chain(self.blocks)[:-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from mempool import Mempool
+
+
+class MempoolTest(unittest.TestCase):
+
+    def test_add_and_take(self):
+        pool = Mempool(10)
+        self.assertTrue(pool.add(b'aaa', b'a'))
+        self.assertTrue(pool.add(b'bbb', b'b'))
+        self.assertFalse(pool.add(b'aaa', b'a'))
+        self.assertFalse(pool.add(b'ccccc', b'c'))
+        self.assertEqual(pool.take(10), [(b'a', b'aaa'), (b'b', b'bbb')])
+        self.assertEqual(pool.take(5), [(b'a', b'aaa')])
+
+    def test_restore_to_front(self):
+        pool = Mempool(100)
+        pool.add(b'new', b'n')
+        self.assertEqual(pool.restore([(b'x', b'old1'), (b'y', b'old2')]), [])
+        self.assertEqual([digest for digest, _ in pool.take(100)], [b'x', b'y', b'n'])
+        self.assertEqual(pool.size, 11)
+
+    def test_restore_skips_pending(self):
+        pool = Mempool(100)
+        pool.add(b'blob', b'b')
+        pool.restore([(b'b', b'blob')])
+        self.assertEqual(len(pool), 1)
+        self.assertEqual(pool.size, 4)
+
+    def test_restore_when_full_evicts_newest(self):
+        pool = Mempool(8)
+        pool.add(b'1111', b'1')
+        pool.add(b'2222', b'2')
+        evicted = pool.restore([(b'r', b'rrrr')])
+
+        self.assertEqual(evicted, [(b'2', b'2222')])
+        self.assertEqual([digest for digest, _ in pool.take(100)], [b'r', b'1'])
+        self.assertEqual(pool.size, 8)
+
+    def test_restore_more_than_limit(self):
+        pool = Mempool(4)
+        pool.restore([(b'a', b'aaaa'), (b'b', b'bbbb')])
+        self.assertEqual([digest for digest, _ in pool.take(100)], [b'a'])
+        self.assertEqual(pool.size, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+from hashlib import sha256
+
+import merkle
+from test_chain import make_blob, make_block
+
+
+def make_digests(size):
+    return [sha256(b'%d' % i).digest() for i in range(size)]
+
+
+class MerkleTreeTest(unittest.TestCase):
+
+    def test_empty_tree(self):
+        self.assertEqual(merkle.MerkleTree().root(), b'')
+
+    def test_single_leaf(self):
+        digest = make_digests(1)[0]
+        tree = merkle.MerkleTree([digest])
+        self.assertEqual(tree.root(), merkle.leaf_hash(digest))
+        self.assertEqual(tree.proof(0), [])
+        self.assertTrue(merkle.verify_proof(digest, 0, 1, [], tree.root()))
+
+    def test_proof_round_trip(self):
+        for size in range(1, 18):
+            digests = make_digests(size)
+            tree = merkle.MerkleTree(digests)
+            root = tree.root()
+            for idx, digest in enumerate(digests):
+                proof = tree.proof(idx)
+                self.assertTrue(merkle.verify_proof(digest, idx, size, proof, root), (size, idx))
+                if size > 1:
+                    self.assertFalse(merkle.verify_proof(digests[idx - 1], idx, size, proof, root), (size, idx))
+
+    def test_invalid_proofs(self):
+        size = 11
+        digests = make_digests(size)
+        tree = merkle.MerkleTree(digests)
+        root = tree.root()
+        for idx, digest in enumerate(digests):
+            proof = tree.proof(idx)
+            self.assertFalse(merkle.verify_proof(digest, (idx + 1) % size, size, proof, root))
+            self.assertFalse(merkle.verify_proof(digest, idx, size, proof[:-1], root))
+            self.assertFalse(merkle.verify_proof(digest, idx, size, proof + [root], root))
+            tampered = list(proof)
+            tampered[0] = sha256(tampered[0]).digest()
+            self.assertFalse(merkle.verify_proof(digest, idx, size, tampered, root))
+        self.assertFalse(merkle.verify_proof(digests[0], size, size, tree.proof(0), root))
+
+    def test_block_merkle_root(self):
+        blobs = [make_blob(float(i), b'%d' % i) for i in range(5)]
+        block = make_block(b'', blobs)
+        self.assertEqual(block.header.merkle_root, merkle.MerkleTree(block.get_blob_digests()).root())
+
+
+if __name__ == '__main__':
+    unittest.main()
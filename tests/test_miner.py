@@ -0,0 +1,101 @@
+import unittest
+
+import header_chain
+import util
+from block import Block
+from chain import Chain
+from miner import Miner
+from test_chain import make_blob, make_block, make_chain
+
+
+class ReorgTest(unittest.TestCase):
+
+    def setUp(self):
+        self.miner = Miner()
+        self.reorgs = []
+        self.miner.reorg_event.append(lambda fork_idx, chain: self.reorgs.append(fork_idx))
+
+    def extend(self, chain, blobs):
+        block = make_block(chain.blocks[-1].hash(), blobs)
+        chain.add(block)
+        return block
+
+    def test_switch_to_fork(self):
+        shared = make_blob(1.0, b'shared')
+        orphaned = make_blob(2.0, b'orphaned')
+        mined = make_blob(3.0, b'mined')
+
+        fork = Chain()
+        self.extend(fork, [shared])
+        self.miner.chain.add(fork.blocks[1])
+        self.extend(self.miner.chain, [orphaned])
+        self.extend(fork, [mined])
+        self.extend(fork, [])
+
+        self.miner.receive_complete_chain(fork)
+
+        self.assertEqual(self.reorgs, [2])
+        self.assertEqual(list(self.miner.chain.blocks), list(fork.blocks))
+        self.assertIn(util.blob_digest(orphaned), self.miner.pending_blobs)
+        self.assertNotIn(util.blob_digest(mined), self.miner.pending_blobs)
+        self.assertTrue(self.miner.snapshot.contains_blob(util.blob_digest(mined)))
+        self.assertFalse(self.miner.snapshot.contains_blob(util.blob_digest(orphaned)))
+
+    def test_extend_current_chain(self):
+        chain = Chain()
+        for block in self.miner.chain.blocks[1:]:
+            chain.add(block)
+        self.extend(chain, [])
+
+        self.miner.receive_complete_chain(chain)
+
+        self.assertEqual(self.reorgs, [len(chain.blocks) - 1])
+        self.assertEqual(len(self.miner.chain.blocks), len(chain.blocks))
+
+
+class FloatingChainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.blocks = make_chain([[make_blob(float(i), b'%d' % i)] for i in range(3)]).blocks
+
+        # The floating chain only has the blocks after the fork until it is resolved
+        self.chain = Chain()
+        for block in self.blocks[2:]:
+            self.chain.add(block)
+
+        # The resolution chain only has block headers the same as the one received from a peer
+        headers = header_chain.HeaderChain(b''.join(header_chain.pack(block) for block in self.blocks[:3]))
+        self.res_chain = Chain()
+        for idx in range(1, len(headers)):
+            self.res_chain.add(headers.block(idx))
+
+    def resolve(self, miner, verified=True):
+        miner.floating_chains.add(self.chain)
+        self.assertFalse(miner.is_complete(self.chain))
+        return miner.receive_resolution_chain(self.chain, self.res_chain, verified)
+
+    def test_light_chain_is_complete_once_resolved(self):
+        miner = Miner(light=True)
+        self.assertTrue(self.resolve(miner))
+        self.assertTrue(miner.is_complete(self.chain))
+
+    def test_chain_is_complete_once_bodies_are_received(self):
+        miner = Miner()
+        self.assertTrue(self.resolve(miner))
+        self.assertFalse(miner.is_complete(self.chain))
+        self.assertEqual(self.chain.get_bodiless_indices(), [1])
+
+        self.assertFalse(miner.receive_resolution_block(Block.decode(self.blocks[2].encode()), 1, self.chain))
+        self.assertFalse(miner.is_complete(self.chain))
+        self.assertTrue(miner.receive_resolution_block(Block.decode(self.blocks[1].encode()), 1, self.chain))
+        self.assertTrue(miner.is_complete(self.chain))
+
+    def test_invalid_resolution_chain(self):
+        miner = Miner(light=True)
+        self.res_chain.blocks[1].nonce += 1
+        self.assertFalse(self.resolve(miner, False))
+        self.assertNotIn(self.chain, miner.floating_chains)
+
+
+if __name__ == '__main__':
+    unittest.main()
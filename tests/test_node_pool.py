@@ -0,0 +1,46 @@
+import socket
+import unittest
+
+import framing
+from node_pool import NodePool
+
+
+class MulticastTest(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = NodePool(1, 30, 105)
+        self.pool.add(2, "127.0.0.1")
+
+    def test_datagram(self):
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.settimeout(5)
+            self.pool.multicast(b'block', sock.getsockname()[1])
+            self.assertEqual(sock.recv(framing.MAX_DATAGRAM_SIZE), b'block')
+
+    def test_too_large_for_datagram(self):
+        data = b'\xff' * (framing.MAX_DATAGRAM_SIZE + 1)
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as listener:
+            listener.bind(("127.0.0.1", 0))
+            listener.listen(1)
+            listener.settimeout(5)
+            self.pool.multicast(data, listener.getsockname()[1])
+
+            conn, _ = listener.accept()
+            with conn:
+                conn.settimeout(5)
+                self.assertEqual(framing.receive_framed_segment(conn), data)
+
+    def test_unreachable_peer(self):
+        self.pool = NodePool(1, 30, 105)
+        self.pool.add(3, "256.0.0.1")
+        self.pool.add(2, "127.0.0.1")
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.bind(("127.0.0.1", 0))
+            sock.settimeout(5)
+            self.pool.multicast(b'block', sock.getsockname()[1])
+            self.assertEqual(sock.recv(framing.MAX_DATAGRAM_SIZE), b'block')
+
+
+if __name__ == '__main__':
+    unittest.main()
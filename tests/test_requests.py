@@ -0,0 +1,25 @@
+import unittest
+
+from protos import request_pb2
+from requests import RequestRouter, request_type_name
+
+
+class RequestRouterTest(unittest.TestCase):
+
+    def test_request_type_name(self):
+        self.assertEqual(request_type_name(request_pb2.MINED_BLOCK), "MINED_BLOCK")
+        self.assertEqual(request_type_name(99), "99")
+
+    def test_route_unknown_request_type(self):
+        router = RequestRouter(None)
+        routed = []
+        router.route_event.append(lambda request_type: routed.append(request_type_name(request_type)))
+
+        req = request_pb2.Request()
+        req.request_type = 99
+        router.route(req.SerializeToString(), None)
+        self.assertEqual(routed, ["99"])
+
+
+if __name__ == '__main__':
+    unittest.main()
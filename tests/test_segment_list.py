@@ -0,0 +1,60 @@
+import unittest
+
+from segment_list import SegmentList
+
+
+class SegmentListTest(unittest.TestCase):
+
+    def setUp(self):
+        self.size = SegmentList.SEGMENT_SIZE
+        SegmentList.SEGMENT_SIZE = 4
+
+    def tearDown(self):
+        SegmentList.SEGMENT_SIZE = self.size
+
+    def test_list_operations(self):
+        items = SegmentList(range(10))
+        self.assertEqual(len(items), 10)
+        self.assertEqual(list(items), list(range(10)))
+        self.assertEqual(items[5], 5)
+        self.assertEqual(items[-1], 9)
+        self.assertEqual(items[3:9], list(range(3, 9)))
+        self.assertEqual(items[-3:], [7, 8, 9])
+        self.assertEqual(items[::3], [0, 3, 6, 9])
+        with self.assertRaises(IndexError):
+            items[10]
+
+    def test_truncate(self):
+        items = SegmentList(range(10))
+        self.assertEqual(items.truncate(6), [6, 7, 8, 9])
+        self.assertEqual(items.truncate(8), [])
+        items.append(10)
+        self.assertEqual(list(items), [0, 1, 2, 3, 4, 5, 10])
+        self.assertEqual(items.truncate(4), [4, 5, 10])
+        items.append(11)
+        self.assertEqual(list(items), [0, 1, 2, 3, 11])
+
+    def test_insert(self):
+        items = SegmentList(range(6))
+        items.insert(1, 'x')
+        self.assertEqual(list(items), [0, 'x', 1, 2, 3, 4, 5])
+        items.insert(7, 'y')
+        self.assertEqual(items[-1], 'y')
+
+    def test_view_unchanged_by_list(self):
+        items = SegmentList(range(10))
+        view = items.view()
+        items.truncate(5)
+        items.append('a')
+        items.append('b')
+        items.truncate(2)
+        for i in range(10):
+            items.append(-i)
+
+        self.assertEqual(list(view), list(range(10)))
+        self.assertEqual(view[6], 6)
+        self.assertEqual(len(view), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,16 @@
-import logging
+from hashlib import sha256
 
 
-def log_collection(level, msg, col):
+def log_collection(logger, level, msg, col):
     """
-    A logging utility function to log collections with each item on a new line.
+    A logging utility function to log collections with each item on a new line. Nothing is formatted unless the
+    logger is enabled for the level.
+    :param logger: The logger of the module logging the collection.
     :param level: The messages log level.
     :param msg: The message that is displayed as prefix before the collection.
     :param col: The collection to be logged.
     """
-    if logging.getLogger().getEffectiveLevel() < level:
+    if not logger.isEnabledFor(level):
         return
 
     msg += " ["
@@ -18,4 +20,13 @@ def log_collection(level, msg, col):
         msg += "\n"
     msg += "]"
 
-    logging.log(level, msg)
+    logger.log(level, "%s", msg)
+
+
+def blob_digest(blob):
+    """
+    Compute the content digest used to identify a blob across all nodes in the network.
+    :param blob: The encoded BlobMessage protocol buffer.
+    :return: The 256 bit SHA256 digest of the encoded blob.
+    """
+    return sha256(blob).digest()